@@ -1,6 +1,7 @@
 # [FILE: actualizar_db.py]
 import sqlite3
 import os
+import sys
 
 # Apuntamos a la carpeta data explícitamente
 DB_NAME = "data/restaurante.db"
@@ -185,5 +186,28 @@ def migrar_db():
         print(f"Error general: {e}")
 
 
+def reconstruir_resumen():
+    """Recalcula la tabla resumen_mensual (python actualizar_db.py --reconstruir-resumen)."""
+    if not os.path.exists(DB_NAME):
+        print(f"ERROR: No se encuentra la base de datos en '{DB_NAME}'")
+        return
+
+    from app.database.connection import DatabaseManager
+
+    # Recalcula todo en una sola carga: no hace falta fsync por commit
+    db = DatabaseManager(DB_NAME, profile="bulk-import")
+    try:
+        db.reconstruir_resumen_mensual()
+        meses = db.fetch_all("SELECT COUNT(*) FROM resumen_mensual", usar_cache=False)
+        print(f"Resumen mensual reconstruido: {meses[0][0]} meses.")
+    except Exception as e:
+        print(f"Error al reconstruir el resumen mensual: {e}")
+    finally:
+        db.close()
+
+
 if __name__ == "__main__":
-    migrar_db()
+    if "--reconstruir-resumen" in sys.argv:
+        reconstruir_resumen()
+    else:
+        migrar_db()
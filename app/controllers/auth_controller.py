@@ -9,7 +9,7 @@ class AuthController:
     def login(self, username, password):
         pwd_hash = hashlib.sha256(password.encode()).hexdigest()
         query = "SELECT id, username, rol FROM usuarios WHERE username=? AND password_hash=?"
-        user = self.db.cursor.execute(query, (username, pwd_hash)).fetchone()
+        user = self.db.fetch_one(query, (username, pwd_hash))
 
         if user:
             self.current_user = user  # (id, username, rol)
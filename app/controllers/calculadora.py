@@ -1,5 +1,8 @@
 import math
 
+from app.controllers.recetas_cache import obtener_explosion
+from app.controllers.report_parser import NOMBRES_DIA
+
 
 class CalculadoraInsumos:
     def __init__(self, db_manager):
@@ -11,16 +14,20 @@ class CalculadoraInsumos:
         basado en los reportes históricos.
         """
         query = """
-            SELECT codigo_producto, LOWER(dia_semana), AVG(promedio_medida) 
+            SELECT menu_item_id, dia_num, AVG(promedio_medida) 
             FROM detalle_reportes_ventas
-            GROUP BY codigo_producto, LOWER(dia_semana)
+            WHERE menu_item_id IS NOT NULL AND dia_num IS NOT NULL
+            GROUP BY menu_item_id, dia_num
         """
         rows = self.db.fetch_all(query)
+        explosion = obtener_explosion(self.db)
 
         ventas_promedio = {}
         for row in rows:
-            codigo = row[0]
-            dia = row[1]
+            codigo = explosion.codigo_de(row[0])
+            if codigo is None:
+                continue
+            dia = NOMBRES_DIA[row[1]]
             cantidad_prom = row[2]
 
             if codigo not in ventas_promedio:
@@ -65,18 +72,20 @@ class CalculadoraInsumos:
             ventas_promedio = self.obtener_promedio_ventas_semanales()
 
         query_insumos = """
-            SELECT id, nombre, unidad_base_id 
-            FROM insumos 
+            SELECT i.id, i.nombre, u.abreviatura
+            FROM insumos i
+            LEFT JOIN unidades_medida u ON u.id = i.unidad_base_id
             WHERE 1=1
         """
         params = []
         if grupo_filtro and grupo_filtro != "Todos":
-            query_insumos += " AND grupo_calculo = ?"
+            query_insumos += " AND i.grupo_calculo = ?"
             params.append(grupo_filtro)
 
-        query_insumos += " ORDER BY nombre ASC"
+        query_insumos += " ORDER BY i.nombre ASC"
 
         insumos = self.db.fetch_all(query_insumos, tuple(params))
+        usos_por_insumo = obtener_explosion(self.db).usos_por_insumo()
 
         reporte = []
 
@@ -84,29 +93,13 @@ class CalculadoraInsumos:
         factor_val = 1.0 + (porcentaje_global / 100.0)
 
         for ins in insumos:
-            ins_id, ins_nombre, u_base_id = ins
-
-            u_row = self.db.fetch_all(
-                "SELECT abreviatura FROM unidades_medida WHERE id=?", (u_base_id,)
-            )
-            unidad_nombre = u_row[0][0] if u_row else "??"
-
-            query_recetas = """
-                SELECT m.codigo, m.nombre, r.cantidad_necesaria 
-                FROM recetas r
-                JOIN menu_items m ON r.menu_item_id = m.id
-                WHERE r.insumo_id = ?
-            """
-            usos = self.db.fetch_all(query_recetas, (ins_id,))
+            ins_id, ins_nombre, unidad_nombre = ins
+            unidad_nombre = unidad_nombre or "??"
 
             total_semanal_base = 0.0
             detalle_uso = []
 
-            for uso in usos:
-                cod_prod = uso[0]
-                nom_prod = uso[1]
-                cant_receta = uso[2]
-
+            for cod_prod, nom_prod, cant_receta in usos_por_insumo.get(ins_id, ()):
                 consumo_plato_semanal = 0.0
 
                 if cod_prod in ventas_promedio:
@@ -0,0 +1,82 @@
+import threading
+
+# Tablas de referencia pequeñas que usan los combos y búsquedas de las vistas.
+# clave -> consulta (la primera columna siempre es el id)
+CONSULTAS = {
+    "sucursales": "SELECT id, nombre, es_principal FROM sucursales ORDER BY nombre",
+    "unidades": "SELECT id, nombre, abreviatura FROM unidades_medida ORDER BY id",
+    "categorias": "SELECT id, nombre, codigo FROM categorias_insumos ORDER BY nombre",
+    "proveedores": "SELECT id, nombre, tipo FROM proveedores ORDER BY nombre",
+    "menu_items": (
+        "SELECT id, codigo, nombre, precio_venta FROM menu_items ORDER BY nombre"
+    ),
+    "presentaciones": """
+        SELECT p.id, p.nombre, i.nombre, p.precio_compra, p.insumo_id
+        FROM presentaciones_compra p
+        JOIN insumos i ON p.insumo_id = i.id
+        ORDER BY i.nombre, p.nombre
+    """,
+}
+
+
+class CatalogosReferencia:
+    """
+    Caché en memoria de las tablas de referencia (CONSULTAS).
+
+    Cada clave tiene un contador de versión que sube con invalidar(); los
+    datos se vuelven a leer la próxima vez que se piden. Las pantallas que
+    escriben en esas tablas deben llamar a invalidar_catalogos().
+    """
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self._lock = threading.Lock()
+        self._versiones = dict.fromkeys(CONSULTAS, 0)
+        self._datos = {}
+
+    def version(self, clave):
+        return self._versiones[clave]
+
+    def invalidar(self, *claves):
+        with self._lock:
+            for clave in claves or CONSULTAS:
+                self._versiones[clave] += 1
+
+    def _cargar(self, clave):
+        version = self._versiones[clave]
+        datos = self._datos.get(clave)
+        if datos is not None and datos[0] == version:
+            return datos
+        with self._lock:
+            datos = self._datos.get(clave)
+            if datos is None or datos[0] != version:
+                filas = tuple(tuple(r) for r in self.db.fetch_all(CONSULTAS[clave]))
+                datos = (version, filas, {r[0]: r for r in filas})
+                self._datos[clave] = datos
+        return datos
+
+    def filas(self, clave):
+        """Filas de la consulta de `clave`, en su orden."""
+        return self._cargar(clave)[1]
+
+    def obtener(self, clave, id_):
+        """Fila con ese id o None."""
+        return self._cargar(clave)[2].get(id_)
+
+
+_catalogos = {}
+_lock_registro = threading.Lock()
+
+
+def obtener_catalogos(db_manager):
+    """Instancia compartida para la base de datos abierta en db_manager."""
+    with _lock_registro:
+        catalogos = _catalogos.get(db_manager.db_path)
+        if catalogos is None or catalogos.db is not db_manager:
+            catalogos = _catalogos[db_manager.db_path] = CatalogosReferencia(db_manager)
+        return catalogos
+
+
+def invalidar_catalogos(db_manager, *claves):
+    """Sube la versión de las claves indicadas (todas si no se indica ninguna)."""
+    obtener_catalogos(db_manager).invalidar(*claves)
@@ -0,0 +1,107 @@
+import csv
+from collections import namedtuple
+
+# Fila rechazada del CSV (fila = número de línea en el archivo, desde 1)
+ErrorImportacion = namedtuple(
+    "ErrorImportacion", ["fila", "codigo", "nombre", "motivo"]
+)
+
+# Resultado estructurado de la importación
+ResultadoImportacionMenu = namedtuple(
+    "ResultadoImportacionMenu", ["agregados", "actualizados", "errores"]
+)
+
+VALORES_NO = {"0", "no", "false", "f"}
+
+# es_preparado va dos veces: un plato nuevo sin la columna queda como
+# preparado (1); uno existente conserva su valor (bebidas, reventa).
+QUERY_UPSERT = """
+    INSERT INTO menu_items (codigo, nombre, precio_venta, es_preparado)
+    VALUES (?, ?, ?, COALESCE(?, 1))
+    ON CONFLICT(codigo) DO UPDATE SET
+        nombre = excluded.nombre,
+        precio_venta = excluded.precio_venta,
+        es_preparado = COALESCE(?, menu_items.es_preparado)
+"""
+
+
+def _precio(texto):
+    return float(texto.strip().replace("$", "").replace(",", ""))
+
+
+def validar_filas(filas):
+    """
+    Valida en una pasada las filas del CSV (codigo, nombre, precio[, es_preparado]).
+    La primera fila se toma como encabezado si su precio no es numérico.
+    Devuelve ({codigo: (codigo, nombre, precio, es_prep)}, [ErrorImportacion]).
+    es_prep es None si la fila no trae la columna (o viene vacía).
+    """
+    validas = {}
+    errores = []
+    for num_fila, row in enumerate(filas, start=1):
+        if num_fila == 1:
+            try:
+                _precio(row[2])
+            except (IndexError, ValueError):
+                continue
+
+        if len(row) < 3:
+            continue
+
+        codigo = row[0].strip()
+        nombre = row[1].strip()
+        if not codigo or not nombre:
+            errores.append(
+                ErrorImportacion(num_fila, codigo, nombre, "Código o nombre vacío")
+            )
+            continue
+
+        try:
+            precio = _precio(row[2])
+        except ValueError:
+            errores.append(
+                ErrorImportacion(num_fila, codigo, nombre, "Precio inválido")
+            )
+            continue
+
+        if codigo in validas:
+            errores.append(
+                ErrorImportacion(
+                    num_fila, codigo, nombre, "Código repetido en el archivo"
+                )
+            )
+            continue
+
+        valor_prep = row[3].strip().lower() if len(row) > 3 else ""
+        if not valor_prep:
+            es_prep = None
+        else:
+            es_prep = 0 if valor_prep in VALORES_NO else 1
+        validas[codigo] = (codigo, nombre, precio, es_prep)
+    return validas, errores
+
+
+def importar_menu_csv(db_manager, file_path):
+    """
+    Importa (o actualiza) platos del menú desde un CSV con un solo
+    executemany en una transacción. Los códigos existentes se precargan en
+    un set para separar altas de actualizaciones sin consultar fila a fila.
+    Se escribe con el perfil 'bulk-import'. Devuelve un ResultadoImportacionMenu.
+    """
+    with open(file_path, mode="r", encoding="utf-8-sig", newline="") as f:
+        validas, errores = validar_filas(csv.reader(f))
+
+    if not validas:
+        return ResultadoImportacionMenu(0, 0, errores)
+
+    existentes = set(db_manager.obtener_todos_codigos_menu())
+    actualizados = sum(1 for codigo in validas if codigo in existentes)
+
+    with db_manager.perfil("bulk-import"), db_manager.transaction():
+        db_manager.execute_many(
+            QUERY_UPSERT, [fila + (fila[3],) for fila in validas.values()]
+        )
+
+    return ResultadoImportacionMenu(
+        len(validas) - actualizados, actualizados, errores
+    )
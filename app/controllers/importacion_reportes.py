@@ -0,0 +1,134 @@
+import logging
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app.controllers.report_parser import LIMITE_VISTA_PREVIA, ReportParser
+
+logger = logging.getLogger(__name__)
+
+# Resultado por archivo de una importación múltiple
+ResultadoImportacion = namedtuple(
+    "ResultadoImportacion",
+    ["ruta", "ok", "mensaje", "metadata", "registros", "duplicado"],
+)
+
+
+def parsear_archivo(ruta):
+    """
+    Parsea un reporte en un proceso del pool. Debe ser una función de
+    módulo (picklable) y no tocar la base de datos ni Qt. Solo vuelven al
+    proceso principal la metadata, el total y la vista previa; las filas
+    se leen de nuevo al guardar (guardar_archivo).
+    """
+    metadata, registros, error = ReportParser.parse_csv(ruta, LIMITE_VISTA_PREVIA)
+    return ruta, metadata, registros, error
+
+
+def guardar_archivo(db_manager, ruta, metadata, actualizar_existente=True):
+    """
+    Guarda el reporte `ruta` leyéndolo en streaming (abrir_reporte): las
+    filas pasan directo a los bloques de guardar_reporte_mensual, así que
+    la memoria no crece con el tamaño del archivo. Se escribe con el perfil
+    'bulk-import'. `metadata` es la de la vista previa. Devuelve (ok, mensaje).
+    """
+    try:
+        _, registros = ReportParser.abrir_reporte(ruta)
+    except Exception as e:
+        return False, f"Error al leer el archivo: {str(e)}"
+    if registros is None:
+        return False, "El archivo no contiene registros de ventas."
+    try:
+        with db_manager.perfil("bulk-import"):
+            return db_manager.guardar_reporte_mensual(
+                metadata, registros, actualizar_existente
+            )
+    finally:
+        # Si el guardado se detuvo a medias, el archivo no queda abierto
+        registros.close()
+
+
+def _parsear_en_paralelo(rutas, max_procesos):
+    """Genera (ruta, metadata, registros, error) a medida que terminan."""
+    procesos = min(len(rutas), max_procesos or os.cpu_count() or 1)
+    if procesos <= 1:
+        for ruta in rutas:
+            yield parsear_archivo(ruta)
+        return
+
+    ejecutor = ProcessPoolExecutor(max_workers=procesos)
+    try:
+        futuros = {ejecutor.submit(parsear_archivo, ruta): ruta for ruta in rutas}
+        for futuro in as_completed(futuros):
+            ruta = futuros[futuro]
+            try:
+                yield futuro.result()
+            except Exception as e:
+                yield ruta, {}, [], f"Error inesperado parsing: {str(e)}"
+    finally:
+        # Si el consumidor se detiene, los archivos pendientes no se parsean
+        ejecutor.shutdown(wait=True, cancel_futures=True)
+
+
+def parsear_reportes(rutas, max_procesos=None, cancelado=None):
+    """
+    Parsea varios reportes (CSV o Excel) en un ProcessPoolExecutor y genera
+    (ruta, metadata, registros, error) en orden de finalización. No toca la
+    base de datos, así que puede correr en un hilo de fondo.
+    `cancelado` es un callable opcional; si devuelve True no se generan más
+    archivos y los pendientes no se parsean.
+    """
+    rutas = list(rutas)
+    if not rutas:
+        return
+
+    for parseado in _parsear_en_paralelo(rutas, max_procesos):
+        if cancelado is not None and cancelado():
+            logger.info("Importación cancelada antes de %s", parseado[0])
+            return
+        yield parseado
+
+
+def guardar_parseado(db_manager, ruta, metadata, registros, error):
+    """
+    Guarda un reporte ya parseado en su propia transacción
+    (guardar_reporte_mensual), para que un archivo con error no revierta a
+    los demás. Un archivo ya importado se omite. Uno de un periodo ya
+    cargado no se aplica: en un lote no hay a quién preguntar, así que se
+    informa y el reporte existente queda intacto (se actualiza cargando el
+    archivo individualmente).
+
+    Escribe en la base: se llama desde el hilo de la GUI, igual que el
+    resto de las escrituras. `registros` es solo la vista previa: el
+    archivo se vuelve a leer en streaming al guardar, y uno que no se pudo
+    leer completo no se guarda. Devuelve un ResultadoImportacion.
+    """
+    if error or not registros:
+        mensaje = error or "El archivo no contiene registros de ventas."
+        return ResultadoImportacion(ruta, False, mensaje, metadata, registros, False)
+
+    existente = db_manager.buscar_reporte_importado(metadata)
+    if existente and existente[1] == "archivo":
+        mensaje = f"Este archivo ya fue importado (Reporte ID: {existente[0]})."
+        return ResultadoImportacion(ruta, False, mensaje, metadata, registros, True)
+    if existente:
+        mensaje = (
+            f"Ya existe el reporte ID {existente[0]} para este periodo. "
+            "Cárguelo individualmente para actualizarlo."
+        )
+        return ResultadoImportacion(ruta, False, mensaje, metadata, registros, False)
+
+    ok, mensaje = guardar_archivo(
+        db_manager, ruta, metadata, actualizar_existente=False
+    )
+    return ResultadoImportacion(ruta, ok, mensaje, metadata, registros, False)
+
+
+def importar_reportes(db_manager, rutas, max_procesos=None, cancelado=None):
+    """
+    Parsea y guarda varios reportes en el hilo que llama (parsear_reportes +
+    guardar_parseado). Genera un ResultadoImportacion por archivo en orden
+    de finalización.
+    """
+    for parseado in parsear_reportes(rutas, max_procesos, cancelado):
+        yield guardar_parseado(db_manager, *parseado)
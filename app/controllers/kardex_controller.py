@@ -1,5 +1,11 @@
 # [FILE: app/controllers/kardex_controller.py]
+from app.controllers.recetas_cache import obtener_explosion
+
+
 class KardexController:
+    # Máximo de IDs por cláusula IN (límite de variables de SQLite)
+    CHUNK_IDS = 500
+
     def __init__(self, db_manager):
         self.db = db_manager
 
@@ -49,68 +55,192 @@ class KardexController:
             print(f"Error en Kardex: {e}")
             raise e
 
-    def procesar_baja_por_ventas(self, reporte_ids):
+    def procesar_baja_por_ventas(self, registro_ids, dry_run=False):
         """
-        Recorre una lista de IDs de 'ventas_reporte_semanal', busca sus recetas
-        y descuenta los insumos del inventario.
-        """
-        count_movimientos = 0
-        errores = []
+        Descuenta del inventario los insumos consumidos por los registros de
+        'registro_ventas_diarias' indicados, en lote y en una sola transacción (db.transaction()).
 
-        for venta_id in reporte_ids:
-            # Obtener datos de la venta
-            venta = self.db.fetch_one(
-                """
-                SELECT codigo_producto, cantidad, nombre_producto, inventario_descontado 
-                FROM ventas_reporte_semanal WHERE id=?
-            """,
-                (venta_id,),
-            )
+        Las recetas se resuelven con una única consulta (JOIN), los consumos se
+        acumulan en memoria por (registro, insumo) y el stock y el kardex se
+        escriben con executemany.
 
-            if not venta:
-                continue
-            codigo, cantidad_vendida, nombre_prod, descontado = venta
+        dry_run=True: no escribe nada y retorna (movimientos_planificados, errores).
+        dry_run=False: retorna (cantidad_movimientos, errores).
+
+        La planificación se hace dentro de la transacción, con el escritor
+        tomado, y cada registro se marca solo si seguía pendiente
+        (inventario_descontado=0): dos bajas simultáneas sobre los mismos
+        registros no descuentan dos veces. El stock se actualiza en relativo
+        (stock_actual - consumo), no con el valor leído al planificar.
+        """
+        if dry_run:
+            movimientos, _, errores = self._planificar_baja_por_ventas(registro_ids)
+            return movimientos, errores
 
-            if descontado:
-                continue  # Ya fue procesado
+        try:
+            with self.db.transaction():
+                movimientos, registros, errores = self._planificar_baja_por_ventas(
+                    registro_ids
+                )
 
-            # Buscar el menu_item y su receta
-            menu_item = self.db.fetch_one(
-                "SELECT id FROM menu_items WHERE codigo=?", (codigo,)
-            )
+                # Marcar registros como procesados (incluye días sin recetas);
+                # si otro proceso ya lo marcó, sus movimientos se descartan
+                marcados = set()
+                for i in range(0, len(registros), self.CHUNK_IDS):
+                    bloque = tuple(registros[i : i + self.CHUNK_IDS])
+                    marcas = ",".join("?" * len(bloque))
+                    cur = self.db.execute_query(
+                        f"""
+                        UPDATE registro_ventas_diarias SET inventario_descontado=1
+                        WHERE id IN ({marcas}) AND COALESCE(inventario_descontado, 0) = 0
+                        RETURNING id
+                    """,
+                        bloque,
+                    )
+                    marcados.update(row[0] for row in cur.fetchall())
+                if len(marcados) < len(registros):
+                    movimientos = self._encadenar_stock(movimientos, marcados)
 
-            if menu_item:
-                menu_item_id = menu_item[0]
-                # Obtener ingredientes
-                ingredientes = self.db.fetch_all(
+                consumo = {}
+                for mov in movimientos:
+                    consumo[mov["insumo_id"]] = (
+                        consumo.get(mov["insumo_id"], 0.0) - mov["cantidad"]
+                    )
+                self.db.execute_many(
+                    "UPDATE insumos SET stock_actual = COALESCE(stock_actual, 0) - ? WHERE id=?",
+                    [(total, insumo_id) for insumo_id, total in consumo.items()],
+                )
+                self.db.execute_many(
                     """
-                    SELECT insumo_id, cantidad_necesaria 
-                    FROM recetas WHERE menu_item_id=?
+                    INSERT INTO movimientos_inventario 
+                    (insumo_id, tipo_movimiento, cantidad, stock_anterior, stock_nuevo, referencia_id, observacion)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                    [
+                        (
+                            m["insumo_id"],
+                            "VENTA",
+                            m["cantidad"],
+                            m["stock_anterior"],
+                            m["stock_nuevo"],
+                            m["referencia_id"],
+                            m["observacion"],
+                        )
+                        for m in movimientos
+                    ],
+                )
+        except Exception as e:
+            print(f"Error en Kardex: {e}")
+            raise e
+
+        return len(movimientos), errores
+
+    @staticmethod
+    def _encadenar_stock(movimientos, registros):
+        """
+        Deja solo los movimientos de `registros` y recalcula su cadena
+        stock_anterior -> stock_nuevo desde el stock inicial de cada insumo.
+        """
+        stock = {}
+        for mov in movimientos:
+            stock.setdefault(mov["insumo_id"], mov["stock_anterior"])
+        quedan = []
+        for mov in movimientos:
+            if mov["referencia_id"] not in registros:
+                continue
+            mov["stock_anterior"] = stock[mov["insumo_id"]]
+            mov["stock_nuevo"] = mov["stock_anterior"] + mov["cantidad"]
+            stock[mov["insumo_id"]] = mov["stock_nuevo"]
+            quedan.append(mov)
+        return quedan
+
+    def _planificar_baja_por_ventas(self, registro_ids):
+        """
+        Calcula los movimientos de salida sin tocar la base de datos.
+        Retorna (movimientos, ids_registros_pendientes, errores).
+        """
+        ids = sorted({int(rid) for rid in registro_ids if rid is not None})
+        filas = []
+        pendientes = []
+        for i in range(0, len(ids), self.CHUNK_IDS):
+            bloque = tuple(ids[i : i + self.CHUNK_IDS])
+            marcas = ",".join("?" * len(bloque))
+            pendientes.extend(
+                self.db.fetch_all(
+                    f"""
+                    SELECT id, fecha FROM registro_ventas_diarias
+                    WHERE id IN ({marcas}) AND COALESCE(inventario_descontado, 0) = 0
                 """,
-                    (menu_item_id,),
+                    bloque,
                 )
+            )
+            filas.extend(
+                self.db.fetch_all(
+                    f"""
+                    SELECT rv.id, d.menu_item_id, d.cantidad
+                    FROM registro_ventas_diarias rv
+                    JOIN detalle_ventas_diarias d ON d.registro_diario_id = rv.id
+                    WHERE rv.id IN ({marcas}) AND COALESCE(rv.inventario_descontado, 0) = 0
+                """,
+                    bloque,
+                )
+            )
+        # Orden cronológico para encadenar stock_anterior -> stock_nuevo
+        pendientes.sort(key=lambda p: (p[1] or "", p[0]))
 
-                if ingredientes:
-                    for insumo_id, cant_receta in ingredientes:
-                        # CALCULO: Cantidad Vendida * Cantidad Receta
-                        # Salida es negativa
-                        cantidad_baja = -1 * (cantidad_vendida * cant_receta)
+        # Consumo acumulado por registro e insumo
+        consumos = {}
+        errores = []
+        sin_receta = set()
+        explosion = obtener_explosion(self.db)
+        for rid, menu_item_id, cant_vendida in filas:
+            codigo = explosion.codigo_de(menu_item_id)
+            if codigo is None:
+                continue
+            vector = explosion.vector(codigo)
+            if not vector:
+                if codigo not in sin_receta:
+                    sin_receta.add(codigo)
+                    errores.append(
+                        f"Producto sin receta: {codigo} - {explosion.nombre(codigo)}"
+                    )
+                continue
+            por_registro = consumos.setdefault(rid, {})
+            for insumo_id, cant_receta in vector:
+                por_registro[insumo_id] = por_registro.get(insumo_id, 0.0) + (
+                    (cant_vendida or 0.0) * cant_receta
+                )
 
-                        self.registrar_movimiento(
-                            insumo_id,
-                            cantidad_baja,
-                            "VENTA",
-                            venta_id,
-                            f"Venta: {nombre_prod}",
-                        )
-                        count_movimientos += 1
+        stock = {
+            row[0]: row[1] or 0.0
+            for row in self.db.fetch_all("SELECT id, stock_actual FROM insumos")
+        }
 
-                # Marcar venta como procesada
-                self.db.execute_query(
-                    "UPDATE ventas_reporte_semanal SET inventario_descontado=1 WHERE id=?",
-                    (venta_id,),
+        movimientos = []
+        no_encontrados = set()
+        for rid, fecha in pendientes:
+            for insumo_id, consumo in sorted(consumos.get(rid, {}).items()):
+                if insumo_id not in stock:
+                    if insumo_id not in no_encontrados:
+                        no_encontrados.add(insumo_id)
+                        errores.append(f"Insumo ID {insumo_id} no encontrado.")
+                    continue
+                if consumo == 0:
+                    continue
+                # Salida es negativa
+                cantidad_baja = -consumo
+                stock_anterior = stock[insumo_id]
+                stock_nuevo = stock_anterior + cantidad_baja
+                stock[insumo_id] = stock_nuevo
+                movimientos.append(
+                    {
+                        "insumo_id": insumo_id,
+                        "cantidad": cantidad_baja,
+                        "stock_anterior": stock_anterior,
+                        "stock_nuevo": stock_nuevo,
+                        "referencia_id": rid,
+                        "observacion": f"Venta diaria: {fecha}",
+                    }
                 )
-            else:
-                errores.append(f"Producto sin enlace al menú: {codigo} - {nombre_prod}")
 
-        return count_movimientos, errores
+        return movimientos, [p[0] for p in pendientes], errores
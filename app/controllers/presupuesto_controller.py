@@ -0,0 +1,345 @@
+import json
+import math
+
+from app.controllers.recetas_cache import obtener_explosion
+from app.controllers.report_parser import NOMBRES_DIA
+
+
+class PresupuestoController:
+    """
+    Motor de cálculo de presupuestos de compra a partir de reportes de ventas.
+
+    Carga ventas, insumos y presentaciones en tres consultas y obtiene el
+    requerimiento de cada insumo como el producto (disperso) del vector de
+    ventas mensuales por plato por la matriz de recetas plato × insumo, que
+    se lee de la explosión de recetas en memoria (ver recetas_cache).
+
+    El detalle de cálculo de cada línea se guarda como JSON compacto y solo
+    se convierte a HTML cuando el usuario lo abre (ver renderizar_detalle).
+    """
+
+    SEMANAS_POR_MES = 4.0
+    QUERY_DETALLE_INSERT = """
+        INSERT INTO detalle_presupuestos
+        (presupuesto_id, categoria_nombre, insumo_nombre, unidad_nombre, cantidad_requerida, monto_estimado, items_menu, detalle_calculo, porcentaje_usado)
+        VALUES (?,?,?,?,?,?,?,?,?)
+    """
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+
+    # ------------------------------------------------------------------
+    # Carga masiva
+    # ------------------------------------------------------------------
+    def _porcentaje_promedio(self, reportes_ids, placeholders):
+        row = self.db.fetch_one(
+            f"SELECT AVG(porcentaje_sugerido) FROM reportes_ventas WHERE id IN ({placeholders})",
+            tuple(reportes_ids),
+        )
+        return float(row[0]) if row and row[0] else 0.0
+
+    def _cargar_ventas(self, reportes_ids, placeholders):
+        """
+        Ventas mensuales proyectadas por código: {cod: (dias, total_mensual)}.
+        El promedio diario es la suma de todos los reportes entre su cantidad.
+        Las filas sin plato en el menú (menu_item_id NULL) no aportan.
+        """
+        rows = self.db.fetch_all(
+            f"""
+            SELECT menu_item_id, dia_num, SUM(promedio_medida)
+            FROM detalle_reportes_ventas
+            WHERE reporte_id IN ({placeholders})
+              AND menu_item_id IS NOT NULL AND dia_num IS NOT NULL
+            GROUP BY menu_item_id, dia_num
+            ORDER BY menu_item_id, dia_num
+            """,
+            tuple(reportes_ids),
+        )
+        total_reportes = len(reportes_ids)
+        explosion = obtener_explosion(self.db)
+
+        dias_por_codigo = {}
+        for menu_item_id, dia_num, cant in rows:
+            cod = explosion.codigo_de(menu_item_id)
+            if cod is None:
+                continue
+            dias = dias_por_codigo.setdefault(cod, {})
+            dias[NOMBRES_DIA[dia_num]] = (cant or 0.0) / total_reportes
+
+        return {
+            cod: (dias, sum(dias.values()) * self.SEMANAS_POR_MES)
+            for cod, dias in dias_por_codigo.items()
+        }
+
+    def _cargar_insumos(self):
+        """Datos de cada insumo: {id: (nombre, categoria, abreviatura, costo_unitario)}."""
+        rows = self.db.fetch_all(
+            """
+            SELECT i.id, i.nombre, c.nombre, u.abreviatura, i.costo_unitario
+            FROM insumos i
+            LEFT JOIN categorias_insumos c ON i.categoria_id = c.id
+            LEFT JOIN unidades_medida u ON i.unidad_base_id = u.id
+            """
+        )
+        return {r[0]: r[1:] for r in rows}
+
+    def _cargar_presentaciones(self):
+        """Primera presentación de compra de cada insumo: {insumo_id: (contenido, precio, nombre)}."""
+        rows = self.db.fetch_all(
+            """
+            SELECT insumo_id, cantidad_contenido, precio_compra, nombre
+            FROM presentaciones_compra
+            WHERE id IN (SELECT MIN(id) FROM presentaciones_compra GROUP BY insumo_id)
+            """
+        )
+        return {r[0]: (r[1], r[2], r[3]) for r in rows}
+
+    # ------------------------------------------------------------------
+    # Cálculo
+    # ------------------------------------------------------------------
+    def calcular(self, reportes_ids, pcts_por_insumo=None):
+        """
+        Calcula las líneas del presupuesto.
+
+        :param pcts_por_insumo: porcentaje a conservar por nombre de insumo;
+            los que no aparezcan usan el promedio de los reportes.
+        :return: (detalles, monto_total); cada detalle es la tupla que se
+            inserta en detalle_presupuestos sin el presupuesto_id.
+        """
+        pcts_por_insumo = pcts_por_insumo or {}
+        placeholders = ",".join(["?"] * len(reportes_ids))
+
+        avg_pct = self._porcentaje_promedio(reportes_ids, placeholders)
+        ventas = self._cargar_ventas(reportes_ids, placeholders)
+        insumos = self._cargar_insumos()
+        presentaciones = self._cargar_presentaciones()
+        explosion = obtener_explosion(self.db)
+
+        # Producto ventas × receta, acumulado por insumo y por plato
+        insumos_calc = {}
+        for cod, (dias, ventas_mensual) in ventas.items():
+            if ventas_mensual <= 0:
+                continue
+            menu_nom = explosion.nombre(cod)
+
+            for ins_id, cant_nec in explosion.vector(cod):
+                info = insumos.get(ins_id)
+                if info is None:
+                    continue
+
+                data = insumos_calc.get(ins_id)
+                if data is None:
+                    ins_nom, cat_nom, abrev, costo_uni = info
+                    pct = pcts_por_insumo.get(ins_nom, avg_pct)
+                    data = insumos_calc[ins_id] = {
+                        "nombre": ins_nom,
+                        "categoria": cat_nom or "Sin Categoría",
+                        "unidad_base": abrev or "Und.",
+                        "costo_unitario": costo_uni or 0.0,
+                        "pct": pct,
+                        "factor": 1.0 + pct / 100.0,
+                        "qty_base_total": 0.0,
+                        "platos": {},
+                    }
+
+                cant_amplificada = ventas_mensual * cant_nec * data["factor"]
+                data["qty_base_total"] += cant_amplificada
+
+                plato = data["platos"].get(menu_nom)
+                if plato is None:
+                    plato = data["platos"][menu_nom] = [dias, ventas_mensual, cant_nec, 0.0]
+                plato[3] += cant_amplificada
+
+        detalles = []
+        monto_total = 0.0
+        for ins_id, data in insumos_calc.items():
+            pres = presentaciones.get(ins_id)
+            if pres and pres[0] and pres[0] > 0:
+                cant_contenido, precio_pres, nombre_pres = pres
+                cant_exacta = data["qty_base_total"] / cant_contenido
+                precio = precio_pres
+                unidad_final = nombre_pres
+            else:
+                pres = None
+                cant_exacta = data["qty_base_total"]
+                precio = data["costo_unitario"]
+                unidad_final = data["unidad_base"]
+
+            cant_final = math.ceil(cant_exacta)
+            costo = cant_final * precio
+            monto_total += costo
+
+            items_str = "\n".join(
+                f"• {m_nom} ({p[3]:.2f})" for m_nom, p in data["platos"].items()
+            )
+            calculo = {
+                "nombre": data["nombre"],
+                "unidad_base": data["unidad_base"],
+                "pct": data["pct"],
+                "factor": data["factor"],
+                "qty_base_total": data["qty_base_total"],
+                "presentacion": list(pres) if pres else None,
+                "precio_uni": precio,
+                "cant_exacta": cant_exacta,
+                "cant_final": cant_final,
+                "costo": costo,
+                "unidad_final": unidad_final,
+                "platos": [[m_nom, *p] for m_nom, p in data["platos"].items()],
+            }
+
+            detalles.append(
+                (
+                    data["categoria"],
+                    data["nombre"],
+                    unidad_final,
+                    cant_final,
+                    costo,
+                    items_str,
+                    json.dumps(calculo, ensure_ascii=False, separators=(",", ":")),
+                    data["pct"],
+                )
+            )
+
+        return detalles, monto_total
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+    def generar(self, mes, anio, descripcion, reportes_ids):
+        """Crea un presupuesto nuevo. Retorna (numero, monto_total)."""
+        detalles, monto_total = self.calcular(reportes_ids)
+
+        with self.db.transaction():
+            count_res = self.db.fetch_one("SELECT COUNT(*) FROM presupuestos")
+            nuevo_num = (count_res[0] if count_res else 0) + 1
+
+            cur = self.db.execute_query(
+                "INSERT INTO presupuestos (numero, mes, anio, descripcion, monto_total) VALUES (?,?,?,?,?)",
+                (nuevo_num, mes, anio, descripcion, monto_total),
+            )
+            presupuesto_id = cur.lastrowid
+
+            self.db.execute_many(
+                "INSERT INTO presupuesto_reportes (presupuesto_id, reporte_id) VALUES (?,?)",
+                [(presupuesto_id, int(rid)) for rid in reportes_ids],
+            )
+            self.db.execute_many(
+                self.QUERY_DETALLE_INSERT,
+                [(presupuesto_id, *det) for det in detalles],
+            )
+
+        return nuevo_num, monto_total
+
+    def recalcular(self, presupuesto_id):
+        """
+        Recalcula un presupuesto con precios y recetas actuales, conservando
+        los porcentajes por insumo y las líneas agregadas manualmente.
+        Retorna False si el presupuesto no tiene reportes base.
+        """
+        reps = self.db.fetch_all(
+            "SELECT reporte_id FROM presupuesto_reportes WHERE presupuesto_id = ?",
+            (presupuesto_id,),
+        )
+        reportes_ids = [str(r[0]) for r in reps]
+        if not reportes_ids:
+            return False
+
+        pcts_existentes = {
+            nombre: float(pct)
+            for nombre, pct in self.db.fetch_all(
+                "SELECT insumo_nombre, porcentaje_usado FROM detalle_presupuestos WHERE presupuesto_id = ?",
+                (presupuesto_id,),
+            )
+            if pct is not None
+        }
+        extras = self.db.fetch_all(
+            """
+            SELECT categoria_nombre, insumo_nombre, unidad_nombre, cantidad_requerida, monto_estimado, items_menu, detalle_calculo, porcentaje_usado
+            FROM detalle_presupuestos
+            WHERE presupuesto_id = ? AND items_menu = 'Agregado Extra'
+            """,
+            (presupuesto_id,),
+        )
+
+        detalles, monto_total = self.calcular(reportes_ids, pcts_existentes)
+        monto_total += sum(ext[4] or 0.0 for ext in extras)
+
+        with self.db.transaction():
+            self.db.execute_query(
+                "DELETE FROM detalle_presupuestos WHERE presupuesto_id = ?",
+                (presupuesto_id,),
+            )
+            self.db.execute_many(
+                self.QUERY_DETALLE_INSERT,
+                [(presupuesto_id, *det) for det in detalles]
+                + [(presupuesto_id, *ext) for ext in extras],
+            )
+            self.db.execute_query(
+                "UPDATE presupuestos SET monto_total = ? WHERE id = ?",
+                (monto_total, presupuesto_id),
+            )
+        return True
+
+    # ------------------------------------------------------------------
+    # Detalle (HTML bajo demanda)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def renderizar_detalle(detalle_calculo):
+        """
+        Convierte el detalle guardado en HTML. Las líneas antiguas y las
+        editadas a mano ya guardan HTML y se devuelven tal cual.
+        """
+        if not detalle_calculo or not detalle_calculo.startswith("{"):
+            return detalle_calculo
+
+        d = json.loads(detalle_calculo)
+        abrev_base = d["unidad_base"]
+        factor_val = d["factor"]
+        unidad_final = d["unidad_final"]
+
+        det_html = "<div style='font-family: Arial, sans-serif;'>"
+        det_html += f"<h3 style='color:#2c3e50; border-bottom: 2px solid #bdc3c7; padding-bottom: 5px;'>Detalle de Cálculo: {d['nombre']}</h3>"
+        det_html += "<table width='100%' style='margin-bottom: 15px;'><tr>"
+        det_html += f"<td width='50%'><b>Unidad Base Recetas:</b> {abrev_base}</td>"
+        det_html += f"<td width='50%'><b>Porcentaje Sugerido Aplicado:</b> {d['pct']:.2f}% (Factor: {factor_val:.2f})</td>"
+        det_html += "</tr></table>"
+
+        if d["presentacion"]:
+            cant_contenido, precio_pres, nombre_pres = d["presentacion"]
+            det_html += "<div style='background-color: #e8f8f5; padding: 10px; border-radius: 4px; border: 1px solid #1abc9c; margin-bottom: 15px;'>"
+            det_html += f"<b>Presentación de Compra:</b> {nombre_pres}<br>"
+            det_html += f"<b>Contenido:</b> {cant_contenido} {abrev_base}<br>"
+            det_html += f"<b>Precio:</b> ${precio_pres:,.2f}"
+            det_html += "</div>"
+        else:
+            det_html += "<div style='background-color: #fcf3cf; padding: 10px; border-radius: 4px; border: 1px solid #f1c40f; margin-bottom: 15px;'>"
+            det_html += "<i>No tiene presentación de compra asignada. Se calcula sobre unidad base.</i><br>"
+            det_html += f"<b>Precio Unitario (Base):</b> ${d['precio_uni']:,.2f}"
+            det_html += "</div>"
+
+        det_html += "<h4 style='color:#2980b9;'>1. Requerimiento por Platos de Menú</h4>"
+        factor_str = f" x {factor_val:.2f} (Factor)" if factor_val != 1.0 else ""
+
+        for m_nom, ventas_dias, ventas_mensual, receta_cant, total_plato in d["platos"]:
+            dias_format = " | ".join(
+                f"{dia[:3].capitalize()}: {v:.1f}" for dia, v in ventas_dias.items()
+            )
+            det_html += "<div style='margin-bottom: 10px; padding: 10px; border-left: 4px solid #3498db; background-color: #f8f9fa; border-radius: 0 4px 4px 0;'>"
+            det_html += f"<b style='color:#2c3e50; font-size: 14px;'>{m_nom}</b><br>"
+            det_html += "<table width='100%' style='font-size: 12px; margin-top: 5px; color: #555;'>"
+            det_html += f"<tr><td width='35%'><b>Ventas Diario (Promedio):</b></td><td>[{dias_format}]</td></tr>"
+            det_html += f"<tr><td><b>Ventas Mensual Proyectado:</b></td><td>{ventas_mensual:.2f} platos vendidos</td></tr>"
+            det_html += f"<tr><td><b>Requerido en Receta:</b></td><td>{receta_cant:.4f} {abrev_base} por plato</td></tr>"
+            det_html += "</table>"
+            det_html += "<div style='margin-top: 6px; padding-top: 6px; border-top: 1px dashed #ccc; font-family: monospace; font-size: 13px;'>"
+            det_html += f"Fórmula: {ventas_mensual:.2f} platos x {receta_cant:.4f} {abrev_base}{factor_str} = <b style='color: #c0392b;'>{total_plato:.2f} {abrev_base}</b>"
+            det_html += "</div></div>"
+
+        det_html += "<h4 style='color:#27ae60; margin-top: 20px;'>2. Conversión a Compras y Costo Final</h4>"
+        det_html += "<ul style='font-size: 14px; background-color: #ecf0f1; padding: 15px 15px 15px 35px; border-radius: 5px;'>"
+        det_html += f"<li style='margin-bottom: 5px;'><b>Total Base Requerido (Suma Platos):</b> {d['qty_base_total']:.2f} {abrev_base}</li>"
+        det_html += f"<li style='margin-bottom: 5px;'><b>Cantidad Exacta de Compra:</b> {d['cant_exacta']:.2f} {unidad_final}</li>"
+        det_html += f"<li style='margin-bottom: 5px; color: #c0392b;'><b>Cantidad a Comprar (Redondeada):</b> <span style='background-color:#f1c40f; padding: 2px 5px; border-radius: 3px; font-weight: bold; color: #2c3e50;'>{int(d['cant_final'])} {unidad_final}</span></li>"
+        det_html += f"<li><b>Costo Estimado:</b> ${d['costo']:,.2f}</li>"
+        det_html += "</ul></div>"
+        return det_html
@@ -0,0 +1,103 @@
+import threading
+
+
+class ExplosionRecetas:
+    """
+    Explosión de recetas en memoria: código de menú -> vector disperso
+    ((insumo_id, cantidad), ...).
+
+    Se construye con una sola consulta la primera vez que se usa y se
+    reconstruye después de invalidar_recetas(), que deben llamar las
+    pantallas que escriben en recetas, menu_items o insumos.
+    """
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self._lock = threading.Lock()
+        self._vectores = None
+        self._platos = {}
+        self._codigo_por_id = {}
+        self._usos = None
+
+    def invalidar(self):
+        with self._lock:
+            self._vectores = None
+            self._usos = None
+
+    def _asegurar(self):
+        if self._vectores is not None:
+            return
+        with self._lock:
+            if self._vectores is not None:
+                return
+            rows = self.db.fetch_all(
+                """
+                SELECT m.id, m.codigo, m.nombre, r.insumo_id, r.cantidad_necesaria
+                FROM menu_items m
+                LEFT JOIN recetas r ON r.menu_item_id = m.id
+                ORDER BY m.id, r.id
+                """
+            )
+            acumulado = {}
+            platos = {}
+            codigo_por_id = {}
+            for menu_id, codigo, nombre, insumo_id, cantidad in rows:
+                platos[codigo] = (menu_id, nombre)
+                codigo_por_id[menu_id] = codigo
+                vector = acumulado.setdefault(codigo, {})
+                if insumo_id is not None:
+                    # Un insumo repetido en la misma receta se suma
+                    vector[insumo_id] = vector.get(insumo_id, 0.0) + (cantidad or 0.0)
+
+            self._platos = platos
+            self._codigo_por_id = codigo_por_id
+            self._vectores = {
+                codigo: tuple(vector.items()) for codigo, vector in acumulado.items()
+            }
+
+    def vector(self, codigo):
+        """((insumo_id, cantidad), ...) del plato; vacío si no existe o no tiene receta."""
+        self._asegurar()
+        return self._vectores.get(codigo, ())
+
+    def codigo_de(self, menu_item_id):
+        self._asegurar()
+        return self._codigo_por_id.get(menu_item_id)
+
+    def nombre(self, codigo):
+        self._asegurar()
+        plato = self._platos.get(codigo)
+        return plato[1] if plato else None
+
+    def usos_por_insumo(self):
+        """Vista inversa: {insumo_id: [(codigo, nombre_plato, cantidad), ...]}."""
+        self._asegurar()
+        usos = self._usos
+        if usos is None:
+            usos = {}
+            for codigo, vector in self._vectores.items():
+                nombre = self._platos[codigo][1]
+                for insumo_id, cantidad in vector:
+                    usos.setdefault(insumo_id, []).append((codigo, nombre, cantidad))
+            self._usos = usos
+        return usos
+
+
+_explosiones = {}
+_lock_registro = threading.Lock()
+
+
+def obtener_explosion(db_manager):
+    """Instancia compartida para la base de datos abierta en db_manager."""
+    with _lock_registro:
+        explosion = _explosiones.get(db_manager.db_path)
+        if explosion is None or explosion.db is not db_manager:
+            explosion = _explosiones[db_manager.db_path] = ExplosionRecetas(db_manager)
+        return explosion
+
+
+def invalidar_recetas(db_manager):
+    with _lock_registro:
+        explosion = _explosiones.get(db_manager.db_path)
+    if explosion is not None:
+        explosion.invalidar()
@@ -1,9 +1,110 @@
+import codecs
+import hashlib
+import itertools
+import logging
+import os
 import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Fila de datos del reporte (una por producto y día de la semana)
+RegistroVenta = namedtuple(
+    "RegistroVenta",
+    [
+        "code",
+        "desc",
+        "day",
+        "qty",
+        "prom",
+        "prom_med",
+        "estim_med",
+        "total_venta",
+        "total_costo",
+        "total_utilidad",
+        "pct_utilidad",
+        "dia_num",  # 0 = lunes ... 6 = domingo (ver numero_dia)
+    ],
+)
+
+METADATA_VACIA = {
+    "desde": "N/A",
+    "hasta": "N/A",
+    "pct_sugerido": 0.0,
+    "huella_archivo": None,
+    "total_registros": 0,
+}
+LINEAS_METADATA = 15
+# Registros que la vista previa guarda en memoria (el resto solo se cuenta)
+LIMITE_VISTA_PREVIA = 2000
+BYTES_MUESTRA = 64 * 1024
+EXTENSIONES_EXCEL = (".xlsx", ".xlsm")
+# Nombre del día (normalizado) -> número, con lunes = 0 como date.weekday()
+NUMERO_DIA = {
+    "lunes": 0,
+    "martes": 1,
+    "miercoles": 2,
+    "jueves": 3,
+    "viernes": 4,
+    "sabado": 5,
+    "domingo": 6,
+}
+# Abreviaturas que pueden traer reportes antiguos (no se aceptan al parsear)
+_ABREVIATURAS_DIA = {nombre[:3]: numero for nombre, numero in NUMERO_DIA.items()}
+NOMBRES_DIA = ("lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo")
+
+
+@lru_cache(maxsize=4096)
+def _normalizar(text):
+    return (
+        "".join(
+            c
+            for c in unicodedata.normalize("NFD", text)
+            if unicodedata.category(c) != "Mn"
+        )
+        .lower()
+        .strip()
+    )
+
+
+def numero_dia(texto):
+    """
+    Número de día (0 = lunes ... 6 = domingo) para el texto de dia_semana,
+    con o sin tildes y en nombre completo o abreviado; None si no es un día.
+    """
+    clave = _normalizar(str(texto or ""))
+    numero = NUMERO_DIA.get(clave)
+    if numero is None:
+        numero = _ABREVIATURAS_DIA.get(clave)
+    return numero
+
+
+def _texto_celda(cell):
+    """
+    Valor de una celda de Excel como lo escribiría el POS en el CSV, para
+    que el mismo parser sirva para ambos formatos: montos con 'B/.',
+    porcentajes con '%' y fechas dd/mm/aaaa.
+    """
+    valor = cell.value
+    if valor is None:
+        return ""
+    if hasattr(valor, "strftime"):
+        return valor.strftime("%d/%m/%Y")
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        formato = getattr(cell, "number_format", "") or ""
+        if "B/" in formato:
+            return f"B/.{valor:.2f}"
+        if "%" in formato:
+            return f"{valor * 100:.2f}%"
+        return ("%.6f" % valor).rstrip("0").rstrip(".")
+    return str(valor)
 
 
 class ReportParser:
     """
-    Clase encargada de interpretar archivos CSV del reporte de ventas MENSUAL.
+    Clase encargada de interpretar el reporte de ventas MENSUAL del POS,
+    exportado como CSV (separado por ';') o como libro de Excel (.xlsx).
     Adaptada para leer estructura jerárquica (Categoria/Producto -> Filas de días).
     """
 
@@ -12,15 +113,7 @@ class ReportParser:
         """Elimina acentos y convierte a minúsculas."""
         if not text:
             return ""
-        return (
-            "".join(
-                c
-                for c in unicodedata.normalize("NFD", text)
-                if unicodedata.category(c) != "Mn"
-            )
-            .lower()
-            .strip()
-        )
+        return _normalizar(text)
 
     @staticmethod
     def clean_currency(value_str):
@@ -39,160 +132,274 @@ class ReportParser:
             return 0.0
 
     @staticmethod
-    def parse_csv(file_path):
-        metadata = {
-            "desde": "N/A",
-            "hasta": "N/A",
-            "pct_sugerido": 0.0,
-        }  # NUEVO: pct_sugerido
+    def parse_csv(file_path, limite=None):
+        """
+        Lee el reporte para la vista previa: guarda hasta `limite` registros
+        (todos si es None) y cuenta el total en metadata["total_registros"].
+        Acepta CSV o Excel según la extensión (ver abrir_reporte). Para
+        guardar en la base se usa abrir_reporte, que no materializa las filas.
+        Devuelve (metadata, lista de RegistroVenta, error).
+        """
+        metadata = dict(METADATA_VACIA)
         records = []
+        total = 0
+        error = None
+        try:
+            metadata, registros = ReportParser.abrir_reporte(file_path)
+            if registros is None:
+                error = "Error: No se pudo leer el archivo."
+            else:
+                for registro in registros:
+                    if limite is None or total < limite:
+                        records.append(registro)
+                    total += 1
+        except ValueError as e:
+            error = f"Error: {str(e)}"
+        except Exception as e:
+            error = f"Error inesperado parsing: {str(e)}"
+        metadata["total_registros"] = total
+        return metadata, records, error
 
-        lines = []
-        encodings = ["utf-8", "latin-1", "cp1252"]
-        for enc in encodings:
-            try:
-                with open(file_path, "r", encoding=enc) as f:
-                    lines = f.readlines()
-                break
-            except UnicodeDecodeError:
-                continue
+    @staticmethod
+    def abrir_reporte(file_path):
+        """
+        Abre el reporte en modo streaming.
 
-        if not lines:
-            return metadata, records, "Error: No se pudo leer el archivo."
+        Lee solo las primeras filas para extraer los metadatos y devuelve
+        (metadata, generador de RegistroVenta); el resto del archivo se va
+        leyendo a medida que se consume el generador. Si el archivo está
+        vacío el generador es None.
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".xls":
+            # openpyxl solo lee el formato moderno (Office Open XML)
+            raise ValueError(
+                "El formato .xls (Excel 97-2003) no es compatible. "
+                "Guarde el reporte como .xlsx o expórtelo a CSV."
+            )
 
-        # Variables de estado
-        current_product_desc = "DESCONOCIDO"
-        valid_days_norm = [
-            "domingo",
-            "lunes",
-            "martes",
-            "miercoles",
-            "jueves",
-            "viernes",
-            "sabado",
-        ]
+        metadata = dict(METADATA_VACIA)
+        metadata["huella_archivo"] = ReportParser.huella_archivo(file_path)
+        if extension in EXTENSIONES_EXCEL:
+            filas = ReportParser._leer_filas_excel(file_path)
+        else:
+            filas = ReportParser._leer_filas_csv(file_path)
+
+        cabecera = list(itertools.islice(filas, LINEAS_METADATA))
+        if not cabecera:
+            filas.close()
+            return metadata, None
+
+        for cells in cabecera:
+            ReportParser._extraer_metadata([c.strip() for c in cells], metadata)
+
+        return metadata, ReportParser._registros(cabecera, filas)
 
+    @staticmethod
+    def _registros(cabecera, filas):
         try:
-            for line_idx, line in enumerate(lines):
-                cells = [c.strip() for c in line.split(";")]
-                cells_norm = [ReportParser.normalize_text(c) for c in cells]
-
-                # 1. Extracción de Metadatos (Fechas y % Sugerido)
-                if line_idx < 15:
-                    for i, cell in enumerate(cells_norm):
-                        if "desde" in cell and i + 1 < len(cells):
-                            # Buscar valor en celdas adyacentes vacías
-                            val = ReportParser._find_next_value(cells, i)
-                            if val:
-                                metadata["desde"] = val
-                        if "hasta" in cell and i + 1 < len(cells):
-                            val = ReportParser._find_next_value(cells, i)
-                            if val:
-                                metadata["hasta"] = val
-                        # --- NUEVO: Capturar el % Sugerido ---
-                        if "sugerido" in cell and i + 1 < len(cells):
-                            val = ReportParser._find_next_value(cells, i)
-                            if val:
-                                try:
-                                    metadata["pct_sugerido"] = float(
-                                        val.replace(",", ".").replace("%", "")
-                                    )
-                                except ValueError:
-                                    pass
-
-                # 2. Detección de filas
-                if len(cells) < 8:
-                    continue
-
-                col_1_code = cells[1]
-                col_5_desc = cells[5] if len(cells) > 5 else ""
-                col_7_day = cells[7] if len(cells) > 7 else ""
-
-                norm_day = ReportParser.normalize_text(col_7_day)
-
-                # CASO A: Fila de Encabezado de Producto
-                if (
-                    not col_1_code
-                    and col_5_desc
-                    and "promed" not in ReportParser.normalize_text(col_5_desc)
-                ):
-                    if "descripcion" not in ReportParser.normalize_text(col_5_desc):
-                        current_product_desc = col_5_desc
-
-                # CASO B: Fila de Datos
-                if col_1_code and norm_day in valid_days_norm:
-                    qty_raw = cells[10] if len(cells) > 10 else "0"
-
-                    prom_raw = "0"
-                    estim_raw = "0"
-
-                    # Extracción heurística de Promedio y Estimado
-                    if len(cells) > 12:
-                        for offset in range(3):
-                            idx = 12 + offset
-                            if idx < len(cells) and cells[idx].strip():
-                                prom_raw = cells[idx]
-                                # Buscar el estimado en la siguiente celda no vacía
-                                for j in range(idx + 1, min(idx + 4, len(cells))):
-                                    if cells[j].strip():
-                                        estim_raw = cells[j]
-                                        break
-                                break
+            yield from ReportParser._iter_registros(itertools.chain(cabecera, filas))
+        finally:
+            # Libera el archivo (o el libro de Excel en modo read_only) aunque
+            # el generador no se consuma entero
+            filas.close()
+
+    @staticmethod
+    def huella_archivo(file_path):
+        """sha256 del contenido del archivo, leído por bloques."""
+        huella = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for bloque in iter(lambda: f.read(BYTES_MUESTRA), b""):
+                huella.update(bloque)
+        return huella.hexdigest()
+
+    @staticmethod
+    def _detectar_codificacion(file_path):
+        """Decide la codificación mirando solo el inicio del archivo."""
+        with open(file_path, "rb") as f:
+            muestra = f.read(BYTES_MUESTRA)
+        try:
+            # final=False: una secuencia multibyte cortada al final no es error
+            codecs.getincrementaldecoder("utf-8")().decode(muestra, final=False)
+            return "utf-8"
+        except UnicodeDecodeError:
+            # latin-1 acepta cualquier byte (los exportes del POS vienen así)
+            return "latin-1"
+
+    @staticmethod
+    def _leer_lineas(file_path):
+        """
+        Líneas del archivo en la codificación detectada. Si más allá de la
+        muestra aparece un byte que no es UTF-8, el archivo se retoma desde
+        la primera línea no entregada decodificando línea por línea, y solo
+        las que fallan se leen como latin-1 (en vez de reemplazar
+        caracteres).
+        """
+        encoding = ReportParser._detectar_codificacion(file_path)
+        leidas = 0
+        try:
+            with open(file_path, "r", encoding=encoding) as f:
+                for leidas, linea in enumerate(f, 1):
+                    yield linea
+            return
+        except UnicodeDecodeError as e:
+            logger.warning(
+                "%s no es %s después de la línea %d (%s); las líneas inválidas se leen como latin-1",
+                os.path.basename(file_path),
+                encoding,
+                leidas,
+                e.reason,
+            )
+
+        latin1 = 0
+        # latin-1 corta las líneas igual que el modo texto (\r, \n y \r\n) y
+        # conserva los bytes, así que cada línea se puede volver a decodificar
+        with open(file_path, "r", encoding="latin-1") as f:
+            for linea in itertools.islice(f, leidas, None):
+                try:
+                    linea = linea.encode("latin-1").decode(encoding)
+                except UnicodeDecodeError:
+                    latin1 += 1
+                yield linea
+        logger.info(
+            "%s: %d líneas leídas como latin-1", os.path.basename(file_path), latin1
+        )
+
+    @staticmethod
+    def _leer_filas_csv(file_path):
+        for line in ReportParser._leer_lineas(file_path):
+            yield line.split(";")
+
+    @staticmethod
+    def _leer_filas_excel(file_path):
+        """
+        Filas de la primera hoja como listas de texto. read_only hace que
+        openpyxl lea la hoja en streaming: la memoria no crece con el tamaño.
+        """
+        from openpyxl import load_workbook
 
-                    total_venta_raw = "0"
-                    total_costo_raw = "0"
-                    total_util_raw = "0"
-                    pct_util_raw = "0%"
-
-                    # Búsqueda heurística de montos monetarios y porcentajes
-                    money_values = []
-                    for k in range(14, len(cells)):
-                        if "B/." in cells[k] or "B/" in cells[k]:
-                            money_values.append(cells[k])
-                        elif "%" in cells[k]:
-                            pct_util_raw = cells[k].strip()
-
-                    if len(money_values) >= 1:
-                        total_venta_raw = money_values[0]
-                    if len(money_values) >= 2:
-                        total_costo_raw = money_values[1]
-                    if len(money_values) >= 3:
-                        total_util_raw = money_values[2]
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            ws = wb.worksheets[0]
+            for row in ws.iter_rows():
+                yield [_texto_celda(cell) for cell in row]
+        finally:
+            wb.close()
 
+    @staticmethod
+    def _extraer_metadata(cells, metadata):
+        """Fechas y % Sugerido de las líneas de cabecera."""
+        for i, cell in enumerate(cells):
+            if not cell or i + 1 >= len(cells):
+                continue
+            cell_norm = _normalizar(cell)
+            if "desde" in cell_norm:
+                # Buscar valor en celdas adyacentes vacías
+                val = ReportParser._find_next_value(cells, i)
+                if val:
+                    metadata["desde"] = val
+            if "hasta" in cell_norm:
+                val = ReportParser._find_next_value(cells, i)
+                if val:
+                    metadata["hasta"] = val
+            if "sugerido" in cell_norm:
+                val = ReportParser._find_next_value(cells, i)
+                if val:
                     try:
-                        qty = float(qty_raw.replace(",", ""))
-                        prom = (
-                            float(prom_raw.replace(",", ""))
-                            if prom_raw.replace(".", "").isdigit()
-                            else 0.0
+                        metadata["pct_sugerido"] = float(
+                            val.replace(",", ".").replace("%", "")
                         )
-                        total_venta = ReportParser.clean_currency(total_venta_raw)
-                        total_costo = ReportParser.clean_currency(total_costo_raw)
-                        total_util = ReportParser.clean_currency(total_util_raw)
-
-                        records.append(
-                            {
-                                "code": col_1_code,
-                                "desc": current_product_desc,
-                                "day": col_7_day,
-                                "qty": qty,
-                                "prom": prom,  # Para compatibilidad con connection.py
-                                "prom_med": prom_raw,  # Para la UI
-                                "estim_med": estim_raw,  # Nuevo
-                                "total_venta": total_venta,
-                                "total_costo": total_costo,
-                                "total_utilidad": total_util,
-                                "pct_utilidad": pct_util_raw,  # Nuevo
-                            }
-                        )
-
                     except ValueError:
-                        continue
+                        pass
 
-            return metadata, records, None
+    @staticmethod
+    def _iter_registros(filas):
+        # Variables de estado
+        current_product_desc = "DESCONOCIDO"
 
-        except Exception as e:
-            return metadata, records, f"Error inesperado parsing: {str(e)}"
+        for cells in filas:
+            # Detección de filas
+            if len(cells) < 8:
+                continue
+            cells = [c.strip() for c in cells]
+
+            col_1_code = cells[1]
+            col_5_desc = cells[5]
+            col_7_day = cells[7]
+
+            # CASO A: Fila de Encabezado de Producto
+            if not col_1_code and col_5_desc:
+                desc_norm = _normalizar(col_5_desc)
+                if "promed" not in desc_norm and "descripcion" not in desc_norm:
+                    current_product_desc = col_5_desc
+
+            # CASO B: Fila de Datos
+            dia_num = NUMERO_DIA.get(_normalizar(col_7_day))
+            if not col_1_code or dia_num is None:
+                continue
+
+            qty_raw = cells[10] if len(cells) > 10 else "0"
+
+            prom_raw = "0"
+            estim_raw = "0"
+
+            # Extracción heurística de Promedio y Estimado
+            if len(cells) > 12:
+                for offset in range(3):
+                    idx = 12 + offset
+                    if idx < len(cells) and cells[idx]:
+                        prom_raw = cells[idx]
+                        # Buscar el estimado en la siguiente celda no vacía
+                        for j in range(idx + 1, min(idx + 4, len(cells))):
+                            if cells[j]:
+                                estim_raw = cells[j]
+                                break
+                        break
+
+            total_venta_raw = "0"
+            total_costo_raw = "0"
+            total_util_raw = "0"
+            pct_util_raw = "0%"
+
+            # Búsqueda heurística de montos monetarios y porcentajes
+            money_values = []
+            for k in range(14, len(cells)):
+                if "B/" in cells[k]:
+                    money_values.append(cells[k])
+                elif "%" in cells[k]:
+                    pct_util_raw = cells[k]
+
+            if len(money_values) >= 1:
+                total_venta_raw = money_values[0]
+            if len(money_values) >= 2:
+                total_costo_raw = money_values[1]
+            if len(money_values) >= 3:
+                total_util_raw = money_values[2]
+
+            try:
+                qty = float(qty_raw.replace(",", ""))
+                prom = (
+                    float(prom_raw.replace(",", ""))
+                    if prom_raw.replace(".", "").isdigit()
+                    else 0.0
+                )
+            except ValueError:
+                continue
+
+            yield RegistroVenta(
+                col_1_code,
+                current_product_desc,
+                col_7_day,
+                qty,
+                prom,  # Para compatibilidad con connection.py
+                prom_raw,  # Para la UI
+                estim_raw,
+                ReportParser.clean_currency(total_venta_raw),
+                ReportParser.clean_currency(total_costo_raw),
+                ReportParser.clean_currency(total_util_raw),
+                pct_util_raw,
+                dia_num,
+            )
 
     @staticmethod
     def _find_next_value(cells, start_idx):
@@ -0,0 +1,162 @@
+# [FILE: app/database/async_query.py]
+import copy
+import logging
+import sqlite3
+import time
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal, pyqtSlot
+
+logger = logging.getLogger(__name__)
+
+
+class _WorkerSignals(QObject):
+    terminado = pyqtSignal(str, int, object)
+    fallido = pyqtSignal(str, int, str)
+
+
+class ConsultaWorker(QRunnable):
+    """
+    Ejecuta `fn(conn, *args)` en el QThreadPool con el lector del pool propio
+    de su hilo y entrega el resultado por señales. `fn` no debe tocar widgets.
+    """
+
+    def __init__(self, pool, clave, generacion, fn, args):
+        super().__init__()
+        self.pool = pool
+        self.clave = clave
+        self.generacion = generacion
+        self.fn = fn
+        self.args = args
+        self.signals = _WorkerSignals()
+        self._cancelado = False
+        self._conn = None
+
+    def cancelar(self):
+        self._cancelado = True
+        conn = self._conn
+        if conn is not None:
+            try:
+                conn.interrupt()
+            except sqlite3.ProgrammingError:
+                pass
+
+    @pyqtSlot()
+    def run(self):
+        if self._cancelado:
+            return
+        t0 = time.perf_counter()
+        try:
+            with self.pool.lectura() as conn:
+                self._conn = conn
+                try:
+                    resultado = self.fn(conn, *self.args)
+                finally:
+                    self._conn = None
+        except Exception as e:
+            if not self._cancelado:
+                logger.error("Consulta '%s' falló: %s", self.clave, e)
+                self.signals.fallido.emit(self.clave, self.generacion, str(e))
+            return
+
+        if self._cancelado:
+            return
+        logger.debug(
+            "Consulta '%s' en %.1f ms", self.clave, (time.perf_counter() - t0) * 1000
+        )
+        self.signals.terminado.emit(self.clave, self.generacion, resultado)
+
+
+class AsyncQueryRunner(QObject):
+    """
+    Despacha consultas de una vista al QThreadPool global.
+
+    Cada `clave` mantiene un contador de generación: al enviar una consulta
+    nueva con la misma clave, la anterior se cancela y su resultado (si llega)
+    se descarta, de modo que solo se aplica el último filtro elegido.
+
+    También recuerda el último resultado de cada clave junto con la versión
+    de datos (pool.version_datos()): si se vuelve a pedir la misma función
+    con los mismos argumentos y no hubo commits, se entrega ese resultado
+    sin ir al QThreadPool. La clave del memo es (fn, args, versión): todo
+    dato ajeno a la base del que dependa el resultado (p. ej. la fecha de
+    hoy) debe pasarse en los argumentos. Cada callback recibe su propia copia del resultado,
+    así que puede modificarla sin alterar lo guardado.
+    """
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db = db_manager
+        self.hilos = QThreadPool.globalInstance()
+        self._generaciones = {}
+        self._activos = {}
+        self._callbacks = {}
+        self._memo = {}
+        self._pendientes = {}
+
+    def submit(self, clave, fn, *args, on_result, on_error=None, memo=True):
+        generacion = self._generaciones.get(clave, 0) + 1
+        self._generaciones[clave] = generacion
+        self.cancelar(clave)
+        self._callbacks[clave] = (on_result, on_error)
+
+        version = self.db.pool.version_datos() if memo else None
+        guardado = self._memo.get(clave)
+        if memo and guardado is not None and guardado[:3] == (fn, args, version):
+            # Sin cambios desde la última vez: se entrega igual de forma
+            # asíncrona para que el flujo del llamador no cambie.
+            self._activos[clave] = None
+            self._pendientes.pop(clave, None)
+            resultado = copy.deepcopy(guardado[3])
+            QTimer.singleShot(
+                0, lambda: self._on_terminado(clave, generacion, resultado)
+            )
+            return generacion
+
+        self._pendientes[clave] = (fn, args, version) if memo else None
+        worker = ConsultaWorker(self.db.pool, clave, generacion, fn, args)
+        worker.signals.terminado.connect(self._on_terminado)
+        worker.signals.fallido.connect(self._on_fallido)
+        self._activos[clave] = worker
+        self.hilos.start(worker)
+        return generacion
+
+    def cancelar(self, clave):
+        worker = self._activos.pop(clave, None)
+        if worker is not None:
+            worker.cancelar()
+
+    def cancelar_todo(self):
+        for clave in list(self._activos):
+            self.cancelar(clave)
+
+    def ocupado(self, clave=None):
+        if clave is None:
+            return bool(self._activos)
+        return clave in self._activos
+
+    def _vigente(self, clave, generacion):
+        # Si se canceló, la clave ya no está en _activos
+        return self._generaciones.get(clave) == generacion and clave in self._activos
+
+    @pyqtSlot(str, int, object)
+    def _on_terminado(self, clave, generacion, resultado):
+        if not self._vigente(clave, generacion):
+            return
+        self._activos.pop(clave, None)
+        pendiente = self._pendientes.pop(clave, None)
+        if pendiente is not None:
+            self._memo[clave] = pendiente + (resultado,)
+            resultado = copy.deepcopy(resultado)
+        on_result, _ = self._callbacks.pop(clave, (None, None))
+        if on_result is not None:
+            on_result(resultado)
+
+    @pyqtSlot(str, int, str)
+    def _on_fallido(self, clave, generacion, mensaje):
+        if not self._vigente(clave, generacion):
+            return
+        self._activos.pop(clave, None)
+        self._pendientes.pop(clave, None)
+        _, on_error = self._callbacks.pop(clave, (None, None))
+        if on_error is not None:
+            on_error(mensaje)
@@ -0,0 +1,114 @@
+from collections import namedtuple
+
+from app.controllers.report_parser import ReportParser
+
+# Fragmentos SQL de una búsqueda: se insertan en la consulta de la vista como
+# FROM tabla alias {join} WHERE {condicion} ORDER BY {orden}, con `params`
+# en la posición de la condición. `orden` es None si no hay relevancia.
+Busqueda = namedtuple("Busqueda", ["join", "condicion", "orden", "params"])
+
+SIN_BUSQUEDA = Busqueda("", "1=1", None, ())
+
+# entidad -> {columna del índice <entidad>_fts: expresión SQL equivalente}
+# La expresión ({a} = alias de la tabla) se usa cuando no hay FTS5.
+COLUMNAS_BUSQUEDA = {
+    "insumos": {"nombre": "{a}.nombre"},
+    "menu_items": {"codigo": "{a}.codigo", "nombre": "{a}.nombre"},
+    "proveedores": {"nombre": "{a}.nombre", "contacto": "{a}.contacto"},
+    "presentaciones": {
+        "nombre": "{a}.nombre",
+        "insumo": "(SELECT ins.nombre FROM insumos ins WHERE ins.id = {a}.insumo_id)",
+    },
+}
+
+
+def palabras(texto):
+    """Palabras de la búsqueda ya normalizadas (sin acentos, minúsculas)."""
+    return ReportParser.normalize_text(texto).replace('"', " ").split()
+
+
+def _patron_like(palabra):
+    escapada = palabra.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escapada}%"
+
+
+def condicion_contiene(expresion, texto):
+    """
+    (condicion, params) para que `expresion` contenga cada palabra de
+    `texto` sin distinguir acentos ni mayúsculas. Sirve para columnas sin
+    índice de texto (categorías, estados, números).
+    """
+    lista = palabras(texto)
+    if not lista:
+        return "1=1", ()
+    condicion = " AND ".join(
+        f"normalizar({expresion}) LIKE ? ESCAPE '\\'" for _ in lista
+    )
+    return f"({condicion})", tuple(_patron_like(p) for p in lista)
+
+
+def busqueda_texto(db, entidad, alias, texto):
+    """
+    Busqueda para las filas de `entidad` (tabla con alias `alias`) que
+    contienen el texto, sin distinguir acentos ni mayúsculas.
+
+    `texto` es un str (todas las columnas de COLUMNAS_BUSQUEDA[entidad]) o
+    un dict {columna: texto} para filtrar columnas por separado. Con el
+    índice FTS5 cada palabra se busca por prefijo y las filas se ordenan por
+    relevancia; sin él se usa normalizar(col) LIKE '%palabra%'.
+
+    Como FTS5 solo encuentra prefijos de palabra, las columnas donde se
+    busca un fragmento cualquiera (códigos como PZ1023) se filtran con
+    condicion_contiene / filtro_columnas.
+    """
+    columnas = COLUMNAS_BUSQUEDA[entidad]
+    if not isinstance(texto, dict):
+        texto = {None: texto}
+    filtros = {col: palabras(t) for col, t in texto.items()}
+    filtros = {col: lista for col, lista in filtros.items() if lista}
+    if not filtros:
+        return SIN_BUSQUEDA
+
+    tabla_fts = f"{entidad}_fts"
+    if tabla_fts in db.tablas_fts:
+        partes = []
+        for col, lista in filtros.items():
+            expresion = " ".join(f'"{p}"*' for p in lista)
+            partes.append(f"{{{col}}} : ({expresion})" if col else expresion)
+        return Busqueda(
+            f"JOIN {tabla_fts} ON {tabla_fts}.rowid = {alias}.id",
+            f"{tabla_fts} MATCH ?",
+            f"{tabla_fts}.rank",
+            (" AND ".join(partes),),
+        )
+
+    condiciones, params = [], []
+    for col, lista in filtros.items():
+        expresiones = [
+            plantilla.format(a=alias)
+            for nombre, plantilla in columnas.items()
+            if col is None or nombre == col
+        ]
+        for palabra in lista:
+            condiciones.append(
+                "("
+                + " OR ".join(f"normalizar({e}) LIKE ? ESCAPE '\\'" for e in expresiones)
+                + ")"
+            )
+            params.extend([_patron_like(palabra)] * len(expresiones))
+    return Busqueda("", " AND ".join(condiciones), None, tuple(params))
+
+
+def filtro_columnas(busqueda, columnas=()):
+    """
+    (condicion, params) para el WHERE: la condición de `busqueda` más
+    condicion_contiene(expresion, texto) por cada par de `columnas`.
+    """
+    condiciones = [busqueda.condicion]
+    params = list(busqueda.params)
+    for expresion, texto in columnas:
+        condicion, extra = condicion_contiene(expresion, texto)
+        if extra:
+            condiciones.append(condicion)
+            params.extend(extra)
+    return " AND ".join(condiciones), tuple(params)
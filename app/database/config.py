@@ -12,14 +12,75 @@ os.makedirs(APP_DIR, exist_ok=True)
 CONFIG_FILE = os.path.join(APP_DIR, "config.json")
 DEFAULT_DB = os.path.join(APP_DIR, "restaurante.db")
 
+# 4. Perfiles de conexión SQLite (clave "connection_profile" en config.json)
+#    - safe:        WAL con commit durable (synchronous FULL). Por defecto.
+#    - fast:        WAL con synchronous NORMAL, más caché y mmap.
+#    - bulk-import: para cargas masivas; sin fsync por commit.
+CONNECTION_PROFILES = {
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,  # KiB (negativo) -> ~16 MB
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,  # ms
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 268435456,  # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "bulk-import": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -200000,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+DEFAULT_PROFILE = "safe"
 
-def get_db_path():
+
+def _load_config():
     if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, "r") as f:
-            return json.load(f).get("db_path", DEFAULT_DB)
-    return DEFAULT_DB
+        try:
+            with open(CONFIG_FILE, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    return {}
 
 
-def save_db_path(path):
+def _save_config(config):
     with open(CONFIG_FILE, "w") as f:
-        json.dump({"db_path": path}, f)
+        json.dump(config, f)
+
+
+def get_db_path():
+    return _load_config().get("db_path", DEFAULT_DB)
+
+
+def save_db_path(path):
+    config = _load_config()
+    config["db_path"] = path
+    _save_config(config)
+
+
+def get_connection_profile():
+    """Retorna (nombre, pragmas) del perfil configurado; si no es válido usa el default."""
+    name = _load_config().get("connection_profile", DEFAULT_PROFILE)
+    if name not in CONNECTION_PROFILES:
+        name = DEFAULT_PROFILE
+    return name, CONNECTION_PROFILES[name]
+
+
+def save_connection_profile(name):
+    if name not in CONNECTION_PROFILES:
+        raise ValueError(f"Perfil de conexión desconocido: {name}")
+    config = _load_config()
+    config["connection_profile"] = name
+    _save_config(config)
@@ -2,12 +2,223 @@
 import sqlite3
 import os
 import hashlib
-import shutil
+import itertools
+import logging
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
+from app.database.funciones_sql import fts5_disponible, registrar_funciones
+from app.database.pool import ConnectionPool
+from app.database.query_cache import CacheConsultas
+
+logger = logging.getLogger(__name__)
+
+# Índices secundarios para los JOIN y filtros que usan las vistas.
+# (menu_items.codigo ya está indexado por su restricción UNIQUE)
+INDICES = [
+    # Reportes de ventas / presupuestos / calculadora
+    "CREATE INDEX IF NOT EXISTS idx_detalle_reportes_reporte ON detalle_reportes_ventas(reporte_id)",
+    "CREATE INDEX IF NOT EXISTS idx_detalle_reportes_codigo ON detalle_reportes_ventas(codigo_producto, dia_semana, promedio_medida)",
+    "CREATE INDEX IF NOT EXISTS idx_presupuesto_reportes_reporte ON presupuesto_reportes(reporte_id)",
+    "CREATE INDEX IF NOT EXISTS idx_detalle_presupuestos_presupuesto ON detalle_presupuestos(presupuesto_id)",
+    # Recetas (cubren menu_item -> insumo y la búsqueda inversa)
+    "CREATE INDEX IF NOT EXISTS idx_recetas_menu_item ON recetas(menu_item_id, insumo_id, cantidad_necesaria)",
+    "CREATE INDEX IF NOT EXISTS idx_recetas_insumo ON recetas(insumo_id, menu_item_id, cantidad_necesaria)",
+    # Insumos y presentaciones
+    "CREATE INDEX IF NOT EXISTS idx_insumos_categoria ON insumos(categoria_id)",
+    "CREATE INDEX IF NOT EXISTS idx_insumos_grupo ON insumos(grupo_calculo)",
+    "CREATE INDEX IF NOT EXISTS idx_presentaciones_insumo ON presentaciones_compra(insumo_id, cantidad_contenido)",
+    "CREATE INDEX IF NOT EXISTS idx_composicion_presentacion ON composicion_empaque(presentacion_id)",
+    "CREATE INDEX IF NOT EXISTS idx_historial_presentacion_fecha ON historial_precios_presentacion(presentacion_id, fecha_registro)",
+    "CREATE INDEX IF NOT EXISTS idx_historial_fecha ON historial_precios_presentacion(fecha_registro)",
+    # Kardex
+    "CREATE INDEX IF NOT EXISTS idx_movimientos_insumo ON movimientos_inventario(insumo_id, id)",
+    # Compras
+    "CREATE INDEX IF NOT EXISTS idx_compras_presupuesto ON compras(presupuesto_id)",
+    "CREATE INDEX IF NOT EXISTS idx_compras_fecha ON compras(fecha_compra)",
+    "CREATE INDEX IF NOT EXISTS idx_detalle_compras_compra ON detalle_compras(compra_id)",
+    "CREATE INDEX IF NOT EXISTS idx_detalle_compras_presentacion ON detalle_compras(presentacion_id)",
+    # Ventas diarias
+    "CREATE INDEX IF NOT EXISTS idx_detalle_ventas_diarias_registro ON detalle_ventas_diarias(registro_diario_id, menu_item_id)",
+    # Libros con fecha (orden cronológico y filtros por período)
+    "CREATE INDEX IF NOT EXISTS idx_diario_ventas_fecha ON diario_ventas(fecha)",
+    "CREATE INDEX IF NOT EXISTS idx_pagos_efectivo_fecha ON pagos_efectivo(fecha)",
+    "CREATE INDEX IF NOT EXISTS idx_chequera_fecha ON chequera(fecha)",
+    "CREATE INDEX IF NOT EXISTS idx_transacciones_yappy_cuenta ON transacciones_yappy(yappy_id, fecha)",
+    "CREATE INDEX IF NOT EXISTS idx_transacciones_yappy_fecha ON transacciones_yappy(fecha)",
+    "CREATE INDEX IF NOT EXISTS idx_transacciones_tarjeta_tarjeta ON transacciones_tarjeta(tarjeta_id, fecha)",
+    "CREATE INDEX IF NOT EXISTS idx_transacciones_tarjeta_fecha ON transacciones_tarjeta(fecha)",
+    # Abastecimiento y conteos
+    "CREATE INDEX IF NOT EXISTS idx_abastecimiento_fecha ON abastecimiento_interno(fecha)",
+    "CREATE INDEX IF NOT EXISTS idx_detalle_abastecimiento ON detalle_abastecimiento(abastecimiento_id)",
+    "CREATE INDEX IF NOT EXISTS idx_detalle_conteo_conteo ON detalle_conteo_inventario(conteo_id, insumo_id)",
+    # Planilla
+    "CREATE INDEX IF NOT EXISTS idx_empleados_sucursal ON empleados(sucursal_id, activo)",
+    "CREATE INDEX IF NOT EXISTS idx_periodos_sucursal ON periodos_pago(sucursal_id)",
+    "CREATE INDEX IF NOT EXISTS idx_horas_periodo_empleado ON horas_empleado(periodo_id, empleado_id)",
+    "CREATE INDEX IF NOT EXISTS idx_deducciones_periodo ON planilla_deducciones_otras(periodo_id, empleado_id)",
+    "CREATE INDEX IF NOT EXISTS idx_vales_empleado ON vales_empleados(empleado_id, estado)",
+    "CREATE INDEX IF NOT EXISTS idx_vale_pagos_vale ON vale_pagos(vale_id, periodo_id)",
+]
+
+# Migraciones del esquema: (versión, descripción, método de DatabaseManager).
+# Se aplican en orden las que superan PRAGMA user_version, cada una en su
+# propia transacción. Para cambiar el esquema se agrega un paso al final;
+# nunca se modifica uno ya publicado.
+MIGRACIONES = [
+    (1, "Esquema base", "_migracion_esquema_base"),
+    (2, "Paquete de índices secundarios", "_migracion_indices"),
+    (3, "Huella de importación de reportes", "_migracion_huella_reportes"),
+    (4, "Resumen mensual materializado", "_migracion_resumen_mensual"),
+    (5, "Columna mes indexada en libros con fecha", "_migracion_columna_mes"),
+    (6, "Fechas ISO del periodo de reportes", "_migracion_periodo_iso"),
+    (7, "Día de la semana numérico en detalle de reportes", "_migracion_dia_num"),
+    (8, "Plato del menú resuelto en detalle de reportes", "_migracion_menu_item_reportes"),
+    (9, "Índices de búsqueda FTS5", "_migracion_busqueda_fts"),
+    (10, "Clave de periodo solo con fechas válidas", "_migracion_periodo_clave"),
+]
+SCHEMA_VERSION = MIGRACIONES[-1][0]
+
+# Filas por executemany al importar reportes de ventas
+TAMANO_BLOQUE_INSERT = 1000
+
+# Índices FTS5 de contenido externo (ver app/database/busqueda.py): tabla ->
+# columnas indexadas. presentaciones_fts se define aparte porque también
+# indexa el nombre del insumo.
+TABLAS_FTS_CONTENIDO = {
+    "insumos": ("nombre",),
+    "menu_items": ("codigo", "nombre"),
+    "proveedores": ("nombre", "contacto"),
+}
+TOKENIZADOR_FTS = "unicode61 remove_diacritics 2"
+
+# Libros con fecha ISO que se agrupan por mes: tabla -> columnas que preceden
+# a `mes` en su índice (las vistas por cuenta filtran primero por la cuenta).
+LIBROS_POR_MES = {
+    "diario_ventas": (),
+    "pagos_efectivo": (),
+    "chequera": (),
+    "transacciones_yappy": ("yappy_id",),
+    "transacciones_tarjeta": ("tarjeta_id",),
+}
+
+# Tablas que alimentan resumen_mensual: (tabla, filtro de fila, {columna: campo}).
+# El filtro usa {fila} para el alias (NEW/OLD en los triggers).
+FUENTES_RESUMEN_MENSUAL = [
+    (
+        "diario_ventas",
+        None,
+        {
+            "ventas": "total_ventas",
+            "ventas_efectivo": "efectivo",
+            "ventas_yappy": "yappy",
+            "ventas_pedidos_ya": "pedidos_ya",
+            "ventas_clave": "clave",
+            "ventas_visa": "visa_mastercard",
+        },
+    ),
+    ("pagos_efectivo", None, {"gasto_efectivo": "total"}),
+    ("chequera", None, {"gasto_cheques": "monto"}),
+    ("transacciones_yappy", None, {"gasto_yappy": "monto"}),
+    (
+        "transacciones_tarjeta",
+        "{fila}.tipo_transaccion = 'COMPRA'",
+        {"gasto_tarjetas": "monto"},
+    ),
+]
+
+
+def _sql_acumular_resumen(fila, filtro, columnas, signo):
+    """
+    Suma (signo=1) o resta (signo=-1) una fila de una tabla fuente en
+    resumen_mensual. `fila` es 'NEW' u 'OLD' dentro del trigger.
+    """
+    mes = f"strftime('%Y-%m', {fila}.fecha)"
+    condicion = f"{mes} IS NOT NULL"
+    if filtro:
+        condicion += " AND " + filtro.format(fila=fila)
+    nombres = ["registros"] + list(columnas)
+    valores = [str(signo)] + [
+        f"{signo} * COALESCE({fila}.{campo}, 0)" for campo in columnas.values()
+    ]
+    return f"""
+        INSERT INTO resumen_mensual (mes, {", ".join(nombres)})
+        SELECT {mes}, {", ".join(valores)}
+        WHERE {condicion}
+        ON CONFLICT(mes) DO UPDATE SET
+            {", ".join(f"{c} = {c} + excluded.{c}" for c in nombres)};
+    """
+
+
+def _sql_limpiar_resumen(fila):
+    return f"""
+        DELETE FROM resumen_mensual
+        WHERE mes = strftime('%Y-%m', {fila}.fecha) AND registros <= 0;
+    """
+
+
+# Formatos de fecha que puede traer el periodo de un reporte del POS
+FORMATOS_FECHA = (
+    "%Y-%m-%d",  # ISO  2025-03-01
+    "%d/%m/%Y",  # Latino  01/03/2025
+    "%d-%m-%Y",  # 01-03-2025
+    "%m/%d/%Y",  # EE.UU.  03/01/2025
+    "%Y/%m/%d",  # 2025/03/01
+    "%d/%m/%y",  # 01/03/25
+)
+
+
+def fecha_iso(texto):
+    """Fecha en cualquiera de FORMATOS_FECHA -> 'aaaa-mm-dd', o None si no parsea."""
+    texto = (texto or "").strip()
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def periodo_clave(desde, hasta):
+    """
+    'aaaa-mm-dd|aaaa-mm-dd' con las fechas del periodo (ver fecha_iso), o
+    None si alguna no parsea: dos reportes sin fechas no son del mismo periodo.
+    """
+    inicio, fin = fecha_iso(desde), fecha_iso(hasta)
+    if inicio is None or fin is None:
+        return None
+    return f"{inicio}|{fin}"
+
+
+class ReporteDuplicado(Exception):
+    """El contenido del reporte es idéntico al de uno ya guardado."""
+
+    def __init__(self, reporte_id):
+        super().__init__(reporte_id)
+        self.reporte_id = reporte_id
+
+
+def _aviso_sin_menu(codigos):
+    """Sufijo para el mensaje de importación con los códigos sin plato."""
+    if not codigos:
+        return ""
+    return f" {len(codigos)} códigos sin plato en el menú."
+
+
+def _actualizar_huella_contenido(huella, fila):
+    """Agrega al sha256 una fila (codigo, nombre, dia, cantidad, promedio, venta, costo, utilidad)."""
+    codigo, nombre, dia, cantidad, promedio, venta, costo, utilidad = fila
+    huella.update(
+        (
+            f"{codigo}|{nombre}|{dia}|{cantidad or 0:.4f}|{promedio or 0:.4f}|"
+            f"{venta or 0:.2f}|{costo or 0:.2f}|{utilidad or 0:.2f}\n"
+        ).encode("utf-8")
+    )
+
 
 class DatabaseManager:
-    def __init__(self, db_name=None):
+    def __init__(self, db_name=None, profile=None):
         # Si no se pasa nombre, intenta cargar de la configuración o usa el default
         if db_name is None:
             from app.database.config import get_db_path
@@ -15,20 +226,118 @@ class DatabaseManager:
             db_name = get_db_path()
 
         self.db_path = db_name
+        # Perfil de conexión (ver CONNECTION_PROFILES en config.py)
+        self.profile = profile
+        # Profundidad de transacciones explícitas abiertas con transaction()
+        self._tx_depth = 0
         self.connect()
 
     def connect(self):
+        from app.database.config import CONNECTION_PROFILES, get_connection_profile
+
+        if self.profile in CONNECTION_PROFILES:
+            pragmas = CONNECTION_PROFILES[self.profile]
+        else:
+            self.profile, pragmas = get_connection_profile()
+
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        self.conn = sqlite3.connect(self.db_path)
+        # El escritor puede usarse desde otros hilos, siempre a través de
+        # self.pool.escritura() que lo serializa.
+        self.conn = sqlite3.connect(
+            self.db_path,
+            timeout=pragmas["busy_timeout"] / 1000.0,
+            check_same_thread=False,
+        )
         self.conn.execute("PRAGMA foreign_keys = ON;")
+        registrar_funciones(self.conn)
+        self._apply_pragmas(pragmas)
+        # Cursor del escritor para el código de esta clase; solo se usa con el
+        # escritor tomado. Fuera de aquí: execute_query/execute_many/transaction.
         self.cursor = self.conn.cursor()
-        self.initialize_tables()
-        self.create_default_admin()
-        self._migrate_tables()
+        self.pool = ConnectionPool(
+            self.db_path,
+            self.conn,
+            pragmas["busy_timeout"],
+            configurar=registrar_funciones,
+        )
+        # Resultados de fetch_all, válidos mientras no haya commits nuevos
+        self.cache = CacheConsultas()
+        self._aplicar_migraciones()
+        # Índices FTS5 presentes (sin FTS5 las búsquedas usan LIKE)
+        self.tablas_fts = {
+            row[0]
+            for row in self.cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%\\_fts' ESCAPE '\\'"
+            )
+        }
+
+    def _apply_pragmas(self, pragmas):
+        self.conn.execute(f"PRAGMA journal_mode = {pragmas['journal_mode']};")
+        self.conn.execute(f"PRAGMA synchronous = {pragmas['synchronous']};")
+        self.conn.execute(f"PRAGMA cache_size = {int(pragmas['cache_size'])};")
+        self.conn.execute(f"PRAGMA mmap_size = {int(pragmas['mmap_size'])};")
+        self.conn.execute(f"PRAGMA temp_store = {pragmas['temp_store']};")
+        self.conn.execute(f"PRAGMA busy_timeout = {int(pragmas['busy_timeout'])};")
+
+    def set_profile(self, name):
+        """Cambia el perfil de la conexión abierta (p. ej. 'bulk-import' durante una carga)."""
+        from app.database.config import CONNECTION_PROFILES
+
+        with self.pool.escritura():
+            if self.conn.in_transaction:
+                raise RuntimeError("No se puede cambiar el perfil con una transacción abierta.")
+            self._apply_pragmas(CONNECTION_PROFILES[name])
+            self.profile = name
+
+    @contextmanager
+    def perfil(self, name):
+        """
+        Usa el perfil `name` mientras dura el bloque y vuelve al anterior al
+        salir, aunque haya un error:
+
+            with db.perfil("bulk-import"):
+                db.guardar_reporte_mensual(...)
+
+        Dentro de una transacción ya abierta no se cambia nada (los PRAGMA
+        de sincronización no se pueden cambiar a mitad de una transacción).
+        """
+        anterior = self.profile
+        if anterior == name or self.conn.in_transaction:
+            yield self
+            return
+        self.set_profile(name)
+        try:
+            yield self
+        finally:
+            self.set_profile(anterior)
+
+    def mantenimiento(self):
+        """Vuelca el WAL al archivo principal y actualiza estadísticas del planificador."""
+        try:
+            with self.pool.escritura() as conn:
+                conn.execute("PRAGMA optimize;")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        except sqlite3.Error as e:
+            print(f"Error en mantenimiento de BD: {e}")
+
+    def close(self):
+        if self._tx_depth:
+            raise RuntimeError("No se puede cerrar la base de datos con una transacción abierta.")
+        self.mantenimiento()
+        stats = self.cache.estadisticas()
+        logger.info(
+            "Caché de consultas: %d aciertos, %d fallos (%.0f%%), %d entradas",
+            stats["aciertos"],
+            stats["fallos"],
+            stats["tasa_aciertos"] * 100,
+            stats["entradas"],
+        )
+        self.pool.close()
+        self.conn.close()
 
     def switch_database(self, new_path):
         """Cierra la conexión actual y abre una nueva en la ruta especificada."""
-        self.conn.close()
+        self.close()
         self.db_path = new_path
         from app.database.config import save_db_path
 
@@ -36,13 +345,18 @@ class DatabaseManager:
         self.connect()
 
     def create_backup(self, dest_folder):
-        """Crea una copia de seguridad del archivo actual."""
+        """Crea una copia de seguridad consistente del archivo actual (incluye el WAL)."""
         try:
             filename = (
                 f"backup_restaurante_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
             )
             dest_path = os.path.join(dest_folder, filename)
-            shutil.copy2(self.db_path, dest_path)
+            dest = sqlite3.connect(dest_path)
+            try:
+                with self.pool.escritura() as conn:
+                    conn.backup(dest)
+            finally:
+                dest.close()
             return True, dest_path
         except Exception as e:
             return False, str(e)
@@ -570,199 +884,442 @@ class DatabaseManager:
             );
         """)
 
-        self.conn.commit()
-    def _migrate_tables(self):
-        try:
-            self.cursor.execute("ALTER TABLE insumos ADD COLUMN grupo_calculo TEXT")
-        except sqlite3.OperationalError:
-            pass
-
-        try:
-            self.cursor.execute(
-                "ALTER TABLE insumos ADD COLUMN factor_calculo REAL DEFAULT 1.0"
+    def _aplicar_migraciones(self):
+        """Ejecuta solo los pasos de MIGRACIONES pendientes según PRAGMA user_version."""
+        version = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+        for numero, descripcion, metodo in MIGRACIONES:
+            if numero <= version:
+                continue
+            inicio = time.perf_counter()
+            with self.transaction():
+                getattr(self, metodo)()
+                self.cursor.execute(f"PRAGMA user_version = {numero}")
+            logger.info(
+                "Migración v%d (%s) aplicada en %.1f ms",
+                numero,
+                descripcion,
+                (time.perf_counter() - inicio) * 1000,
             )
-        except sqlite3.OperationalError:
-            pass
 
-        try:
-            self.cursor.execute(
-                "ALTER TABLE detalle_presupuestos ADD COLUMN unidad_nombre TEXT"
+    def _columnas(self, tabla):
+        # table_xinfo incluye las columnas generadas (table_info las oculta)
+        return {row[1] for row in self.cursor.execute(f"PRAGMA table_xinfo({tabla})")}
+
+    def _agregar_columna(self, tabla, columna, definicion):
+        if columna not in self._columnas(tabla):
+            self.cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}")
+
+    def _migracion_esquema_base(self):
+        self.initialize_tables()
+        self._migrate_tables()
+        self.create_default_admin()
+
+    def _migracion_indices(self):
+        for ddl in INDICES:
+            self.cursor.execute(ddl)
+        self.cursor.execute("ANALYZE")
+
+    def _migracion_huella_reportes(self):
+        """
+        Huella de cada reporte importado para detectar recargas del mismo
+        archivo (huella_archivo) o del mismo periodo (periodo_clave).
+        Los reportes existentes reciben periodo y huella de contenido; la
+        del archivo queda NULL porque el CSV original ya no está.
+        """
+        self._agregar_columna("reportes_ventas", "huella_archivo", "TEXT")
+        self._agregar_columna("reportes_ventas", "huella_contenido", "TEXT")
+        self._agregar_columna("reportes_ventas", "periodo_clave", "TEXT")
+
+        reportes = self.cursor.execute(
+            "SELECT id, fecha_inicio_periodo, fecha_fin_periodo FROM reportes_ventas"
+        ).fetchall()
+        valores = []
+        for reporte_id, desde, hasta in reportes:
+            huella = hashlib.sha256()
+            for fila in self.cursor.execute(
+                """
+                SELECT codigo_producto, nombre_producto, dia_semana, cantidad,
+                       promedio_medida, total_venta, total_costo, total_utilidad
+                FROM detalle_reportes_ventas WHERE reporte_id = ? ORDER BY id
+                """,
+                (reporte_id,),
+            ).fetchall():
+                _actualizar_huella_contenido(huella, fila)
+            valores.append((huella.hexdigest(), periodo_clave(desde, hasta), reporte_id))
+        self.cursor.executemany(
+            "UPDATE reportes_ventas SET huella_contenido = ?, periodo_clave = ? WHERE id = ?",
+            valores,
+        )
+
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_reportes_huella_archivo ON reportes_ventas(huella_archivo)"
+        )
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_reportes_huella_contenido ON reportes_ventas(huella_contenido)"
+        )
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_reportes_periodo_clave ON reportes_ventas(periodo_clave)"
+        )
+
+    def _migracion_resumen_mensual(self):
+        """
+        Tabla resumen_mensual (una fila por 'YYYY-MM') con ventas y gastos ya
+        agregados, mantenida por triggers sobre las tablas de
+        FUENTES_RESUMEN_MENSUAL. `registros` cuenta las filas de origen del
+        mes: cuando llega a 0 la fila se elimina.
+        """
+        columnas = [
+            c for _, _, cols in FUENTES_RESUMEN_MENSUAL for c in cols
+        ]
+        self.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS resumen_mensual (
+                mes TEXT PRIMARY KEY,
+                registros INTEGER NOT NULL DEFAULT 0,
+                {", ".join(f"{c} REAL NOT NULL DEFAULT 0.0" for c in columnas)}
             )
-        except sqlite3.OperationalError:
-            pass
+        """)
 
-        try:
+        for tabla, filtro, cols in FUENTES_RESUMEN_MENSUAL:
+            campos = ["fecha"] + list(cols.values())
+            if filtro:
+                campos.append("tipo_transaccion")
+            self.cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_resumen_{tabla}_ins
+                AFTER INSERT ON {tabla}
+                BEGIN
+                    {_sql_acumular_resumen("NEW", filtro, cols, 1)}
+                END
+            """)
+            self.cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_resumen_{tabla}_del
+                AFTER DELETE ON {tabla}
+                BEGIN
+                    {_sql_acumular_resumen("OLD", filtro, cols, -1)}
+                    {_sql_limpiar_resumen("OLD")}
+                END
+            """)
+            self.cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_resumen_{tabla}_upd
+                AFTER UPDATE OF {", ".join(campos)} ON {tabla}
+                BEGIN
+                    {_sql_acumular_resumen("OLD", filtro, cols, -1)}
+                    {_sql_limpiar_resumen("OLD")}
+                    {_sql_acumular_resumen("NEW", filtro, cols, 1)}
+                END
+            """)
+
+        self.reconstruir_resumen_mensual()
+
+    def _migracion_columna_mes(self):
+        """
+        Columna generada `mes` ('YYYY-MM') con índice en cada libro de
+        LIBROS_POR_MES, para agrupar y filtrar por mes con el índice en vez
+        de evaluar strftime() sobre toda la tabla.
+        """
+        for tabla, prefijo in LIBROS_POR_MES.items():
+            self._agregar_columna(
+                tabla,
+                "mes",
+                "TEXT GENERATED ALWAYS AS (strftime('%Y-%m', fecha)) VIRTUAL",
+            )
+            columnas = ", ".join(prefijo + ("mes",))
             self.cursor.execute(
-                "ALTER TABLE detalle_presupuestos ADD COLUMN detalle_calculo TEXT"
+                f"CREATE INDEX IF NOT EXISTS idx_{tabla}_mes ON {tabla}({columnas})"
             )
-        except sqlite3.OperationalError:
-            pass
 
-        try:
-            self.cursor.execute("ALTER TABLE compras ADD COLUMN presupuesto_id INTEGER")
-        except sqlite3.OperationalError:
-            pass
+    def _migracion_periodo_iso(self):
+        """
+        Columnas periodo_inicio / periodo_fin ('aaaa-mm-dd') en reportes_ventas,
+        normalizadas desde el texto que trajo el POS, para agrupar por mes en
+        SQL. Si la fecha no parsea la columna queda NULL.
+        """
+        self._agregar_columna("reportes_ventas", "periodo_inicio", "DATE")
+        self._agregar_columna("reportes_ventas", "periodo_fin", "DATE")
+
+        reportes = self.cursor.execute(
+            "SELECT id, fecha_inicio_periodo, fecha_fin_periodo FROM reportes_ventas"
+        ).fetchall()
+        self.cursor.executemany(
+            "UPDATE reportes_ventas SET periodo_inicio = ?, periodo_fin = ? WHERE id = ?",
+            [
+                (fecha_iso(desde), fecha_iso(hasta), reporte_id)
+                for reporte_id, desde, hasta in reportes
+            ],
+        )
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_reportes_periodo "
+            "ON reportes_ventas(periodo_inicio, periodo_fin)"
+        )
+
+    def _migracion_dia_num(self):
+        """
+        Columna dia_num (0 = lunes ... 6 = domingo) en detalle_reportes_ventas,
+        calculada desde el texto de dia_semana en una sola pasada. Las
+        agregaciones por día agrupan sobre ella en vez de normalizar texto.
+        """
+        from app.controllers.report_parser import numero_dia
 
+        self._agregar_columna("detalle_reportes_ventas", "dia_num", "INTEGER")
+        self.conn.create_function("numero_dia", 1, numero_dia, deterministic=True)
         try:
             self.cursor.execute(
-                "ALTER TABLE reportes_ventas ADD COLUMN porcentaje_sugerido REAL DEFAULT 0.0"
+                "UPDATE detalle_reportes_ventas SET dia_num = numero_dia(dia_semana)"
             )
-        except sqlite3.OperationalError:
-            pass
-
-        # --- NUEVO: Migración para añadir el porcentaje_usado por insumo en el presupuesto ---
-        try:
-            self.cursor.execute(
-                "ALTER TABLE detalle_presupuestos ADD COLUMN porcentaje_usado REAL DEFAULT 0.0"
+        finally:
+            self.conn.create_function("numero_dia", 1, None)
+
+        # Reemplaza a idx_detalle_reportes_codigo (codigo_producto, dia_semana,
+        # promedio_medida) de INDICES: las agregaciones por día ya agrupan por
+        # dia_num y no por el texto de dia_semana, así que ninguna consulta lo
+        # usaba y solo encarecía cada INSERT de la importación.
+        self.cursor.execute("DROP INDEX IF EXISTS idx_detalle_reportes_codigo")
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_detalle_reportes_dia "
+            "ON detalle_reportes_ventas(codigo_producto, dia_num, promedio_medida)"
+        )
+
+    def _migracion_menu_item_reportes(self):
+        """
+        Columna menu_item_id en detalle_reportes_ventas con el código del POS
+        ya resuelto al plato del menú, y tabla codigos_sin_menu con los
+        códigos que no corresponden a ningún plato.
+        """
+        self._agregar_columna(
+            "detalle_reportes_ventas",
+            "menu_item_id",
+            "INTEGER REFERENCES menu_items(id) ON DELETE SET NULL",
+        )
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS codigos_sin_menu (
+                codigo TEXT PRIMARY KEY,
+                nombre TEXT,
+                filas INTEGER NOT NULL DEFAULT 0,
+                reportes INTEGER NOT NULL DEFAULT 0
             )
-        except sqlite3.OperationalError:
-            pass
-
-        try:
+        """)
+        # Las agregaciones por plato y día pasan a agrupar por menu_item_id;
+        # el mismo índice sirve para la FK y para buscar las filas sin plato.
+        self.cursor.execute("DROP INDEX IF EXISTS idx_detalle_reportes_dia")
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_detalle_reportes_menu_item "
+            "ON detalle_reportes_ventas(menu_item_id, dia_num, promedio_medida)"
+        )
+        self.resolver_codigos_menu(completo=True)
+
+    def resolver_codigos_menu(self, completo=False):
+        """
+        Vuelve a resolver codigo_producto -> menu_item_id en el detalle de los
+        reportes y actualiza codigos_sin_menu. Por defecto solo revisa las
+        filas sin plato (basta tras agregar platos); con completo=True revisa
+        todas, para cuando se cambia el código de un plato o se elimina.
+        Devuelve cuántos códigos quedan sin plato.
+        """
+        plato = """(
+            SELECT m.id FROM menu_items m
+            WHERE m.codigo = detalle_reportes_ventas.codigo_producto
+        )"""
+        condicion = f"menu_item_id IS NOT {plato}" if completo else "menu_item_id IS NULL"
+        with self.transaction():
             self.cursor.execute(
-                "ALTER TABLE diario_ventas ADD COLUMN efectivo REAL DEFAULT 0.0"
+                f"UPDATE detalle_reportes_ventas SET menu_item_id = {plato} WHERE {condicion}"
             )
-        except sqlite3.OperationalError:
-            pass
+            self._actualizar_codigos_sin_menu()
+            return self.cursor.execute(
+                "SELECT COUNT(*) FROM codigos_sin_menu"
+            ).fetchone()[0]
+
+    def _actualizar_codigos_sin_menu(self):
+        # Las filas sin plato se leen por el índice de menu_item_id (IS NULL)
+        self.cursor.execute("DELETE FROM codigos_sin_menu")
+        self.cursor.execute("""
+            INSERT INTO codigos_sin_menu (codigo, nombre, filas, reportes)
+            SELECT codigo_producto, MAX(nombre_producto), COUNT(*), COUNT(DISTINCT reporte_id)
+            FROM detalle_reportes_ventas
+            WHERE menu_item_id IS NULL AND codigo_producto IS NOT NULL
+            GROUP BY codigo_producto
+        """)
 
-        try:
-            self.cursor.execute(
-                "ALTER TABLE conteos_inventario ADD COLUMN categorias_ids TEXT"
+    def _migracion_busqueda_fts(self):
+        """
+        Índices FTS5 (insumos, menu_items, proveedores, presentaciones) con
+        un tokenizador que ignora acentos, mantenidos por triggers. Si el
+        SQLite en uso no trae FTS5 no se crea nada y las búsquedas caen a
+        normalizar(col) LIKE (ver app/database/busqueda.py).
+        """
+        if not fts5_disponible(self.conn):
+            logger.warning("SQLite sin FTS5: las búsquedas usarán LIKE.")
+            return
+
+        for tabla, columnas in TABLAS_FTS_CONTENIDO.items():
+            fts = f"{tabla}_fts"
+            cols = ", ".join(columnas)
+            nuevos = ", ".join(f"NEW.{c}" for c in columnas)
+            viejos = ", ".join(f"OLD.{c}" for c in columnas)
+            self.cursor.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                    {cols}, content='{tabla}', content_rowid='id',
+                    tokenize='{TOKENIZADOR_FTS}'
+                )
+            """)
+            self.cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{fts}_ins AFTER INSERT ON {tabla}
+                BEGIN
+                    INSERT INTO {fts}(rowid, {cols}) VALUES (NEW.id, {nuevos});
+                END
+            """)
+            self.cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{fts}_del AFTER DELETE ON {tabla}
+                BEGIN
+                    INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', OLD.id, {viejos});
+                END
+            """)
+            self.cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{fts}_upd AFTER UPDATE OF {cols} ON {tabla}
+                BEGIN
+                    INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', OLD.id, {viejos});
+                    INSERT INTO {fts}(rowid, {cols}) VALUES (NEW.id, {nuevos});
+                END
+            """)
+            self.cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+        # Presentaciones: nombre propio + nombre del insumo (rowid = id de la presentación)
+        self.cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS presentaciones_fts USING fts5(
+                nombre, insumo, tokenize='{TOKENIZADOR_FTS}'
             )
-        except sqlite3.OperationalError:
-            pass
+        """)
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_presentaciones_fts_ins
+            AFTER INSERT ON presentaciones_compra
+            BEGIN
+                INSERT INTO presentaciones_fts(rowid, nombre, insumo)
+                VALUES (NEW.id, NEW.nombre, (SELECT nombre FROM insumos WHERE id = NEW.insumo_id));
+            END
+        """)
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_presentaciones_fts_del
+            AFTER DELETE ON presentaciones_compra
+            BEGIN
+                DELETE FROM presentaciones_fts WHERE rowid = OLD.id;
+            END
+        """)
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_presentaciones_fts_upd
+            AFTER UPDATE OF nombre, insumo_id ON presentaciones_compra
+            BEGIN
+                UPDATE presentaciones_fts
+                SET nombre = NEW.nombre,
+                    insumo = (SELECT nombre FROM insumos WHERE id = NEW.insumo_id)
+                WHERE rowid = NEW.id;
+            END
+        """)
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_presentaciones_fts_insumo
+            AFTER UPDATE OF nombre ON insumos
+            BEGIN
+                UPDATE presentaciones_fts SET insumo = NEW.nombre
+                WHERE rowid IN (SELECT id FROM presentaciones_compra WHERE insumo_id = NEW.id);
+            END
+        """)
+        self.cursor.execute("DELETE FROM presentaciones_fts")
+        self.cursor.execute("""
+            INSERT INTO presentaciones_fts(rowid, nombre, insumo)
+            SELECT p.id, p.nombre, i.nombre
+            FROM presentaciones_compra p
+            LEFT JOIN insumos i ON i.id = p.insumo_id
+        """)
 
-        # Tablas planilla config/vales — instalaciones existentes
-        for ddl in [
-            """CREATE TABLE IF NOT EXISTS planilla_config_recargos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tipo_hora TEXT NOT NULL UNIQUE,
-                nombre_display TEXT NOT NULL,
-                recargo REAL DEFAULT 1.0)""",
-            """CREATE TABLE IF NOT EXISTS planilla_config_deducciones (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                concepto TEXT NOT NULL UNIQUE,
-                nombre_display TEXT NOT NULL,
-                porcentaje REAL DEFAULT 0.0,
-                aplica_a TEXT NOT NULL)""",
-            """CREATE TABLE IF NOT EXISTS planilla_deducciones_otras (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                empleado_id INTEGER NOT NULL, periodo_id INTEGER NOT NULL,
-                tipo TEXT NOT NULL, descripcion TEXT, monto REAL DEFAULT 0.0,
-                FOREIGN KEY (empleado_id) REFERENCES empleados(id),
-                FOREIGN KEY (periodo_id) REFERENCES periodos_pago(id) ON DELETE CASCADE)""",
-            """CREATE TABLE IF NOT EXISTS vales_empleados (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                empleado_id INTEGER NOT NULL,
-                fecha_emision DATE NOT NULL,
-                monto_original REAL NOT NULL,
-                descripcion TEXT,
-                diario_ventas_id INTEGER,
-                estado TEXT DEFAULT 'PENDIENTE',
-                fecha_cancelacion DATE,
-                FOREIGN KEY (empleado_id) REFERENCES empleados(id),
-                FOREIGN KEY (diario_ventas_id) REFERENCES diario_ventas(id))""",
-            """CREATE TABLE IF NOT EXISTS vale_pagos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                vale_id INTEGER NOT NULL, fecha DATE NOT NULL,
-                monto REAL NOT NULL, periodo_id INTEGER, descripcion TEXT,
-                FOREIGN KEY (vale_id) REFERENCES vales_empleados(id) ON DELETE CASCADE,
-                FOREIGN KEY (periodo_id) REFERENCES periodos_pago(id))""",
+    def _migracion_periodo_clave(self):
+        """
+        periodo_clave se calculaba dejando el texto tal cual si la fecha no
+        parseaba, así que los reportes sin fechas compartían 'N/A|N/A' y se
+        tomaban por el mismo periodo. Se recalcula desde periodo_inicio /
+        periodo_fin: queda NULL si falta alguna de las dos.
+        """
+        self.cursor.execute(
+            "UPDATE reportes_ventas SET periodo_clave = periodo_inicio || '|' || periodo_fin"
+        )
+
+    def reconstruir_resumen_mensual(self):
+        """
+        Recalcula resumen_mensual desde cero a partir de las tablas fuente.
+        Los triggers la mantienen al día; esto solo hace falta si se
+        sospecha de una desviación (p. ej. datos cargados con los triggers
+        deshabilitados).
+        """
+        with self.transaction():
+            self.cursor.execute("DELETE FROM resumen_mensual")
+            for tabla, filtro, cols in FUENTES_RESUMEN_MENSUAL:
+                condicion = "mes IS NOT NULL"
+                if filtro:
+                    condicion += " AND " + filtro.format(fila=tabla)
+                nombres = ["registros"] + list(cols)
+                self.cursor.execute(f"""
+                    INSERT INTO resumen_mensual (mes, {", ".join(nombres)})
+                    SELECT strftime('%Y-%m', fecha) AS mes, COUNT(*),
+                           {", ".join(f"COALESCE(SUM({campo}), 0)" for campo in cols.values())}
+                    FROM {tabla}
+                    WHERE {condicion}
+                    GROUP BY mes
+                    ON CONFLICT(mes) DO UPDATE SET
+                        {", ".join(f"{c} = {c} + excluded.{c}" for c in nombres)}
+                """)
+
+    def _migrate_tables(self):
+        """Columnas agregadas después de la primera versión (instalaciones existentes)."""
+        for tabla, columna, definicion in [
+            ("insumos", "grupo_calculo", "TEXT"),
+            ("insumos", "factor_calculo", "REAL DEFAULT 1.0"),
+            ("detalle_presupuestos", "unidad_nombre", "TEXT"),
+            ("detalle_presupuestos", "detalle_calculo", "TEXT"),
+            ("compras", "presupuesto_id", "INTEGER"),
+            ("reportes_ventas", "porcentaje_sugerido", "REAL DEFAULT 0.0"),
+            # porcentaje_usado por insumo en el presupuesto
+            ("detalle_presupuestos", "porcentaje_usado", "REAL DEFAULT 0.0"),
+            ("diario_ventas", "efectivo", "REAL DEFAULT 0.0"),
+            ("conteos_inventario", "categorias_ids", "TEXT"),
+            # Nuevas columnas de horas en planilla
+            ("horas_empleado", "horas_festivos", "REAL DEFAULT 0.0"),
+            ("horas_empleado", "horas_domingos", "REAL DEFAULT 0.0"),
+            ("horas_empleado", "horas_extra_diurnas", "REAL DEFAULT 0.0"),
+            ("horas_empleado", "horas_extra_nocturnas", "REAL DEFAULT 0.0"),
         ]:
-            try:
-                self.cursor.execute(ddl)
-            except Exception:
-                pass
+            self._agregar_columna(tabla, columna, definicion)
 
         # Seed recargos por defecto (INSERT OR IGNORE no sobrescribe personalizaciones)
-        for tipo, nombre, recargo in [
-            ("regulares",       "Horas Regulares",        1.00),
-            ("festivos",        "Horas Días Festivos",    2.50),
-            ("domingos",        "Horas Domingos",         1.50),
-            ("extra_diurnas",   "Horas Extra Diurnas",    1.25),
-            ("extra_nocturnas", "Horas Extra Nocturnas",  1.50),
-        ]:
-            try:
-                self.cursor.execute(
-                    "INSERT OR IGNORE INTO planilla_config_recargos (tipo_hora, nombre_display, recargo) VALUES (?,?,?)",
-                    (tipo, nombre, recargo),
-                )
-            except Exception:
-                pass
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO planilla_config_recargos (tipo_hora, nombre_display, recargo) VALUES (?,?,?)",
+            [
+                ("regulares",       "Horas Regulares",        1.00),
+                ("festivos",        "Horas Días Festivos",    2.50),
+                ("domingos",        "Horas Domingos",         1.50),
+                ("extra_diurnas",   "Horas Extra Diurnas",    1.25),
+                ("extra_nocturnas", "Horas Extra Nocturnas",  1.50),
+            ],
+        )
 
         # Seed deducciones por defecto (Panamá)
-        for concepto, nombre, pct, aplica_a in [
-            ("seguro_social_colaborador",    "Seguro Social (Colaborador)",    9.75,  "colaborador"),
-            ("seguro_social_empleador",      "Seguro Social (Empleador)",     12.25,  "empleador"),
-            ("seguro_educativo_colaborador", "Seguro Educativo (Colaborador)",  1.25, "colaborador"),
-            ("seguro_educativo_empleador",   "Seguro Educativo (Empleador)",    1.50, "empleador"),
-        ]:
-            try:
-                self.cursor.execute(
-                    "INSERT OR IGNORE INTO planilla_config_deducciones (concepto, nombre_display, porcentaje, aplica_a) VALUES (?,?,?,?)",
-                    (concepto, nombre, pct, aplica_a),
-                )
-            except Exception:
-                pass
-
-        # Tablas planilla — instalaciones existentes
-        for ddl in [
-            """CREATE TABLE IF NOT EXISTS empleados (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT NOT NULL, apellido TEXT NOT NULL,
-                puesto TEXT, sucursal_id INTEGER,
-                salario_hora REAL DEFAULT 0.0,
-                activo INTEGER DEFAULT 1, fecha_ingreso DATE,
-                FOREIGN KEY (sucursal_id) REFERENCES sucursales(id))""",
-            """CREATE TABLE IF NOT EXISTS periodos_pago (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT NOT NULL,
-                fecha_inicio DATE NOT NULL, fecha_fin DATE NOT NULL,
-                sucursal_id INTEGER, estado TEXT DEFAULT 'ABIERTO',
-                FOREIGN KEY (sucursal_id) REFERENCES sucursales(id))""",
-            """CREATE TABLE IF NOT EXISTS horas_empleado (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                empleado_id INTEGER NOT NULL, periodo_id INTEGER NOT NULL,
-                horas_regulares REAL DEFAULT 0.0,
-                horas_extra REAL DEFAULT 0.0,
-                horas_festivos REAL DEFAULT 0.0,
-                horas_domingos REAL DEFAULT 0.0,
-                horas_extra_diurnas REAL DEFAULT 0.0,
-                horas_extra_nocturnas REAL DEFAULT 0.0,
-                observacion TEXT,
-                FOREIGN KEY (empleado_id) REFERENCES empleados(id) ON DELETE CASCADE,
-                FOREIGN KEY (periodo_id)  REFERENCES periodos_pago(id) ON DELETE CASCADE)""",
-        ]:
-            try:
-                self.cursor.execute(ddl)
-            except Exception:
-                pass
-
-        # Nuevas columnas de horas en planilla
-        for col_def in [
-            "ALTER TABLE horas_empleado ADD COLUMN horas_festivos        REAL DEFAULT 0.0",
-            "ALTER TABLE horas_empleado ADD COLUMN horas_domingos        REAL DEFAULT 0.0",
-            "ALTER TABLE horas_empleado ADD COLUMN horas_extra_diurnas   REAL DEFAULT 0.0",
-            "ALTER TABLE horas_empleado ADD COLUMN horas_extra_nocturnas REAL DEFAULT 0.0",
-        ]:
-            try:
-                self.cursor.execute(col_def)
-            except Exception:
-                pass
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO planilla_config_deducciones (concepto, nombre_display, porcentaje, aplica_a) VALUES (?,?,?,?)",
+            [
+                ("seguro_social_colaborador",    "Seguro Social (Colaborador)",    9.75,  "colaborador"),
+                ("seguro_social_empleador",      "Seguro Social (Empleador)",     12.25,  "empleador"),
+                ("seguro_educativo_colaborador", "Seguro Educativo (Colaborador)",  1.25, "colaborador"),
+                ("seguro_educativo_empleador",   "Seguro Educativo (Empleador)",    1.50, "empleador"),
+            ],
+        )
 
         # Siembra inicial: registrar precio actual de presentaciones sin historial
         self.cursor.execute("""
             INSERT INTO historial_precios_presentacion
                 (presentacion_id, precio_compra, costo_unitario_calculado, fecha_registro, es_precio_actual)
-            SELECT id, precio_compra, COALESCE(costo_unitario_calculado, 0.0), date('now'), 1
-            FROM presentaciones_compra
-            WHERE id NOT IN (
-                SELECT DISTINCT presentacion_id FROM historial_precios_presentacion
+            SELECT p.id, p.precio_compra, COALESCE(p.costo_unitario_calculado, 0.0), date('now'), 1
+            FROM presentaciones_compra p
+            WHERE NOT EXISTS (
+                SELECT 1 FROM historial_precios_presentacion h WHERE h.presentacion_id = p.id
             )
         """)
 
-        self.conn.commit()
-
     def create_default_admin(self):
         try:
             check = self.cursor.execute(
@@ -774,80 +1331,364 @@ class DatabaseManager:
                     "INSERT INTO usuarios (username, password_hash, rol) VALUES (?,?,?)",
                     ("admin", pwd_hash, "admin"),
                 )
-                self.conn.commit()
         except sqlite3.OperationalError:
             pass
 
+    @contextmanager
+    def transaction(self):
+        """
+        Unidad de trabajo explícita:
+
+            with db.transaction():
+                db.execute_query(...)
+                db.execute_many(...)
+
+        Dentro del bloque execute_query no hace commit; se confirma una sola
+        vez al salir del bloque más externo, o se revierte todo si ocurre una
+        excepción. Los bloques anidados usan SAVEPOINT, de modo que un error
+        capturado dentro de un bloque interno solo revierte ese bloque.
+
+        El escritor queda tomado por este hilo hasta salir del bloque externo.
+        """
+        with self.pool.escritura():
+            if self._tx_depth == 0:
+                if not self.conn.in_transaction:
+                    self.conn.execute("BEGIN")
+                self._tx_depth = 1
+                try:
+                    yield self
+                except BaseException:
+                    self._tx_depth = 0
+                    self.conn.rollback()
+                    raise
+                else:
+                    self._tx_depth = 0
+                    self.conn.commit()
+                return
+
+            savepoint = f"sp_{self._tx_depth}"
+            self.conn.execute(f"SAVEPOINT {savepoint}")
+            self._tx_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._tx_depth -= 1
+                self.conn.execute(f"ROLLBACK TO {savepoint}")
+                self.conn.execute(f"RELEASE {savepoint}")
+                raise
+            else:
+                self._tx_depth -= 1
+                self.conn.execute(f"RELEASE {savepoint}")
+
+    # Cada escritura usa un cursor propio: lastrowid/rowcount del cursor
+    # devuelto siguen siendo válidos aunque otro hilo tome el escritor después.
+    # Fuera de transaction() cada llamada se confirma o se revierte entera,
+    # para no dejar una transacción implícita abierta en el escritor.
     def execute_query(self, query, params=()):
-        self.cursor.execute(query, params)
-        self.conn.commit()
-        return self.cursor
+        return self._escribir(lambda cursor: cursor.execute(query, params))
 
-    def fetch_all(self, query, params=()):
-        self.cursor.execute(query, params)
-        return self.cursor.fetchall()
+    def execute_many(self, query, seq_params):
+        return self._escribir(lambda cursor: cursor.executemany(query, seq_params))
+
+    def _escribir(self, ejecutar):
+        with self.pool.escritura():
+            cursor = self.conn.cursor()
+            if self._tx_depth:
+                ejecutar(cursor)
+                return cursor
+            try:
+                ejecutar(cursor)
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        return cursor
+
+    # Las lecturas usan un cursor propio sobre el lector del hilo actual, así
+    # que no pisan el resultado de self.cursor ni esperan al escritor.
+    def fetch_all(self, query, params=(), usar_cache=True):
+        """
+        Filas de la consulta. Si no hubo commits desde la última vez que se
+        ejecutó la misma consulta con los mismos parámetros, se devuelve el
+        resultado guardado en self.cache sin tocar SQLite.
+        """
+        clave = None
+        # Dentro de una transacción propia se leen cambios sin confirmar,
+        # que data_version no refleja: esas lecturas no pasan por la caché.
+        if usar_cache and not self.pool.lee_por_escritor():
+            clave = CacheConsultas.clave(query, params)
+        if clave is None:
+            with self.pool.lectura() as conn:
+                return conn.execute(query, params).fetchall()
+
+        # La versión se toma antes de leer: si hay un commit en medio, la
+        # entrada nace vieja y la próxima consulta la descarta.
+        version = self.pool.version_datos()
+        filas = self.cache.obtener(clave, version)
+        if filas is None:
+            with self.pool.lectura() as conn:
+                filas = conn.execute(query, params).fetchall()
+            self.cache.guardar(clave, version, filas)
+        return list(filas)
 
     def fetch_one(self, query, params=()):
-        self.cursor.execute(query, params)
-        return self.cursor.fetchone()
+        with self.pool.lectura() as conn:
+            return conn.execute(query, params).fetchone()
 
-    def guardar_reporte_mensual(self, metadata, records):
+    def buscar_reporte_importado(self, metadata):
+        """
+        Busca por índice un reporte cargado antes con el mismo archivo o el
+        mismo periodo. Devuelve (reporte_id, "archivo" | "periodo") o None.
+        Solo se compara el periodo si las dos fechas parsean.
+
+        El mismo contenido en otro archivo (huella_contenido) se detecta al
+        guardar, cuando ya se leyeron todas las filas.
+        """
+        huella_archivo = metadata.get("huella_archivo")
+        if huella_archivo:
+            row = self.fetch_one(
+                "SELECT id FROM reportes_ventas WHERE huella_archivo = ? LIMIT 1",
+                (huella_archivo,),
+            )
+            if row:
+                return row[0], "archivo"
+
+        clave = periodo_clave(metadata.get("desde"), metadata.get("hasta"))
+        if clave is None:
+            return None
+        row = self.fetch_one(
+            "SELECT id FROM reportes_ventas WHERE periodo_clave = ? ORDER BY id DESC LIMIT 1",
+            (clave,),
+        )
+        if row:
+            return row[0], "periodo"
+        return None
+
+    def guardar_reporte_mensual(self, metadata, records, actualizar_existente=True):
+        """
+        Guarda un reporte mensual. `records` puede ser una lista o un
+        generador de RegistroVenta (ReportParser.abrir_reporte); el detalle
+        se inserta por bloques de TAMANO_BLOQUE_INSERT filas, así que un
+        generador nunca se materializa completo en memoria.
+
+        Las recargas no duplican datos: si el archivo ya se importó no se
+        guarda nada; si ya existe un reporte del mismo periodo se le aplican
+        solo las diferencias (actualizar_existente=True) o se rechaza. Un
+        reporte nuevo con el mismo contenido que otro ya guardado (mismo
+        huella_contenido, aunque el archivo sea distinto) se revierte.
+        """
         try:
             fecha_inicio = metadata.get("desde", "")
             fecha_fin = metadata.get("hasta", "")
             pct_sugerido = metadata.get("pct_sugerido", 0.0)
-            total_global = sum(r["total_venta"] for r in records)
+
+            existente = self.buscar_reporte_importado(metadata)
+            if existente:
+                reporte_id, motivo = existente
+                if motivo == "archivo":
+                    return (
+                        False,
+                        f"Este archivo ya fue importado (Reporte ID: {reporte_id}).",
+                    )
+                if not actualizar_existente:
+                    return (
+                        False,
+                        f"Ya existe un reporte del periodo {fecha_inicio} al {fecha_fin} (ID: {reporte_id}).",
+                    )
+                return self._actualizar_reporte_mensual(reporte_id, metadata, records)
 
             query_header = """
                 INSERT INTO reportes_ventas 
-                (fecha_inicio_periodo, fecha_fin_periodo, total_venta_reportada, porcentaje_sugerido, observaciones)
-                VALUES (?, ?, ?, ?, ?)
+                (fecha_inicio_periodo, fecha_fin_periodo, total_venta_reportada, porcentaje_sugerido, observaciones,
+                 huella_archivo, periodo_clave, periodo_inicio, periodo_fin)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """
-            self.cursor.execute(
-                query_header,
-                (
-                    fecha_inicio,
-                    fecha_fin,
-                    total_global,
-                    pct_sugerido,
-                    "Carga desde CSV",
-                ),
-            )
-            reporte_id = self.cursor.lastrowid
-
             query_detail = """
                 INSERT INTO detalle_reportes_ventas 
-                (reporte_id, codigo_producto, nombre_producto, dia_semana, cantidad, promedio_medida, total_venta, total_costo, total_utilidad)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                (reporte_id, codigo_producto, nombre_producto, dia_semana, cantidad, promedio_medida, total_venta, total_costo, total_utilidad,
+                 dia_num, menu_item_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """
-
-            data_tuples = []
-            for r in records:
-                data_tuples.append(
+            with self.transaction():
+                ids_menu = dict(
+                    self.cursor.execute("SELECT codigo, id FROM menu_items").fetchall()
+                )
+                # El total y la huella de contenido se conocen al final
+                self.cursor.execute(
+                    query_header,
                     (
-                        reporte_id,
-                        r["code"],
-                        r["desc"],
-                        r["day"],
-                        r["qty"],
-                        r.get("prom", 0.0),
-                        r["total_venta"],
-                        r.get("total_costo", 0.0),
-                        r.get("total_utilidad", 0.0),
-                    )
+                        fecha_inicio,
+                        fecha_fin,
+                        0.0,
+                        pct_sugerido,
+                        "Carga desde CSV",
+                        metadata.get("huella_archivo"),
+                        periodo_clave(fecha_inicio, fecha_fin),
+                        fecha_iso(fecha_inicio),
+                        fecha_iso(fecha_fin),
+                    ),
                 )
-
-            self.cursor.executemany(query_detail, data_tuples)
-            self.conn.commit()
+                reporte_id = self.cursor.lastrowid
+
+                huella = hashlib.sha256()
+                total_global = 0.0
+                total_registros = 0
+                sin_menu = set()
+                filas = iter(records)
+                while True:
+                    bloque = [
+                        (
+                            reporte_id,
+                            r.code,
+                            r.desc,
+                            r.day,
+                            r.qty,
+                            r.prom,
+                            r.total_venta,
+                            r.total_costo,
+                            r.total_utilidad,
+                            r.dia_num,
+                            ids_menu.get(r.code),
+                        )
+                        for r in itertools.islice(filas, TAMANO_BLOQUE_INSERT)
+                    ]
+                    if not bloque:
+                        break
+                    self.cursor.executemany(query_detail, bloque)
+                    for fila in bloque:
+                        _actualizar_huella_contenido(huella, fila[1:9])
+                        if fila[10] is None:
+                            sin_menu.add(fila[1])
+                    total_global += sum(fila[6] for fila in bloque)
+                    total_registros += len(bloque)
+
+                if total_registros:
+                    duplicado = self.cursor.execute(
+                        "SELECT id FROM reportes_ventas WHERE huella_contenido = ? AND id <> ? LIMIT 1",
+                        (huella.hexdigest(), reporte_id),
+                    ).fetchone()
+                    if duplicado:
+                        raise ReporteDuplicado(duplicado[0])
+                self.cursor.execute(
+                    "UPDATE reportes_ventas SET total_venta_reportada = ?, huella_contenido = ? WHERE id = ?",
+                    (total_global, huella.hexdigest(), reporte_id),
+                )
+                if sin_menu:
+                    self._actualizar_codigos_sin_menu()
             return (
                 True,
-                f"Reporte guardado con éxito. ID: {reporte_id}. {len(records)} registros.",
+                f"Reporte guardado con éxito. ID: {reporte_id}. {total_registros} registros."
+                + _aviso_sin_menu(sin_menu),
             )
 
+        except ReporteDuplicado as e:
+            return (
+                False,
+                f"Este reporte ya fue importado desde otro archivo (Reporte ID: {e.reporte_id}).",
+            )
         except Exception as e:
-            self.conn.rollback()
             return False, f"Error al guardar reporte: {str(e)}"
 
+    def _actualizar_reporte_mensual(self, reporte_id, metadata, records):
+        """
+        Aplica un reporte del mismo periodo sobre uno existente como delta:
+        actualiza las filas que cambiaron, inserta las nuevas y borra las que
+        ya no vienen. El ID se conserva, así que los presupuestos que lo
+        usan siguen vinculados.
+        """
+        existentes = {}
+        for row in self.fetch_all(
+            """
+            SELECT id, codigo_producto, nombre_producto, dia_semana, cantidad,
+                   promedio_medida, total_venta, total_costo, total_utilidad
+            FROM detalle_reportes_ventas WHERE reporte_id = ? ORDER BY id
+            """,
+            (reporte_id,),
+        ):
+            existentes.setdefault(row[1:4], []).append((row[0], row[4:]))
+
+        ids_menu = dict(self.fetch_all("SELECT codigo, id FROM menu_items"))
+        sin_menu = set()
+
+        huella = hashlib.sha256()
+        total_global = 0.0
+        total_registros = 0
+        actualizar, insertar = [], []
+        for r in records:
+            fila = (
+                r.code,
+                r.desc,
+                r.day,
+                r.qty,
+                r.prom,
+                r.total_venta,
+                r.total_costo,
+                r.total_utilidad,
+            )
+            _actualizar_huella_contenido(huella, fila)
+            total_global += r.total_venta
+            total_registros += 1
+            menu_item_id = ids_menu.get(r.code)
+            if menu_item_id is None:
+                sin_menu.add(r.code)
+
+            previas = existentes.get(fila[:3])
+            if previas:
+                det_id, valores = previas.pop(0)
+                if tuple(valores) != fila[3:]:
+                    actualizar.append(fila[3:] + (det_id,))
+            else:
+                insertar.append((reporte_id,) + fila + (r.dia_num, menu_item_id))
+        borrar = [(det_id,) for previas in existentes.values() for det_id, _ in previas]
+
+        with self.transaction():
+            self.cursor.executemany(
+                """
+                UPDATE detalle_reportes_ventas
+                SET cantidad = ?, promedio_medida = ?, total_venta = ?, total_costo = ?, total_utilidad = ?
+                WHERE id = ?
+                """,
+                actualizar,
+            )
+            self.cursor.executemany(
+                """
+                INSERT INTO detalle_reportes_ventas 
+                (reporte_id, codigo_producto, nombre_producto, dia_semana, cantidad, promedio_medida, total_venta, total_costo, total_utilidad,
+                 dia_num, menu_item_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                insertar,
+            )
+            self.cursor.executemany(
+                "DELETE FROM detalle_reportes_ventas WHERE id = ?", borrar
+            )
+            self.cursor.execute(
+                """
+                UPDATE reportes_ventas
+                SET total_venta_reportada = ?, porcentaje_sugerido = ?, huella_archivo = ?,
+                    huella_contenido = ?, observaciones = 'Actualizado desde CSV'
+                WHERE id = ?
+                """,
+                (
+                    total_global,
+                    metadata.get("pct_sugerido", 0.0),
+                    metadata.get("huella_archivo"),
+                    huella.hexdigest(),
+                    reporte_id,
+                ),
+            )
+            if insertar or borrar:
+                self._actualizar_codigos_sin_menu()
+
+        if not (actualizar or insertar or borrar):
+            return True, f"El reporte ID: {reporte_id} ya estaba al día. Sin cambios."
+        return (
+            True,
+            f"Reporte ID: {reporte_id} actualizado ({total_registros} registros): "
+            f"{len(actualizar)} modificados, {len(insertar)} nuevos, {len(borrar)} eliminados."
+            + _aviso_sin_menu(sin_menu),
+        )
+
     def obtener_reportes_registrados(self):
         query = """
             SELECT id, fecha_inicio_periodo, fecha_fin_periodo, total_venta_reportada, porcentaje_sugerido, fecha_registro 
@@ -864,13 +1705,21 @@ class DatabaseManager:
 
     def eliminar_reporte(self, reporte_id):
         try:
-            self.execute_query(
-                "DELETE FROM reportes_ventas WHERE id = ?", (reporte_id,)
-            )
+            with self.transaction():
+                self.cursor.execute(
+                    "DELETE FROM reportes_ventas WHERE id = ?", (reporte_id,)
+                )
+                self._actualizar_codigos_sin_menu()
             return True, "Reporte eliminado."
         except Exception as e:
             return False, str(e)
 
+    def obtener_codigos_sin_menu(self):
+        """(codigo, nombre, filas, reportes) de los códigos de reportes sin plato en el menú."""
+        return self.fetch_all(
+            "SELECT codigo, nombre, filas, reportes FROM codigos_sin_menu ORDER BY codigo"
+        )
+
     def obtener_todos_codigos_menu(self):
         query = "SELECT codigo FROM menu_items"
         resultados = self.fetch_all(query)
@@ -0,0 +1,37 @@
+import sqlite3
+
+from app.controllers.report_parser import ReportParser
+
+COLACION_SIN_ACENTOS = "SIN_ACENTOS"
+
+
+def normalizar(valor):
+    """ReportParser.normalize_text para SQL: sin acentos y en minúsculas (NULL -> NULL)."""
+    if valor is None:
+        return None
+    return ReportParser.normalize_text(str(valor))
+
+
+def _comparar_sin_acentos(a, b):
+    a = ReportParser.normalize_text(a)
+    b = ReportParser.normalize_text(b)
+    return (a > b) - (a < b)
+
+
+def registrar_funciones(conn):
+    """
+    Registra en `conn` la función normalizar(texto) y la colación
+    SIN_ACENTOS. Todas las conexiones de la base (escritor, lectores del pool
+    y monitor) deben tenerlas para que las consultas que las usan corran en
+    cualquiera de ellas.
+    """
+    conn.create_function("normalizar", 1, normalizar, deterministic=True)
+    conn.create_collation(COLACION_SIN_ACENTOS, _comparar_sin_acentos)
+
+
+def fts5_disponible(conn):
+    try:
+        fila = conn.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()
+    except sqlite3.Error:
+        return False
+    return bool(fila and fila[0])
@@ -0,0 +1,199 @@
+# [FILE: app/database/pool.py]
+import logging
+import pathlib
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def conectar_lectura(db_path, busy_timeout_ms=5000, configurar=None):
+    """
+    Abre una conexión SQLite de solo lectura, independiente de la del
+    escritor. `configurar(conn)` registra funciones o colaciones propias.
+    """
+    uri = pathlib.Path(db_path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(
+        uri, uri=True, timeout=busy_timeout_ms / 1000.0, check_same_thread=False
+    )
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)};")
+    conn.execute("PRAGMA query_only = ON;")
+    if configurar is not None:
+        configurar(conn)
+    return conn
+
+
+class ConnectionPool:
+    """
+    Conexiones de una base SQLite en modo WAL:
+
+    - un único escritor (la conexión principal del DatabaseManager), tomado
+      en exclusiva con un RLock para que las escrituras queden serializadas;
+    - un lector de solo lectura por hilo, creado al primer uso y reutilizado.
+
+    Mientras el hilo dueño del escritor tiene una transacción abierta, sus
+    lecturas van por el escritor para ver sus propios cambios sin confirmar.
+
+    version_datos() expone PRAGMA data_version de una conexión monitor para
+    que las cachés de consultas sepan si hubo algún commit desde entonces.
+
+    `configurar(conn)` se aplica a cada conexión que abre el pool (lectores y
+    monitor) para que tengan las mismas funciones SQL que el escritor.
+    """
+
+    def __init__(self, db_path, escritor, busy_timeout_ms=5000, configurar=None):
+        self.db_path = db_path
+        self.escritor = escritor
+        self.busy_timeout_ms = busy_timeout_ms
+        self.configurar = configurar
+        self.cerrado = False
+
+        self._lock_escritor = threading.RLock()
+        self._dueno = None
+
+        self._local = threading.local()
+        self._lectores = []
+        self._lock_lectores = threading.Lock()
+
+        self._monitor = None
+        self._lock_monitor = threading.Lock()
+
+        self._lock_stats = threading.Lock()
+        self._stats = {
+            "lecturas": 0,
+            "escrituras": 0,
+            "lectores_abiertos": 0,
+            "espera_escritor_ms": 0.0,
+            "espera_escritor_max_ms": 0.0,
+            "uso_lectura_ms": 0.0,
+            "uso_escritura_ms": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Checkout
+    # ------------------------------------------------------------------
+    @contextmanager
+    def escritura(self):
+        """Toma el escritor en exclusiva (reentrante dentro del mismo hilo)."""
+        self._verificar_abierto()
+        t0 = time.perf_counter()
+        self._lock_escritor.acquire()
+        t1 = time.perf_counter()
+        anterior = self._dueno
+        self._dueno = threading.get_ident()
+        try:
+            yield self.escritor
+        finally:
+            self._dueno = anterior
+            self._lock_escritor.release()
+            if anterior is None:
+                self._registrar_escritura(t1 - t0, time.perf_counter() - t1)
+
+    @contextmanager
+    def lectura(self):
+        """Conexión para consultas desde el hilo actual."""
+        self._verificar_abierto()
+        if self.lee_por_escritor():
+            with self.escritura() as conn:
+                yield conn
+            return
+
+        t0 = time.perf_counter()
+        conn = self._lector_del_hilo()
+        try:
+            yield conn
+        finally:
+            uso = (time.perf_counter() - t0) * 1000
+            with self._lock_stats:
+                self._stats["lecturas"] += 1
+                self._stats["uso_lectura_ms"] += uso
+
+    def lee_por_escritor(self):
+        """
+        True si este hilo tiene tomado el escritor (dentro de escritura() o
+        transaction()) y sus lecturas deben ver sus cambios sin confirmar.
+        Toda escritura pasa por escritura(), así que fuera de ella el
+        escritor nunca tiene trabajo pendiente de este hilo.
+        """
+        return self._dueno == threading.get_ident()
+
+    def _lector_del_hilo(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = conectar_lectura(
+                self.db_path, self.busy_timeout_ms, self.configurar
+            )
+            self._local.conn = conn
+            with self._lock_lectores:
+                self._podar_lectores()
+                self._lectores.append((threading.current_thread(), conn))
+                self._stats["lectores_abiertos"] = len(self._lectores)
+        return conn
+
+    def _podar_lectores(self):
+        """Cierra los lectores de hilos que ya terminaron (p. ej. hilos del QThreadPool)."""
+        vivos = []
+        for hilo, conn in self._lectores:
+            if hilo.is_alive():
+                vivos.append((hilo, conn))
+            else:
+                conn.close()
+        self._lectores = vivos
+
+    def version_datos(self):
+        """
+        PRAGMA data_version de una conexión que nunca escribe: cambia después
+        de cada commit de cualquier otra conexión (el escritor u otro proceso).
+        """
+        with self._lock_monitor:
+            self._verificar_abierto()
+            if self._monitor is None:
+                self._monitor = conectar_lectura(
+                    self.db_path, self.busy_timeout_ms, self.configurar
+                )
+            return self._monitor.execute("PRAGMA data_version").fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Métricas y cierre
+    # ------------------------------------------------------------------
+    def _registrar_escritura(self, espera, uso):
+        espera_ms = espera * 1000
+        with self._lock_stats:
+            self._stats["escrituras"] += 1
+            self._stats["espera_escritor_ms"] += espera_ms
+            self._stats["uso_escritura_ms"] += uso * 1000
+            if espera_ms > self._stats["espera_escritor_max_ms"]:
+                self._stats["espera_escritor_max_ms"] = espera_ms
+
+    def estadisticas(self):
+        with self._lock_stats:
+            return dict(self._stats)
+
+    def _verificar_abierto(self):
+        if self.cerrado:
+            raise sqlite3.ProgrammingError("El pool de conexiones está cerrado.")
+
+    def close(self):
+        """Cierra los lectores; el escritor lo cierra el DatabaseManager."""
+        self.cerrado = True
+        with self._lock_monitor:
+            if self._monitor is not None:
+                self._monitor.close()
+                self._monitor = None
+        with self._lock_lectores:
+            for _, conn in self._lectores:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._lectores = []
+        stats = self.estadisticas()
+        logger.info(
+            "Pool cerrado: %d lecturas, %d escrituras, espera escritor %.1f ms (máx %.1f ms)",
+            stats["lecturas"],
+            stats["escrituras"],
+            stats["espera_escritor_ms"],
+            stats["espera_escritor_max_ms"],
+        )
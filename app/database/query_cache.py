@@ -0,0 +1,69 @@
+# [FILE: app/database/query_cache.py]
+import threading
+from collections import OrderedDict
+
+
+class CacheConsultas:
+    """
+    LRU de resultados de consultas de solo lectura, por (sql, parámetros).
+
+    Cada entrada guarda la versión de datos (PRAGMA data_version) con la que
+    se leyó; si la versión actual es otra, la entrada se descarta. Así
+    cualquier commit invalida todo sin tener que avisar tabla por tabla.
+    Los resultados de más de `max_filas` filas no se guardan.
+    """
+
+    def __init__(self, max_entradas=256, max_filas=5000):
+        self.max_entradas = max_entradas
+        self.max_filas = max_filas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"aciertos": 0, "fallos": 0, "descartes": 0}
+
+    @staticmethod
+    def clave(query, params):
+        """Clave hashable o None si los parámetros no se pueden usar como clave."""
+        if isinstance(params, dict):
+            params = tuple(sorted(params.items()))
+        else:
+            params = tuple(params)
+        clave = (query, params)
+        try:
+            hash(clave)
+        except TypeError:
+            return None
+        return clave
+
+    def obtener(self, clave, version):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[0] == version:
+                self._entradas.move_to_end(clave)
+                self._stats["aciertos"] += 1
+                return entrada[1]
+            if entrada is not None:
+                del self._entradas[clave]
+                self._stats["descartes"] += 1
+            self._stats["fallos"] += 1
+            return None
+
+    def guardar(self, clave, version, filas):
+        if len(filas) > self.max_filas:
+            return
+        with self._lock:
+            self._entradas[clave] = (version, tuple(filas))
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entradas"] = len(self._entradas)
+        consultas = stats["aciertos"] + stats["fallos"]
+        stats["tasa_aciertos"] = stats["aciertos"] / consultas if consultas else 0.0
+        return stats
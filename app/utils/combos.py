@@ -0,0 +1,65 @@
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QStandardItem, QStandardItemModel
+
+from app.controllers.catalogos import obtener_catalogos
+
+# clave -> (texto visible, dato del item) a partir de la fila del catálogo
+FORMATOS = {
+    "sucursales": (lambda r: r[1], lambda r: r[0]),
+    "unidades": (lambda r: f"{r[1]} ({r[2]})", lambda r: r[0]),
+    "categorias": (lambda r: r[1], lambda r: r[0]),
+    "proveedores": (lambda r: r[1], lambda r: r[0]),
+    "menu_items": (lambda r: f"{r[1]} - {r[2]}", lambda r: r[0]),
+    "presentaciones": (
+        lambda r: f"{r[2]} - {r[1]}",
+        lambda r: {"id": r[0], "precio": r[3]},
+    ),
+}
+
+
+def _rellenar(modelo, filas, clave, placeholder):
+    texto, dato = FORMATOS[clave]
+    modelo.clear()
+    if placeholder is not None:
+        item = QStandardItem(placeholder)
+        item.setData(None, Qt.UserRole)
+        modelo.appendRow(item)
+    for fila in filas:
+        item = QStandardItem(texto(fila))
+        item.setData(dato(fila), Qt.UserRole)
+        item.setEditable(False)
+        modelo.appendRow(item)
+
+
+def asignar_combo(combo, db, clave, placeholder=None):
+    """
+    Llena `combo` con los datos del catálogo `clave` (texto en DisplayRole y
+    dato en UserRole, como addItem(texto, dato)) conservando el dato
+    seleccionado.
+
+    Las filas salen de la caché de catálogos, así que no se consulta la base.
+    Cada combo tiene su propio modelo y solo se rellena cuando cambia la
+    versión del catálogo; mientras tanto no emite currentIndexChanged, y si
+    el dato seleccionado ya no existe lo emite una sola vez con la nueva
+    selección.
+    """
+    catalogos = obtener_catalogos(db)
+    llave = (db.db_path, clave, placeholder, catalogos.version(clave))
+    modelo = combo.model()
+    if getattr(modelo, "llave_catalogo", None) == llave:
+        return
+
+    actual = combo.currentData()
+    bloqueado = combo.blockSignals(True)
+    try:
+        if not hasattr(modelo, "llave_catalogo"):
+            modelo = QStandardItemModel(combo)
+            combo.setModel(modelo)
+        _rellenar(modelo, catalogos.filas(clave), clave, placeholder)
+        modelo.llave_catalogo = llave
+        idx = combo.findData(actual) if actual is not None else -1
+        combo.setCurrentIndex(idx if idx >= 0 else 0)
+    finally:
+        combo.blockSignals(bloqueado)
+    if combo.currentData() != actual:
+        combo.currentIndexChanged.emit(combo.currentIndex())
@@ -0,0 +1,296 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import QAbstractItemView
+
+# Rol con la clave de ordenamiento de la celda (número o texto); ProxyTabla
+# ordena por él en lugar de comparar el texto visible.
+ROL_ORDEN = Qt.UserRole + 1
+
+
+def texto(valor):
+    return "" if valor is None else str(valor)
+
+
+def monto(valor):
+    return f"{float(valor or 0.0):.2f}"
+
+
+def _numero(valor):
+    try:
+        return float(valor or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Columna:
+    """
+    Columna de ModeloTabla.
+
+    `indice` es la posición del valor en la fila (por defecto la de la
+    columna). `formato` convierte el valor en el texto visible; las columnas
+    `numerica` se ordenan por su valor como float. `color` y `fondo` reciben
+    el valor y devuelven un color (o None); `alineacion` son flags Qt.Align*.
+    `sql` es la expresión de la columna en la consulta; ModeloPaginado la
+    usa para ordenar y filtrar en SQLite.
+    """
+
+    __slots__ = (
+        "titulo", "indice", "formato", "numerica", "color", "fondo", "negrita", "alineacion", "sql"
+    )
+
+    def __init__(
+        self,
+        titulo,
+        formato=texto,
+        numerica=False,
+        color=None,
+        fondo=None,
+        negrita=False,
+        alineacion=None,
+        indice=None,
+        sql=None,
+    ):
+        self.titulo = titulo
+        self.indice = indice
+        self.formato = formato
+        self.numerica = numerica
+        self.color = color
+        self.fondo = fondo
+        self.negrita = negrita
+        self.alineacion = alineacion
+        self.sql = sql
+
+    def clave(self, valor):
+        if self.numerica:
+            return _numero(valor)
+        return texto(valor).lower()
+
+
+class ModeloTabla(QAbstractTableModel):
+    """
+    Modelo de solo lectura sobre una lista de filas (las tuplas tal como las
+    devuelve la consulta). El texto, los colores y la clave de orden se
+    calculan en data(), así que solo las filas visibles cuestan algo: no se
+    crea un QTableWidgetItem por celda.
+
+    `fondo_fila` recibe la fila completa y devuelve el color de fondo de
+    todas sus celdas (o None); tiene prioridad sobre Columna.fondo.
+    """
+
+    def __init__(self, columnas, parent=None, fondo_fila=None):
+        super().__init__(parent)
+        self.columnas = columnas
+        self.fondo_fila = fondo_fila
+        for i, columna in enumerate(columnas):
+            if columna.indice is None:
+                columna.indice = i
+        self.filas = []
+        self._negrita = QFont()
+        self._negrita.setBold(True)
+
+    def set_filas(self, filas):
+        self.beginResetModel()
+        self.filas = list(filas)
+        self.endResetModel()
+
+    def fila(self, row):
+        return self.filas[row]
+
+    def texto(self, row, col):
+        columna = self.columnas[col]
+        return columna.formato(self.filas[row][columna.indice])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.filas)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columnas)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columnas[section].titulo
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        columna = self.columnas[index.column()]
+        fila = self.filas[index.row()]
+        valor = fila[columna.indice]
+
+        if role == Qt.DisplayRole:
+            return columna.formato(valor)
+        if role == ROL_ORDEN:
+            return columna.clave(valor)
+        if role == Qt.ForegroundRole and columna.color:
+            return columna.color(valor)
+        if role == Qt.BackgroundRole:
+            if self.fondo_fila:
+                return self.fondo_fila(fila)
+            if columna.fondo:
+                return columna.fondo(valor)
+        if role == Qt.FontRole and columna.negrita:
+            return self._negrita
+        if role == Qt.TextAlignmentRole and columna.alineacion is not None:
+            return columna.alineacion
+        return None
+
+
+class ModeloPaginado(ModeloTabla):
+    """
+    ModeloTabla que lee la consulta por páginas a medida que la vista se
+    desplaza (canFetchMore/fetchMore). Cada página sigue a la última fila
+    cargada con WHERE (clave1, clave2) < (?, ?) ... LIMIT n, así que con un
+    índice sobre las claves cualquier página cuesta lo mismo que la primera,
+    sin importar cuántos años de historia tenga la tabla.
+
+    `select` son las columnas de la consulta y `origen` la tabla (FROM).
+    `claves` son las expresiones del orden por defecto; la última debe ser
+    única (el id). Nada se lee hasta que se llama a set_filtro(). Ordenar
+    por un encabezado vuelve a leer desde SQLite por Columna.sql de esa
+    columna, con el id como desempate.
+    """
+
+    def __init__(
+        self,
+        columnas,
+        db,
+        select,
+        origen,
+        claves,
+        descendente=True,
+        tam_pagina=200,
+        parent=None,
+        fondo_fila=None,
+    ):
+        super().__init__(columnas, parent, fondo_fila)
+        self.db = db
+        self.select = select
+        self.origen = origen
+        self.orden_defecto = (list(claves), descendente)
+        self.claves, self.descendente = self.orden_defecto
+        self.tam_pagina = tam_pagina
+        self.condicion = None
+        self.params = ()
+        self._fin = True
+
+    def set_filtro(self, condicion, params=()):
+        """Condición WHERE de las filas a mostrar; None deja el modelo vacío."""
+        self.condicion = condicion
+        self.params = tuple(params)
+        self.recargar()
+
+    def recargar(self):
+        self.beginResetModel()
+        self.filas = []
+        self._fin = self.condicion is None
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._fin
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        filas = self._leer_pagina()
+        self._fin = len(filas) < self.tam_pagina
+        if filas:
+            inicio = len(self.filas)
+            self.beginInsertRows(QModelIndex(), inicio, inicio + len(filas) - 1)
+            self.filas.extend(filas)
+            self.endInsertRows()
+
+    def cargar_todo(self):
+        """Lee las páginas que falten (para exportar la consulta completa)."""
+        while self.canFetchMore():
+            self.fetchMore()
+
+    def _leer_pagina(self):
+        claves = ", ".join(self.claves)
+        sentido = "DESC" if self.descendente else "ASC"
+        condicion = f"({self.condicion})"
+        params = list(self.params)
+        if self.filas:
+            # Las claves van al final de cada fila (ver el SELECT)
+            n = len(self.claves)
+            operador = "<" if self.descendente else ">"
+            condicion += f" AND ({claves}) {operador} ({', '.join('?' * n)})"
+            params.extend(self.filas[-1][-n:])
+        params.append(self.tam_pagina)
+        query = f"""
+            SELECT {self.select}, {claves}
+            FROM {self.origen}
+            WHERE {condicion}
+            ORDER BY {", ".join(f"{c} {sentido}" for c in self.claves)}
+            LIMIT ?
+        """
+        # Sin caché: cada página es una consulta distinta que no se repite
+        return self.db.fetch_all(query, params, usar_cache=False)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        columna = self.columnas[column] if 0 <= column < len(self.columnas) else None
+        if columna is None or columna.sql is None:
+            self.claves, self.descendente = self.orden_defecto
+        else:
+            if columna.numerica:
+                clave = f"COALESCE({columna.sql}, 0)"
+            else:
+                clave = f"COALESCE({columna.sql}, '') COLLATE SIN_ACENTOS"
+            self.claves = [clave, self.orden_defecto[0][-1]]
+            self.descendente = order == Qt.DescendingOrder
+        self.recargar()
+
+
+class ProxyTabla(QSortFilterProxyModel):
+    """
+    Orden por ROL_ORDEN y filtros "contiene" por columna (sin distinguir
+    mayúsculas) sobre un ModeloTabla.
+    """
+
+    def __init__(self, modelo, parent=None):
+        super().__init__(parent)
+        self.filtros = {}
+        self.setSourceModel(modelo)
+        self.setSortRole(ROL_ORDEN)
+
+    def set_filtros(self, filtros):
+        """filtros: {columna: texto}; los textos vacíos no filtran."""
+        self.filtros = {
+            col: txt.lower().strip() for col, txt in filtros.items() if txt.strip()
+        }
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        modelo = self.sourceModel()
+        for col, txt in self.filtros.items():
+            if txt not in modelo.texto(source_row, col).lower():
+                return False
+        return True
+
+
+def configurar_vista(vista, modelo):
+    """
+    Pone `modelo` en el QTableView `vista` detrás de un ProxyTabla y lo
+    devuelve. Las filas quedan en el orden de la consulta hasta que el
+    usuario ordena por un encabezado. Un ModeloPaginado se pone sin proxy
+    (ordena y filtra en SQLite) y se devuelve None.
+    """
+    proxy = None if isinstance(modelo, ModeloPaginado) else ProxyTabla(modelo, vista)
+    vista.setModel(proxy or modelo)
+    vista.setEditTriggers(QAbstractItemView.NoEditTriggers)
+    vista.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+    vista.setSortingEnabled(True)
+    return proxy
+
+
+def fila_actual(vista):
+    """Fila del modelo (tupla) seleccionada en `vista`, o None."""
+    indice = vista.currentIndex()
+    if not indice.isValid():
+        return None
+    modelo = vista.model()
+    if isinstance(modelo, QSortFilterProxyModel):
+        indice = modelo.mapToSource(indice)
+        modelo = modelo.sourceModel()
+    return modelo.fila(indice.row())
@@ -13,6 +13,8 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QColor
 
+from app.database.async_query import AsyncQueryRunner
+
 _RED   = "#a20f22"
 _ORANGE = "#d0741d"
 _GREEN  = "#27ae60"
@@ -129,6 +131,131 @@ def _make_card(title, color, subtitle=""):
     return frame
 
 
+# ---------------------------------------------------------------------------
+# Consultas (corren en un worker con su propia conexión de lectura)
+# ---------------------------------------------------------------------------
+def _consultar_chart(conn, fuente, hoy):
+    """
+    Devuelve (labels, values) del gráfico de ventas mensuales hasta el mes
+    de `hoy` (va en los argumentos para que el memo del runner cambie de día).
+    """
+    cur = conn.cursor()
+
+    if fuente == "diario":
+        cur.execute(
+            """
+            SELECT mes, COALESCE(SUM(total_ventas), 0)
+            FROM diario_ventas
+            WHERE mes IS NOT NULL
+            GROUP BY mes ORDER BY mes ASC
+            """
+        )
+        rows = cur.fetchall()
+        # diario_ventas stores ISO dates → the generated `mes` column is reliable
+        data = {mes: float(val) for mes, val in rows if mes}
+
+    else:
+        # periodo_inicio is the ISO-normalized start of the POS period
+        # (reportes_ventas has an unused legacy `mes` column, hence the alias)
+        cur.execute(
+            """
+            SELECT substr(rv.periodo_inicio, 1, 7) AS mes_periodo,
+                   COALESCE(SUM(drv.total_venta), 0)
+            FROM reportes_ventas rv
+            JOIN detalle_reportes_ventas drv ON drv.reporte_id = rv.id
+            WHERE rv.periodo_inicio IS NOT NULL
+            GROUP BY mes_periodo ORDER BY mes_periodo ASC
+            """
+        )
+        data = {mes: float(val) for mes, val in cur.fetchall()}
+
+    if not data:
+        return [], []
+
+    # Build a continuous month range: earliest data → current month
+    earliest = min(data.keys())
+    ey, em = map(int, earliest.split("-"))
+    cy, cm = hoy.year, hoy.month
+
+    labels, values = [], []
+    y, m = ey, em
+    while (y, m) <= (cy, cm):
+        key = f"{y:04d}-{m:02d}"
+        labels.append(f"{_MESES_ABR[m - 1]}\n'{y % 100:02d}")
+        values.append(data.get(key, 0.0))
+        m += 1
+        if m > 12:
+            m, y = 1, y + 1
+
+    # Keep the last 18 months when the range is very long
+    if len(labels) > 18:
+        labels = labels[-18:]
+        values = values[-18:]
+
+    return labels, values
+
+
+def _consultar_dashboard(conn, fuente, hoy):
+    ayer_str = (hoy - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+    mes_str  = hoy.strftime("%Y-%m")
+
+    cur = conn.cursor()
+    datos = {"fuente": fuente, "hoy": hoy}
+
+    # --- Valor del inventario ---
+    cur.execute(
+        "SELECT COALESCE(SUM(stock_actual * costo_unitario), 0.0) FROM insumos"
+    )
+    datos["valor_inv"] = cur.fetchone()[0] or 0.0
+
+    # --- Tomas de inventario cerradas ---
+    try:
+        cur.execute(
+            "SELECT COUNT(*) FROM conteos_inventario WHERE estado = 'CERRADO'"
+        )
+        datos["tomas"] = cur.fetchone()[0] or 0
+    except Exception:
+        datos["tomas"] = 0
+
+    # --- Ventas día anterior ---
+    cur.execute(
+        "SELECT COALESCE(SUM(total_ventas), 0.0) FROM diario_ventas WHERE fecha = ?",
+        (ayer_str,),
+    )
+    datos["ventas_ayer"] = cur.fetchone()[0] or 0.0
+
+    # --- Ventas del mes en curso ---
+    cur.execute(
+        "SELECT COALESCE(SUM(total_ventas), 0.0) FROM diario_ventas "
+        "WHERE mes = ?",
+        (mes_str,),
+    )
+    datos["ventas_mes"] = cur.fetchone()[0] or 0.0
+
+    # --- Gráfico ---
+    datos["chart"] = _consultar_chart(conn, fuente, hoy)
+
+    # --- Stock más bajo ---
+    cur.execute(
+        "SELECT nombre, stock_actual FROM insumos ORDER BY stock_actual ASC LIMIT 5"
+    )
+    datos["stock"] = cur.fetchall()
+
+    # --- Top platos vendidos ---
+    cur.execute(
+        """
+        SELECT m.nombre, SUM(d.cantidad) AS total_vendido
+        FROM detalle_ventas_diarias d
+        JOIN menu_items m ON d.menu_item_id = m.id
+        GROUP BY m.id
+        ORDER BY total_vendido DESC
+        LIMIT 5
+        """
+    )
+    datos["platos"] = cur.fetchall()
+    return datos
+
+
 # ---------------------------------------------------------------------------
 # Dashboard
 # ---------------------------------------------------------------------------
@@ -136,6 +263,7 @@ class DashboardView(QWidget):
     def __init__(self, db_manager):
         super().__init__()
         self.db = db_manager
+        self.runner = AsyncQueryRunner(db_manager, self)
         self._build_ui()
 
     # ------------------------------------------------------------------
@@ -340,62 +468,35 @@ class DashboardView(QWidget):
         return {"frame": frame, "table": tbl}
 
     # ------------------------------------------------------------------
-    # Data loading
+    # Data loading (se ejecuta en segundo plano, ver _consultar_dashboard)
     # ------------------------------------------------------------------
     def cargar_datos(self):
-        hoy = datetime.date.today()
-        ayer_str = (hoy - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
-        mes_str  = hoy.strftime("%Y-%m")
+        self.runner.submit(
+            "dashboard", _consultar_dashboard, self._chart_source,
+            datetime.date.today(),
+            on_result=self._aplicar_datos,
+        )
 
-        cur = self.db.cursor
+    def _aplicar_datos(self, datos):
+        hoy = datos["hoy"]
+        ayer = hoy - datetime.timedelta(days=1)
 
-        # --- Valor del inventario ---
-        cur.execute(
-            "SELECT COALESCE(SUM(stock_actual * costo_unitario), 0.0) FROM insumos"
-        )
-        valor_inv = cur.fetchone()[0] or 0.0
-        self.card_inventario.lbl_value.setText(f"$ {valor_inv:,.2f}")
-
-        # --- Tomas de inventario cerradas ---
-        try:
-            cur.execute(
-                "SELECT COUNT(*) FROM conteos_inventario WHERE estado = 'CERRADO'"
-            )
-            tomas = cur.fetchone()[0] or 0
-        except Exception:
-            tomas = 0
-        self.card_tomas.lbl_value.setText(str(tomas))
-
-        # --- Ventas día anterior ---
-        cur.execute(
-            "SELECT COALESCE(SUM(total_ventas), 0.0) FROM diario_ventas WHERE fecha = ?",
-            (ayer_str,),
-        )
-        ventas_ayer = cur.fetchone()[0] or 0.0
-        self.card_ayer.lbl_value.setText(f"$ {ventas_ayer:,.2f}")
+        self.card_inventario.lbl_value.setText(f"$ {datos['valor_inv']:,.2f}")
+        self.card_tomas.lbl_value.setText(str(datos["tomas"]))
+        self.card_ayer.lbl_value.setText(f"$ {datos['ventas_ayer']:,.2f}")
         self.card_ayer.lbl_sub.setText(
-            f"Ayer — {_DIAS_ES[(hoy - datetime.timedelta(days=1)).weekday()]} {ayer_str}"
+            f"Ayer — {_DIAS_ES[ayer.weekday()]} {ayer.strftime('%Y-%m-%d')}"
         )
+        self.card_mes.lbl_value.setText(f"$ {datos['ventas_mes']:,.2f}")
 
-        # --- Ventas del mes en curso ---
-        cur.execute(
-            "SELECT COALESCE(SUM(total_ventas), 0.0) FROM diario_ventas "
-            "WHERE strftime('%Y-%m', fecha) = ?",
-            (mes_str,),
-        )
-        ventas_mes = cur.fetchone()[0] or 0.0
-        self.card_mes.lbl_value.setText(f"$ {ventas_mes:,.2f}")
-
-        # --- Gráfico ---
-        self._load_chart()
+        # --- Gráfico (si no se cambió de fuente mientras tanto) ---
+        if datos["fuente"] == self._chart_source and not self.runner.ocupado("chart"):
+            self._aplicar_chart(datos["chart"])
 
         # --- Stock más bajo ---
-        cur.execute(
-            "SELECT nombre, stock_actual FROM insumos ORDER BY stock_actual ASC LIMIT 5"
-        )
         tbl_s = self.tbl_stock["table"]
         tbl_s.setRowCount(0)
-        for r, (nombre, stock) in enumerate(cur.fetchall()):
+        for r, (nombre, stock) in enumerate(datos["stock"]):
             tbl_s.insertRow(r)
             tbl_s.setItem(r, 0, QTableWidgetItem(nombre))
             it = QTableWidgetItem(f"{stock:.2f}")
@@ -405,19 +506,9 @@ class DashboardView(QWidget):
             tbl_s.setItem(r, 1, it)
 
         # --- Top platos vendidos ---
-        cur.execute(
-            """
-            SELECT m.nombre, SUM(d.cantidad) AS total_vendido
-            FROM detalle_ventas_diarias d
-            JOIN menu_items m ON d.menu_item_id = m.id
-            GROUP BY m.id
-            ORDER BY total_vendido DESC
-            LIMIT 5
-            """
-        )
         tbl_p = self.tbl_platos["table"]
         tbl_p.setRowCount(0)
-        for r, (nombre, cant) in enumerate(cur.fetchall()):
+        for r, (nombre, cant) in enumerate(datos["platos"]):
             tbl_p.insertRow(r)
             tbl_p.setItem(r, 0, QTableWidgetItem(nombre))
             it = QTableWidgetItem(f"{cant:.0f}")
@@ -438,88 +529,13 @@ class DashboardView(QWidget):
         self.lbl_chart.setText(titles[source])
         self._load_chart()
 
-    # ------------------------------------------------------------------
-    # Date parsing helper — handles any common format from POS CSV
-    # ------------------------------------------------------------------
-    _DATE_FMTS = (
-        "%Y-%m-%d",   # ISO  2025-03-01
-        "%d/%m/%Y",   # Latin  01/03/2025
-        "%d-%m-%Y",   # 01-03-2025
-        "%m/%d/%Y",   # US  03/01/2025
-        "%Y/%m/%d",   # 2025/03/01
-        "%d/%m/%y",   # 01/03/25
-    )
-
-    def _parse_mes(self, date_str: str):
-        """Return 'YYYY-MM' from any common date string, or None."""
-        s = date_str.strip()
-        for fmt in self._DATE_FMTS:
-            try:
-                return datetime.datetime.strptime(s, fmt).strftime("%Y-%m")
-            except ValueError:
-                continue
-        return None
-
     def _load_chart(self):
-        cur = self.db.cursor
-
-        if self._chart_source == "diario":
-            cur.execute(
-                """
-                SELECT strftime('%Y-%m', fecha) AS mes, COALESCE(SUM(total_ventas), 0)
-                FROM diario_ventas
-                WHERE fecha IS NOT NULL
-                GROUP BY mes ORDER BY mes ASC
-                """
-            )
-            rows = cur.fetchall()
-            # diario_ventas stores ISO dates → strftime is reliable
-            data = {mes: float(val) for mes, val in rows if mes}
-
-        else:
-            # fecha_inicio_periodo may be stored in any format from the POS CSV.
-            # Group by report id, fetch raw date, aggregate by month in Python.
-            cur.execute(
-                """
-                SELECT rv.fecha_inicio_periodo, COALESCE(SUM(drv.total_venta), 0)
-                FROM reportes_ventas rv
-                JOIN detalle_reportes_ventas drv ON drv.reporte_id = rv.id
-                WHERE rv.fecha_inicio_periodo IS NOT NULL
-                  AND rv.fecha_inicio_periodo != ''
-                GROUP BY rv.id
-                ORDER BY rv.fecha_inicio_periodo ASC
-                """
-            )
-            rows = cur.fetchall()
-            data = {}
-            for fecha_str, total in rows:
-                mes = self._parse_mes(str(fecha_str))
-                if mes:
-                    data[mes] = data.get(mes, 0.0) + float(total)
-
-        if not data:
-            self.bar_chart.refresh([], [])
-            return
-
-        # Build a continuous month range: earliest data → current month
-        today = datetime.date.today()
-        earliest = min(data.keys())
-        ey, em = map(int, earliest.split("-"))
-        cy, cm = today.year, today.month
-
-        labels, values = [], []
-        y, m = ey, em
-        while (y, m) <= (cy, cm):
-            key = f"{y:04d}-{m:02d}"
-            labels.append(f"{_MESES_ABR[m - 1]}\n'{y % 100:02d}")
-            values.append(data.get(key, 0.0))
-            m += 1
-            if m > 12:
-                m, y = 1, y + 1
-
-        # Keep the last 18 months when the range is very long
-        if len(labels) > 18:
-            labels = labels[-18:]
-            values = values[-18:]
+        # Cambiar de fuente antes de que termine la consulta anterior la cancela.
+        self.runner.submit(
+            "chart", _consultar_chart, self._chart_source, datetime.date.today(),
+            on_result=self._aplicar_chart,
+        )
 
+    def _aplicar_chart(self, serie):
+        labels, values = serie
         self.bar_chart.refresh(labels, values)
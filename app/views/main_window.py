@@ -1,6 +1,9 @@
 # [FILE: app/views/main_window.py]
 import sys
 import os
+import importlib
+import logging
+import time
 from PyQt5.QtWidgets import (
     QMainWindow,
     QWidget,
@@ -19,24 +22,29 @@ from PyQt5.QtGui import QIcon, QPixmap
 from PyQt5.QtCore import Qt, QSize, QPropertyAnimation, QEasingCurve, QParallelAnimationGroup
 from app.utils.button_icons import auto_icon_buttons
 
-# --- IMPORTACIÓN DE VISTAS ---
-from app.views.modulos.insumos_crud import InsumosCRUD
-from app.views.modulos.menu_crud import MenuCRUD
-from app.views.modulos.recetas_crud import RecetasCRUD
-from app.views.modulos.unidades_crud import UnidadesCRUD
-
-from app.views.modulos.usuarios import UsuariosWidget
-from app.views.modulos.presupuestos import PresupuestosView
-from app.views.modulos.compras_crud import ComprasCRUD
-from app.views.modulos.ventas import VentasModulo
-
-from app.views.modulos.inventario_view import InventarioView
-from app.views.modulos.conteo_inventario import ConteoInventarioView
-from app.views.dashboard import DashboardView
-from app.views.modulos.consolidados_view import ConsolidadosView
-from app.views.modulos.sucursales_crud import SucursalesCRUD
-from app.views.modulos.grafico_precios import GraficoPreciosView
-from app.views.modulos.planilla import PlanillaView
+logger = logging.getLogger(__name__)
+
+# --- REGISTRO DE VISTAS ---
+# nombre -> (módulo, clase, título). Cada vista se importa la primera vez que
+# se navega a ella, así las librerías pesadas (matplotlib, openpyxl, reportlab)
+# no se cargan antes del login ni para módulos que no se usan.
+MODULOS = {
+    "dashboard": ("app.views.dashboard", "DashboardView", "Panel de Control"),
+    "ventas": ("app.views.modulos.ventas", "VentasModulo", "Módulo de Ventas"),
+    "compras": ("app.views.modulos.compras_crud", "ComprasCRUD", "Gestión de Compras"),
+    "inventario": ("app.views.modulos.inventario_view", "InventarioView", "Inventario Actual"),
+    "conteo": ("app.views.modulos.conteo_inventario", "ConteoInventarioView", "Toma de Inventario"),
+    "insumos": ("app.views.modulos.insumos_crud", "InsumosCRUD", "Catálogo de Insumos"),
+    "menu": ("app.views.modulos.menu_crud", "MenuCRUD", "Gestión de Menú"),
+    "recetas": ("app.views.modulos.recetas_crud", "RecetasCRUD", "Gestión de Recetas"),
+    "presupuestos": ("app.views.modulos.presupuestos", "PresupuestosView", "Gestión de Presupuestos"),
+    "consolidados": ("app.views.modulos.consolidados_view", "ConsolidadosView", "Módulo de Consolidados"),
+    "grafico_precios": ("app.views.modulos.grafico_precios", "GraficoPreciosView", "Análisis de Precios"),
+    "planilla": ("app.views.modulos.planilla", "PlanillaView", "Módulo de Planilla"),
+    "unidades": ("app.views.modulos.unidades_crud", "UnidadesCRUD", "Unidades de Medida"),
+    "sucursales": ("app.views.modulos.sucursales_crud", "SucursalesCRUD", "Gestión de Sucursales"),
+    "usuarios": ("app.views.modulos.usuarios", "UsuariosWidget", "Gestión de Usuarios"),
+}
 
 SIDEBAR_W_EXPANDED = 220
 SIDEBAR_W_COLLAPSED = 56
@@ -447,7 +455,7 @@ class MainWindow(QMainWindow):
                 self.db.switch_database(path)
                 self.actualizar_info_bd()
                 QMessageBox.information(self, "Éxito", f"Conectado exitosamente a:\n{path}")
-                self.modules = {}
+                self._descartar_modulos()
                 self.show_dashboard()
                 self.btn_inicio.setChecked(True)
 
@@ -464,12 +472,22 @@ class MainWindow(QMainWindow):
                 else:
                     QMessageBox.critical(self, "Error", f"No se pudo crear el respaldo: {info}")
 
-    def load_module(self, name, widget_class, title, needs_db=False):
+    def load_module(self, name):
         if name not in self.modules:
-            instance = widget_class(self.db) if needs_db else widget_class()
+            module_path, class_name, title = MODULOS[name]
+            inicio = time.perf_counter()
+            widget_class = getattr(importlib.import_module(module_path), class_name)
+            t_import = time.perf_counter()
+            instance = widget_class(self.db)
             auto_icon_buttons(instance)
             index = self.stacked_widget.addWidget(instance)
             self.modules[name] = {"instance": instance, "index": index, "title": title}
+            logger.info(
+                "Módulo '%s' cargado: import %.0f ms, creación %.0f ms",
+                name,
+                (t_import - inicio) * 1000,
+                (time.perf_counter() - t_import) * 1000,
+            )
 
         module_data = self.modules[name]
         self.stacked_widget.setCurrentIndex(module_data["index"])
@@ -479,50 +497,57 @@ class MainWindow(QMainWindow):
         elif hasattr(module_data["instance"], "cargar_inventario"):
             module_data["instance"].cargar_inventario()
 
+    def _descartar_modulos(self):
+        """Elimina las instancias creadas (p. ej. al cambiar de base de datos)."""
+        for module_data in self.modules.values():
+            self.stacked_widget.removeWidget(module_data["instance"])
+            module_data["instance"].deleteLater()
+        self.modules = {}
+
     def show_ventas(self):
-        self.load_module("ventas", VentasModulo, "Módulo de Ventas", needs_db=True)
+        self.load_module("ventas")
 
     def show_compras(self):
-        self.load_module("compras", ComprasCRUD, "Gestión de Compras", needs_db=True)
+        self.load_module("compras")
 
     def show_inventario(self):
-        self.load_module("inventario", InventarioView, "Inventario Actual", needs_db=True)
+        self.load_module("inventario")
 
     def show_conteo(self):
-        self.load_module("conteo", ConteoInventarioView, "Toma de Inventario", needs_db=True)
+        self.load_module("conteo")
 
     def show_insumos(self):
-        self.load_module("insumos", InsumosCRUD, "Catálogo de Insumos", needs_db=True)
+        self.load_module("insumos")
 
     def show_menu(self):
-        self.load_module("menu", MenuCRUD, "Gestión de Menú", needs_db=True)
+        self.load_module("menu")
 
     def show_recetas(self):
-        self.load_module("recetas", RecetasCRUD, "Gestión de Recetas", needs_db=True)
+        self.load_module("recetas")
 
     def show_presupuestos(self):
-        self.load_module("presupuestos", PresupuestosView, "Gestión de Presupuestos", needs_db=True)
+        self.load_module("presupuestos")
 
     def show_consolidados(self):
-        self.load_module("consolidados", ConsolidadosView, "Módulo de Consolidados", needs_db=True)
+        self.load_module("consolidados")
 
     def show_grafico_precios(self):
-        self.load_module("grafico_precios", GraficoPreciosView, "Análisis de Precios", needs_db=True)
+        self.load_module("grafico_precios")
 
     def show_planilla(self):
-        self.load_module("planilla", PlanillaView, "Módulo de Planilla", needs_db=True)
+        self.load_module("planilla")
 
     def show_unidades(self):
-        self.load_module("unidades", UnidadesCRUD, "Unidades de Medida", needs_db=True)
+        self.load_module("unidades")
 
     def show_sucursales(self):
-        self.load_module("sucursales", SucursalesCRUD, "Gestión de Sucursales", needs_db=True)
+        self.load_module("sucursales")
 
     def show_usuarios(self):
-        self.load_module("usuarios", UsuariosWidget, "Gestión de Usuarios", needs_db=True)
+        self.load_module("usuarios")
 
     def show_dashboard(self):
-        self.load_module("dashboard", DashboardView, "Panel de Control", needs_db=True)
+        self.load_module("dashboard")
 
     def logout(self):
         self.logout_requested = True
@@ -113,21 +113,19 @@ class NuevoAbastecimientoDialog(QDialog):
         self.setLayout(layout)
 
     def cargar_sucursales(self):
-        self.db.cursor.execute("SELECT id, nombre, es_principal FROM sucursales ORDER BY nombre")
-        rows = self.db.cursor.fetchall()
+        rows = self.db.fetch_all("SELECT id, nombre, es_principal FROM sucursales ORDER BY nombre")
         for r in rows:
             nombre = f"{r[1]} (Central)" if r[2] else r[1]
             self.origen_combo.addItem(nombre, r[0])
             self.destino_combo.addItem(nombre, r[0])
 
     def cargar_insumos(self):
-        self.db.cursor.execute("""
+        rows = self.db.fetch_all("""
             SELECT i.id, i.nombre, u.abreviatura, u.id
             FROM insumos i
             LEFT JOIN unidades_medida u ON i.unidad_base_id = u.id
             ORDER BY i.nombre
         """)
-        rows = self.db.cursor.fetchall()
         for r in rows:
             texto = f"{r[1]} ({r[2]})"
             self.insumo_combo.addItem(texto, {"id": r[0], "unidad_str": r[2], "unidad_id": r[3], "nombre": r[1]})
@@ -181,49 +179,44 @@ class NuevoAbastecimientoDialog(QDialog):
             return
 
         try:
-            self.db.cursor.execute("BEGIN TRANSACTION")
+            with self.db.transaction():
             
-            # Obtener datos de origen y destino para ver si son principales
-            self.db.cursor.execute("SELECT es_principal FROM sucursales WHERE id=?", (origen_id,))
-            origen_es_principal = bool(self.db.cursor.fetchone()[0])
+                # Obtener datos de origen y destino para ver si son principales
+                origen_es_principal = bool(self.db.fetch_one("SELECT es_principal FROM sucursales WHERE id=?", (origen_id,))[0])
             
-            self.db.cursor.execute("SELECT es_principal FROM sucursales WHERE id=?", (destino_id,))
-            destino_es_principal = bool(self.db.cursor.fetchone()[0])
+                destino_es_principal = bool(self.db.fetch_one("SELECT es_principal FROM sucursales WHERE id=?", (destino_id,))[0])
 
-            # Insertar abastecimiento
-            self.db.cursor.execute("""
-                INSERT INTO abastecimiento_interno (fecha, sucursal_origen_id, sucursal_destino_id)
-                VALUES (?, ?, ?)
-            """, (fecha, origen_id, destino_id))
+                # Insertar abastecimiento
+                cur = self.db.execute_query("""
+                    INSERT INTO abastecimiento_interno (fecha, sucursal_origen_id, sucursal_destino_id)
+                    VALUES (?, ?, ?)
+                """, (fecha, origen_id, destino_id))
             
-            abastecimiento_id = self.db.cursor.lastrowid
+                abastecimiento_id = cur.lastrowid
             
-            # Insertar detalles y afectar inventario
-            for i in range(self.table_detalles.rowCount()):
-                insumo_id = int(self.table_detalles.item(i, 0).text())
-                cantidad = float(self.table_detalles.item(i, 2).text())
-                unidad_id = int(self.table_detalles.item(i, 3).data(Qt.UserRole))
+                # Insertar detalles y afectar inventario
+                for i in range(self.table_detalles.rowCount()):
+                    insumo_id = int(self.table_detalles.item(i, 0).text())
+                    cantidad = float(self.table_detalles.item(i, 2).text())
+                    unidad_id = int(self.table_detalles.item(i, 3).data(Qt.UserRole))
                 
-                self.db.cursor.execute("""
-                    INSERT INTO detalle_abastecimiento (abastecimiento_id, insumo_id, cantidad, unidad_id)
-                    VALUES (?, ?, ?, ?)
-                """, (abastecimiento_id, insumo_id, cantidad, unidad_id))
+                    self.db.execute_query("""
+                        INSERT INTO detalle_abastecimiento (abastecimiento_id, insumo_id, cantidad, unidad_id)
+                        VALUES (?, ?, ?, ?)
+                    """, (abastecimiento_id, insumo_id, cantidad, unidad_id))
                 
-                # Afectar inventario global si interviene la sucursal principal
-                if origen_es_principal:
-                    # Sale de la principal, descontar stock
-                    self.db.cursor.execute("UPDATE insumos SET stock_actual = stock_actual - ? WHERE id = ?", (cantidad, insumo_id))
+                    # Afectar inventario global si interviene la sucursal principal
+                    if origen_es_principal:
+                        # Sale de la principal, descontar stock
+                        self.db.execute_query("UPDATE insumos SET stock_actual = stock_actual - ? WHERE id = ?", (cantidad, insumo_id))
                 
-                if destino_es_principal:
-                    # Entra a la principal, aumentar stock
-                    self.db.cursor.execute("UPDATE insumos SET stock_actual = stock_actual + ? WHERE id = ?", (cantidad, insumo_id))
-            
-            self.db.conn.commit()
+                    if destino_es_principal:
+                        # Entra a la principal, aumentar stock
+                        self.db.execute_query("UPDATE insumos SET stock_actual = stock_actual + ? WHERE id = ?", (cantidad, insumo_id))
             QMessageBox.information(self, "Éxito", "Abastecimiento registrado correctamente.")
             self.accept()
             
         except Exception as e:
-            self.db.conn.rollback()
             QMessageBox.critical(self, "Error", f"Error al guardar abastecimiento: {e}")
 
 class TabAbastecimientoInterno(QWidget):
@@ -264,14 +257,13 @@ class TabAbastecimientoInterno(QWidget):
         self.setLayout(layout)
 
     def cargar_datos(self):
-        self.db.cursor.execute("""
+        rows = self.db.fetch_all("""
             SELECT a.id, a.fecha, s_origen.nombre, s_destino.nombre, a.estado
             FROM abastecimiento_interno a
             JOIN sucursales s_origen ON a.sucursal_origen_id = s_origen.id
             JOIN sucursales s_destino ON a.sucursal_destino_id = s_destino.id
             ORDER BY a.fecha DESC, a.id DESC
         """)
-        rows = self.db.cursor.fetchall()
         self.table.setRowCount(0)
         for r_idx, row in enumerate(rows):
             self.table.insertRow(r_idx)
@@ -296,33 +288,27 @@ class TabAbastecimientoInterno(QWidget):
         
         if reply == QMessageBox.Yes:
             try:
-                self.db.cursor.execute("BEGIN TRANSACTION")
+                with self.db.transaction():
                 
-                # Obtener detalles para revertir inventario
-                self.db.cursor.execute("SELECT sucursal_origen_id, sucursal_destino_id FROM abastecimiento_interno WHERE id=?", (abastecimiento_id,))
-                origen_id, destino_id = self.db.cursor.fetchone()
+                    # Obtener detalles para revertir inventario
+                    origen_id, destino_id = self.db.fetch_one("SELECT sucursal_origen_id, sucursal_destino_id FROM abastecimiento_interno WHERE id=?", (abastecimiento_id,))
                 
-                self.db.cursor.execute("SELECT es_principal FROM sucursales WHERE id=?", (origen_id,))
-                origen_es_principal = bool(self.db.cursor.fetchone()[0])
+                    origen_es_principal = bool(self.db.fetch_one("SELECT es_principal FROM sucursales WHERE id=?", (origen_id,))[0])
                 
-                self.db.cursor.execute("SELECT es_principal FROM sucursales WHERE id=?", (destino_id,))
-                destino_es_principal = bool(self.db.cursor.fetchone()[0])
+                    destino_es_principal = bool(self.db.fetch_one("SELECT es_principal FROM sucursales WHERE id=?", (destino_id,))[0])
                 
-                self.db.cursor.execute("SELECT insumo_id, cantidad FROM detalle_abastecimiento WHERE abastecimiento_id=?", (abastecimiento_id,))
-                detalles = self.db.cursor.fetchall()
+                    detalles = self.db.fetch_all("SELECT insumo_id, cantidad FROM detalle_abastecimiento WHERE abastecimiento_id=?", (abastecimiento_id,))
                 
-                for insumo_id, cantidad in detalles:
-                    if origen_es_principal:
-                        # Si salió de principal, devolver
-                        self.db.cursor.execute("UPDATE insumos SET stock_actual = stock_actual + ? WHERE id = ?", (cantidad, insumo_id))
-                    if destino_es_principal:
-                        # Si entró a principal, quitar
-                        self.db.cursor.execute("UPDATE insumos SET stock_actual = stock_actual - ? WHERE id = ?", (cantidad, insumo_id))
+                    for insumo_id, cantidad in detalles:
+                        if origen_es_principal:
+                            # Si salió de principal, devolver
+                            self.db.execute_query("UPDATE insumos SET stock_actual = stock_actual + ? WHERE id = ?", (cantidad, insumo_id))
+                        if destino_es_principal:
+                            # Si entró a principal, quitar
+                            self.db.execute_query("UPDATE insumos SET stock_actual = stock_actual - ? WHERE id = ?", (cantidad, insumo_id))
                 
-                self.db.cursor.execute("DELETE FROM abastecimiento_interno WHERE id=?", (abastecimiento_id,))
-                self.db.conn.commit()
+                    self.db.execute_query("DELETE FROM abastecimiento_interno WHERE id=?", (abastecimiento_id,))
                 self.cargar_datos()
                 QMessageBox.information(self, "Éxito", "Registro eliminado correctamente.")
             except Exception as e:
-                self.db.conn.rollback()
                 QMessageBox.critical(self, "Error", f"No se pudo eliminar: {e}")
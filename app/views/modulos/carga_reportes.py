@@ -1,3 +1,5 @@
+import os
+
 from PyQt5.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -12,10 +14,28 @@ from PyQt5.QtWidgets import (
     QTabWidget,
     QSplitter,
     QAbstractItemView,
+    QTableView,
+    QProgressBar,
+)
+from PyQt5.QtCore import (
+    Qt,
+    QAbstractTableModel,
+    QModelIndex,
+    QObject,
+    QRunnable,
+    QThreadPool,
+    pyqtSignal,
+    pyqtSlot,
 )
-from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QColor
-from app.controllers.report_parser import ReportParser
+from app.controllers.report_parser import LIMITE_VISTA_PREVIA, ReportParser
+from app.controllers.importacion_reportes import (
+    guardar_archivo,
+    guardar_parseado,
+    parsear_reportes,
+)
+
+FILTRO_REPORTES = "Reportes del POS (*.csv *.xlsx *.xlsm);;CSV (*.csv);;Excel (*.xlsx *.xlsm)"
 
 
 class CargaReportesWidget(QWidget):
@@ -60,9 +80,119 @@ class CargaReportesWidget(QWidget):
             self.tab_historial.cargar_lista_reportes()
 
 
+class RegistrosVentaModel(QAbstractTableModel):
+    """
+    Vista previa de los RegistroVenta de un reporte. Qt solo pide los datos
+    de las filas visibles, así que un reporte largo no crea miles de items.
+    """
+
+    COLUMNAS = [
+        "Código",
+        "Descripción",
+        "Día",
+        "Cant.",
+        "Prom/Med",
+        "Estim/Med",
+        "Venta ($)",
+        "Costo ($)",
+        "Utilidad ($)",
+        "% Utilidad",
+    ]
+    COLOR_ALERTA = QColor("#ffcccc")  # Rojo claro
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.registros = []
+        self.codigos_bd = set()
+
+    def set_registros(self, registros, codigos_bd):
+        self.beginResetModel()
+        self.registros = registros
+        self.codigos_bd = codigos_bd
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.registros)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNAS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNAS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.registros[index.row()]
+        col = index.column()
+
+        if role == Qt.DisplayRole:
+            if col == 0:
+                return row.code
+            if col == 1:
+                return row.desc
+            if col == 2:
+                return row.day
+            if col == 3:
+                return str(row.qty)
+            if col == 4:
+                return row.prom_med
+            if col == 5:
+                return row.estim_med
+            if col == 6:
+                return f"{row.total_venta:.2f}"
+            if col == 7:
+                return f"{row.total_costo:.2f}"
+            if col == 8:
+                return f"{row.total_utilidad:.2f}"
+            return row.pct_utilidad
+
+        # VALIDACIÓN: Si el código NO está en la lista de la BD, pintar de rojo
+        if row.code not in self.codigos_bd:
+            if role == Qt.BackgroundRole:
+                return self.COLOR_ALERTA
+            if role == Qt.ToolTipRole:
+                return "Este código no existe en el menú actual."
+        return None
+
+
+class _ImportacionSignals(QObject):
+    archivo_parseado = pyqtSignal(object)
+    finalizado = pyqtSignal()
+
+
+class ImportacionWorker(QRunnable):
+    """
+    Corre parsear_reportes() fuera del hilo de la GUI; el parseo va a un
+    pool de procesos. El worker no escribe en la base: cada archivo
+    parseado se emite y la pestaña lo guarda desde el hilo de la GUI.
+    """
+
+    def __init__(self, rutas):
+        super().__init__()
+        self.rutas = rutas
+        self.signals = _ImportacionSignals()
+        self.cancelado = False
+
+    def cancelar(self):
+        self.cancelado = True
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            for parseado in parsear_reportes(
+                self.rutas, cancelado=lambda: self.cancelado
+            ):
+                self.signals.archivo_parseado.emit(parseado)
+        finally:
+            self.signals.finalizado.emit()
+
+
 class PestanaCarga(QWidget):
     """
-    Funcionalidad de carga de CSV con validación visual.
+    Funcionalidad de carga de reportes (CSV o Excel) con validación visual.
     """
 
     def __init__(self, db, callback_cancelar):
@@ -71,13 +201,19 @@ class PestanaCarga(QWidget):
         self.callback_cancelar = callback_cancelar
         self.current_records = []
         self.current_metadata = {}
+        self.current_path = None
+        self.worker_importacion = None
+        self.resultados_importacion = {}
+        self.filas_archivos = {}
         self.init_ui()
 
     def init_ui(self):
         layout = QVBoxLayout()
 
         # Instrucciones
-        lbl_info = QLabel("Seleccione el archivo CSV generado por el POS.")
+        lbl_info = QLabel(
+            "Seleccione el reporte generado por el POS (CSV o Excel .xlsx)."
+        )
         layout.addWidget(lbl_info)
 
         # Leyenda de Colores
@@ -89,12 +225,38 @@ class PestanaCarga(QWidget):
 
         # Botón de Selección
         top_layout = QHBoxLayout()
-        btn_cargar = QPushButton("Seleccionar Archivo CSV...")
+        btn_cargar = QPushButton("Seleccionar Archivo...")
         btn_cargar.setStyleSheet("padding: 8px;")
         btn_cargar.clicked.connect(self.seleccionar_archivo)
         top_layout.addWidget(btn_cargar)
+
+        self.btn_cargar_varios = QPushButton("Importar Varios Archivos...")
+        self.btn_cargar_varios.setStyleSheet("padding: 8px;")
+        self.btn_cargar_varios.clicked.connect(self.importar_varios)
+        top_layout.addWidget(self.btn_cargar_varios)
         layout.addLayout(top_layout)
 
+        # Progreso de la importación múltiple (oculto hasta que se usa)
+        self.progreso = QProgressBar()
+        self.progreso.setVisible(False)
+        layout.addWidget(self.progreso)
+
+        self.tabla_archivos = QTableWidget()
+        self.tabla_archivos.setColumnCount(4)
+        self.tabla_archivos.setHorizontalHeaderLabels(
+            ["Archivo", "Estado", "Periodo", "Registros"]
+        )
+        self.tabla_archivos.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeToContents
+        )
+        self.tabla_archivos.horizontalHeader().setStretchLastSection(True)
+        self.tabla_archivos.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tabla_archivos.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tabla_archivos.setMaximumHeight(160)
+        self.tabla_archivos.setVisible(False)
+        self.tabla_archivos.itemClicked.connect(self.ver_archivo_importado)
+        layout.addWidget(self.tabla_archivos)
+
         # Info del Reporte
         info_group = QHBoxLayout()
         self.lbl_fechas = QLabel("Periodo Detectado: -")
@@ -112,23 +274,13 @@ class PestanaCarga(QWidget):
         layout.addLayout(info_group)
 
         # Tabla de Previsualización (Muestra las 10 columnas)
-        self.table = QTableWidget()
-        self.table.setColumnCount(10)
-        self.table.setHorizontalHeaderLabels(
-            [
-                "Código",
-                "Descripción",
-                "Día",
-                "Cant.",
-                "Prom/Med",
-                "Estim/Med",
-                "Venta ($)",
-                "Costo ($)",
-                "Utilidad ($)",
-                "% Utilidad",
-            ]
-        )
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.modelo = RegistrosVentaModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.modelo)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        # Interactive: ResizeToContents recorrería todas las filas
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.table.horizontalHeader().setStretchLastSection(True)
         layout.addWidget(self.table)
 
         # Botones de Acción
@@ -153,16 +305,21 @@ class PestanaCarga(QWidget):
 
     def seleccionar_archivo(self):
         fname, _ = QFileDialog.getOpenFileName(
-            self, "Abrir Reporte CSV", "", "CSV Files (*.csv)"
+            self, "Abrir Reporte", "", FILTRO_REPORTES
         )
         if fname:
             try:
-                metadata, records, error = ReportParser.parse_csv(fname)
+                # Solo vista previa: al guardar el archivo se lee de nuevo en streaming
+                metadata, records, error = ReportParser.parse_csv(
+                    fname, LIMITE_VISTA_PREVIA
+                )
                 if error:
                     QMessageBox.warning(self, "Advertencia", error)
 
                 self.current_records = records
                 self.current_metadata = metadata
+                # Un archivo que no se leyó completo no se guarda
+                self.current_path = None if error else fname
                 self.mostrar_datos(records, metadata)
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Error leyendo archivo:\n{str(e)}")
@@ -178,55 +335,19 @@ class PestanaCarga(QWidget):
 
         self.lbl_fechas.setText(f"Periodo Detectado: {inicio} al {fin}")
         self.lbl_sugerido.setText(f"% Sugerido: {pct_sugerido}%")  # NUEVO
-        self.lbl_registros.setText(f"Registros: {len(records)}")
-
-        # Mostrar TODOS los registros (Se eliminó el límite de 500)
-        self.table.setRowCount(len(records))
-
-        color_alerta = QColor("#ffcccc")  # Rojo claro
-
-        for r_idx, row in enumerate(records):
-            codigo_reporte = str(row.get("code", "")).strip()
-
-            # Crear items extrayendo todas las llaves del diccionario de ReportParser
-            item_code = QTableWidgetItem(codigo_reporte)
-            item_desc = QTableWidgetItem(str(row.get("desc", "")))
-            item_day = QTableWidgetItem(str(row.get("day", "")))
-            item_qty = QTableWidgetItem(str(row.get("qty", "")))
-            item_prom = QTableWidgetItem(str(row.get("prom_med", "")))
-            item_estim = QTableWidgetItem(str(row.get("estim_med", "")))
-            item_venta = QTableWidgetItem(f"{float(row.get('total_venta', 0)):.2f}")
-            item_costo = QTableWidgetItem(f"{float(row.get('total_costo', 0)):.2f}")
-            item_utilidad = QTableWidgetItem(
-                f"{float(row.get('total_utilidad', 0)):.2f}"
+        total = metadata.get("total_registros", len(records))
+        if total > len(records):
+            self.lbl_registros.setText(
+                f"Registros: {total} (vista previa de {len(records)})"
             )
-            item_pct = QTableWidgetItem(str(row.get("pct_utilidad", "")))
-
-            items_fila = [
-                item_code,
-                item_desc,
-                item_day,
-                item_qty,
-                item_prom,
-                item_estim,
-                item_venta,
-                item_costo,
-                item_utilidad,
-                item_pct,
-            ]
+        else:
+            self.lbl_registros.setText(f"Registros: {total}")
 
-            # VALIDACIÓN: Si el código NO está en la lista de la BD, pintar de rojo
-            if codigo_reporte not in codigos_bd:
-                for item in items_fila:
-                    item.setBackground(color_alerta)
-                    item.setToolTip("Este código no existe en el menú actual.")
-
-            # Insertar elementos en la fila
-            for c_idx, item in enumerate(items_fila):
-                self.table.setItem(r_idx, c_idx, item)
+        # El modelo pinta en rojo los códigos que no existen en el menú
+        self.modelo.set_registros(records, set(codigos_bd))
 
     def guardar_en_bd(self):
-        if not self.current_records:
+        if not self.current_records or not self.current_path:
             return QMessageBox.warning(self, "Vacío", "No hay datos para guardar.")
 
         confirm = QMessageBox.question(
@@ -236,8 +357,27 @@ class PestanaCarga(QWidget):
             QMessageBox.Yes | QMessageBox.No,
         )
         if confirm == QMessageBox.Yes:
-            success, msg = self.db.guardar_reporte_mensual(
-                self.current_metadata, self.current_records
+            existente = self.db.buscar_reporte_importado(self.current_metadata)
+            if existente:
+                reporte_id, motivo = existente
+                if motivo == "archivo":
+                    return QMessageBox.warning(
+                        self,
+                        "Duplicado",
+                        f"Este archivo ya fue importado (Reporte ID: {reporte_id}).",
+                    )
+                actualizar = QMessageBox.question(
+                    self,
+                    "Periodo ya cargado",
+                    f"Ya existe el reporte ID {reporte_id} para este periodo.\n"
+                    "¿Actualizarlo con este archivo? Solo se aplicarán las diferencias.",
+                    QMessageBox.Yes | QMessageBox.No,
+                )
+                if actualizar != QMessageBox.Yes:
+                    return
+
+            success, msg = guardar_archivo(
+                self.db, self.current_path, self.current_metadata
             )
             if success:
                 QMessageBox.information(self, "Éxito", msg)
@@ -254,10 +394,117 @@ class PestanaCarga(QWidget):
     def limpiar(self):
         self.current_records = []
         self.current_metadata = {}
-        self.table.setRowCount(0)
+        self.current_path = None
+        self.modelo.set_registros([], set())
         self.lbl_fechas.setText("Periodo Detectado: -")
         self.lbl_sugerido.setText("% Sugerido: -")  # NUEVO
         self.lbl_registros.setText("Registros: 0")
+        if self.worker_importacion is None:
+            self.resultados_importacion = {}
+            self.tabla_archivos.setRowCount(0)
+            self.tabla_archivos.setVisible(False)
+            self.progreso.setVisible(False)
+        else:
+            self.worker_importacion.cancelar()
+
+    # ------------------------------------------------------------------
+    # Importación múltiple
+    # ------------------------------------------------------------------
+    def importar_varios(self):
+        rutas, _ = QFileDialog.getOpenFileNames(
+            self, "Importar Reportes", "", FILTRO_REPORTES
+        )
+        if not rutas:
+            return
+
+        confirm = QMessageBox.question(
+            self,
+            "Confirmar",
+            f"¿Importar {len(rutas)} reportes al historial?\n"
+            "Cada archivo se guarda por separado; si uno falla, los demás se conservan.",
+            QMessageBox.Yes | QMessageBox.No,
+        )
+        if confirm != QMessageBox.Yes:
+            return
+
+        self.limpiar()
+        self.filas_archivos = {}
+        self.tabla_archivos.setRowCount(len(rutas))
+        for i, ruta in enumerate(rutas):
+            self.filas_archivos[ruta] = i
+            self.tabla_archivos.setItem(i, 0, QTableWidgetItem(os.path.basename(ruta)))
+            self.tabla_archivos.setItem(i, 1, QTableWidgetItem("Pendiente..."))
+            self.tabla_archivos.setItem(i, 2, QTableWidgetItem("-"))
+            self.tabla_archivos.setItem(i, 3, QTableWidgetItem("-"))
+        self.tabla_archivos.setVisible(True)
+
+        self.progreso.setRange(0, len(rutas))
+        self.progreso.setValue(0)
+        self.progreso.setFormat("%v de %m archivos")
+        self.progreso.setVisible(True)
+        self.btn_cargar_varios.setEnabled(False)
+
+        self.worker_importacion = ImportacionWorker(rutas)
+        self.worker_importacion.signals.archivo_parseado.connect(self._archivo_parseado)
+        self.worker_importacion.signals.finalizado.connect(self._importacion_finalizada)
+        QThreadPool.globalInstance().start(self.worker_importacion)
+
+    def _archivo_parseado(self, parseado):
+        # Puede llegar un archivo ya en cola después de cancelar
+        if self.worker_importacion is None or self.worker_importacion.cancelado:
+            return
+        self._archivo_importado(guardar_parseado(self.db, *parseado))
+
+    def _archivo_importado(self, resultado):
+        fila = self.filas_archivos.get(resultado.ruta)
+        if fila is None:
+            return
+        self.resultados_importacion[fila] = resultado
+
+        if resultado.duplicado:
+            estado = QTableWidgetItem("↺ Ya importado")
+            estado.setForeground(QColor("#6c757d"))
+        elif resultado.ok:
+            estado = QTableWidgetItem("✔ Guardado")
+        else:
+            estado = QTableWidgetItem("✖ Error")
+            estado.setForeground(QColor("#dc3545"))
+        estado.setToolTip(resultado.mensaje)
+        self.tabla_archivos.setItem(fila, 1, estado)
+
+        meta = resultado.metadata or {}
+        periodo = f"{meta.get('desde', 'N/A')} al {meta.get('hasta', 'N/A')}"
+        self.tabla_archivos.setItem(fila, 2, QTableWidgetItem(periodo))
+        self.tabla_archivos.setItem(
+            fila, 3, QTableWidgetItem(str(meta.get("total_registros", 0)))
+        )
+        self.progreso.setValue(self.progreso.value() + 1)
+
+    def _importacion_finalizada(self):
+        self.worker_importacion = None
+        self.btn_cargar_varios.setEnabled(True)
+
+        guardados = sum(1 for r in self.resultados_importacion.values() if r.ok)
+        total = self.tabla_archivos.rowCount()
+        QMessageBox.information(
+            self,
+            "Importación",
+            f"Reportes guardados: {guardados} de {total}.\n"
+            "Seleccione un archivo de la lista para ver su detalle.",
+        )
+
+    def ver_archivo_importado(self, item):
+        resultado = self.resultados_importacion.get(item.row())
+        if resultado is None:
+            return
+        if not resultado.ok and not resultado.duplicado:
+            QMessageBox.warning(self, "Error", resultado.mensaje)
+
+        # Solo vista previa: el reporte ya quedó guardado en el historial
+        self.current_records = []
+        self.current_metadata = {}
+        self.current_path = None
+        self.mostrar_datos(resultado.registros, resultado.metadata or {})
 
 
 class PestanaHistorial(QWidget):
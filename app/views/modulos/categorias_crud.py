@@ -14,6 +14,8 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt
 
+from app.controllers.catalogos import invalidar_catalogos
+
 
 class CategoriasCRUD(QWidget):
     def __init__(self, db_manager):
@@ -85,6 +87,7 @@ class CategoriasCRUD(QWidget):
                         "INSERT INTO categorias_insumos (codigo, nombre) VALUES (?,?)",
                         (codigo, nombre),
                     )
+                    invalidar_catalogos(self.db, "categorias")
                     self.cargar_datos()
                 except Exception as e:
                     QMessageBox.warning(
@@ -116,4 +119,5 @@ class CategoriasCRUD(QWidget):
             self.db.execute_query(
                 "DELETE FROM categorias_insumos WHERE id=?", (id_cat,)
             )
+            invalidar_catalogos(self.db, "categorias")
             self.cargar_datos()
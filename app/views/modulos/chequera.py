@@ -4,6 +4,7 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QTableWidget,
     QTableWidgetItem,
+    QTableView,
     QPushButton,
     QLabel,
     QLineEdit,
@@ -19,6 +20,9 @@ from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QColor
 import csv
 
+from app.database.busqueda import SIN_BUSQUEDA, filtro_columnas
+from app.utils.modelo_tabla import Columna, ModeloPaginado, configurar_vista, fila_actual, monto, texto
+
 
 class NumericItem(QTableWidgetItem):
     """Permite ordenar columnas numéricas correctamente."""
@@ -104,14 +108,13 @@ class ChequeraDialog(QDialog):
                 SET fecha=?, no_ck=?, nombre_cheque=?, detalle=?, monto=?
                 WHERE id=?
             """
-            self.db.cursor.execute(query, (fecha, no_ck, nombre, detalle, monto, self.data["id"]))
+            self.db.execute_query(query, (fecha, no_ck, nombre, detalle, monto, self.data["id"]))
         else:
             query = """
                 INSERT INTO chequera (fecha, no_ck, nombre_cheque, detalle, monto)
                 VALUES (?, ?, ?, ?, ?)
             """
-            self.db.cursor.execute(query, (fecha, no_ck, nombre, detalle, monto))
-        self.db.conn.commit()
+            self.db.execute_query(query, (fecha, no_ck, nombre, detalle, monto))
         return True
 
     def save(self):
@@ -206,14 +209,26 @@ class ChequeraCRUD(QWidget):
         layout.addLayout(filter_layout)
 
         # --- TABLA ---
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(["ID", "FECHA", "No.CK", "NOMBRE CHEQUE", "DETALLE", "MONTO"])
+        self.table = QTableView()
+        self.modelo = ModeloPaginado(
+            [
+                Columna("ID", numerica=True, sql="id"),
+                Columna("FECHA", sql="fecha"),
+                Columna("No.CK", sql="no_ck"),
+                Columna("NOMBRE CHEQUE", sql="nombre_cheque"),
+                Columna("DETALLE", sql="detalle"),
+                Columna("MONTO", monto, numerica=True, sql="monto"),
+            ],
+            self.db,
+            "id, fecha, no_ck, nombre_cheque, detalle, monto",
+            "chequera",
+            ["fecha", "id"],
+            parent=self,
+        )
+        configurar_vista(self.table, self.modelo)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
         self.table.setAlternatingRowColors(True)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.table.setSortingEnabled(True)
         self.table.hideColumn(0)  # Ocultar la columna de ID, aunque está disponible para lógica
         layout.addWidget(self.table)
 
@@ -225,42 +240,17 @@ class ChequeraCRUD(QWidget):
 
     def cargar_datos(self):
         self.cargar_resumen()
-        self.table.setSortingEnabled(False)
-        self.db.cursor.execute("SELECT id, fecha, no_ck, nombre_cheque, detalle, monto FROM chequera ORDER BY fecha DESC, id DESC")
-        rows = self.db.cursor.fetchall()
-        self.table.setRowCount(0)
-
-        for r_idx, row in enumerate(rows):
-            self.table.insertRow(r_idx)
-            
-            # ID
-            self.table.setItem(r_idx, 0, NumericItem(str(row[0])))
-            # FECHA
-            self.table.setItem(r_idx, 1, QTableWidgetItem(str(row[1] or "")))
-            # No.CK
-            self.table.setItem(r_idx, 2, QTableWidgetItem(str(row[2] or "")))
-            # NOMBRE CHEQUE
-            self.table.setItem(r_idx, 3, QTableWidgetItem(str(row[3] or "")))
-            # DETALLE
-            self.table.setItem(r_idx, 4, QTableWidgetItem(str(row[4] or "")))
-            
-            # MONTO (Numérico)
-            self.table.setItem(r_idx, 5, NumericItem(f"{float(row[5] or 0.0):.2f}"))
-
-        self.table.setSortingEnabled(True)
         self.aplicar_filtros()
 
     def cargar_resumen(self):
-        self.db.cursor.execute("""
+        rows = self.db.fetch_all("""
             SELECT 
-                strftime('%Y-%m', fecha) as mes_anio,
+                mes,
                 SUM(monto) as total_monto
             FROM chequera
-            GROUP BY mes_anio
-            ORDER BY mes_anio DESC
+            GROUP BY mes
+            ORDER BY mes DESC
         """)
-        
-        rows = self.db.cursor.fetchall()
         self.table_resumen.setRowCount(0)
         
         for r_idx, row in enumerate(rows):
@@ -273,19 +263,12 @@ class ChequeraCRUD(QWidget):
             self.table_resumen.setItem(r_idx, 1, NumericItem(f"{monto_total:.2f}"))
 
     def aplicar_filtros(self):
-        rows = self.table.rowCount()
-        for row in range(rows):
-            mostrar = True
-            for col, inp in self.filtros.items():
-                texto_filtro = inp.text().lower().strip()
-                if not texto_filtro:
-                    continue
-                item = self.table.item(row, col)
-                if item:
-                    if texto_filtro not in item.text().lower():
-                        mostrar = False
-                        break
-            self.table.setRowHidden(row, not mostrar)
+        # Filtros en SQLite: el modelo vuelve a leer solo la primera página
+        condicion, params = filtro_columnas(
+            SIN_BUSQUEDA,
+            [(self.modelo.columnas[col].sql, inp.text()) for col, inp in self.filtros.items()],
+        )
+        self.modelo.set_filtro(condicion, params)
 
     def abrir_crear(self):
         dlg = ChequeraDialog(self.db, parent=self)
@@ -293,17 +276,17 @@ class ChequeraCRUD(QWidget):
         self.cargar_datos()
 
     def abrir_editar(self):
-        row = self.table.currentRow()
-        if row < 0:
+        fila = fila_actual(self.table)
+        if fila is None:
             return QMessageBox.warning(self, "Aviso", "Seleccione un registro para editar.")
 
         data = {
-            "id": self.table.item(row, 0).text(),
-            "fecha": self.table.item(row, 1).text(),
-            "no_ck": self.table.item(row, 2).text(),
-            "nombre_cheque": self.table.item(row, 3).text(),
-            "detalle": self.table.item(row, 4).text(),
-            "monto": self.table.item(row, 5).text(),
+            "id": fila[0],
+            "fecha": texto(fila[1]),
+            "no_ck": texto(fila[2]),
+            "nombre_cheque": texto(fila[3]),
+            "detalle": texto(fila[4]),
+            "monto": fila[5] or 0.0,
         }
 
         dlg = ChequeraDialog(self.db, data=data, parent=self)
@@ -311,16 +294,15 @@ class ChequeraCRUD(QWidget):
             self.cargar_datos()
 
     def eliminar(self):
-        row = self.table.currentRow()
-        if row < 0:
+        fila = fila_actual(self.table)
+        if fila is None:
             return QMessageBox.warning(self, "Aviso", "Seleccione un registro para eliminar.")
 
-        id_registro = self.table.item(row, 0).text()
+        id_registro = fila[0]
         
         reply = QMessageBox.question(self, 'Confirmar', '¿Está seguro de eliminar este registro?',
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            self.db.cursor.execute("DELETE FROM chequera WHERE id=?", (id_registro,))
-            self.db.conn.commit()
+            self.db.execute_query("DELETE FROM chequera WHERE id=?", (id_registro,))
             self.cargar_datos()
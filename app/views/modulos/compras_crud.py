@@ -27,6 +27,8 @@ from datetime import datetime, timedelta
 import calendar
 
 from app.controllers.kardex_controller import KardexController
+from app.controllers.catalogos import invalidar_catalogos
+from app.utils.combos import asignar_combo
 from app.styles import COLORS
 
 
@@ -276,31 +278,32 @@ class TabGestionCompras(QWidget):
     def procesar_recepcion(self, compra_id):
         try:
             kardex = KardexController(self.db)
-            detalles = self.db.fetch_all(
-                "SELECT presentacion_id, cantidad FROM detalle_compras WHERE compra_id=?",
-                (compra_id,),
-            )
-
-            for pres_id, cant_compra in detalles:
-                pres = self.db.fetch_one(
-                    "SELECT insumo_id, cantidad_contenido, nombre FROM presentaciones_compra WHERE id=?",
-                    (pres_id,),
+            with self.db.transaction():
+                detalles = self.db.fetch_all(
+                    "SELECT presentacion_id, cantidad FROM detalle_compras WHERE compra_id=?",
+                    (compra_id,),
                 )
-                if pres:
-                    insumo_id, contenido_unitario, nombre_pres = pres
-                    cantidad_total_a_sumar = cant_compra * contenido_unitario
-
-                    kardex.registrar_movimiento(
-                        insumo_id=insumo_id,
-                        cantidad=cantidad_total_a_sumar,
-                        tipo="COMPRA",
-                        referencia_id=compra_id,
-                        observacion=f"Entrada por Compra (Presentación: {nombre_pres})",
+
+                for pres_id, cant_compra in detalles:
+                    pres = self.db.fetch_one(
+                        "SELECT insumo_id, cantidad_contenido, nombre FROM presentaciones_compra WHERE id=?",
+                        (pres_id,),
                     )
+                    if pres:
+                        insumo_id, contenido_unitario, nombre_pres = pres
+                        cantidad_total_a_sumar = cant_compra * contenido_unitario
+
+                        kardex.registrar_movimiento(
+                            insumo_id=insumo_id,
+                            cantidad=cantidad_total_a_sumar,
+                            tipo="COMPRA",
+                            referencia_id=compra_id,
+                            observacion=f"Entrada por Compra (Presentación: {nombre_pres})",
+                        )
 
-            self.db.execute_query(
-                "UPDATE compras SET estado='RECIBIDO' WHERE id=?", (compra_id,)
-            )
+                self.db.execute_query(
+                    "UPDATE compras SET estado='RECIBIDO' WHERE id=?", (compra_id,)
+                )
             QMessageBox.information(
                 self,
                 "Éxito",
@@ -474,8 +477,7 @@ class NuevaCompraDialog(QDialog):
         self.setLayout(layout)
 
     def cargar_proveedores(self):
-        for r in self.db.fetch_all("SELECT id, nombre FROM proveedores"):
-            self.cmb_prov.addItem(r[1], r[0])
+        asignar_combo(self.cmb_prov, self.db, "proveedores")
 
     # --- NUEVO ---
     def cargar_presupuestos(self):
@@ -485,12 +487,7 @@ class NuevaCompraDialog(QDialog):
             self.cmb_presupuesto.addItem(f"Presupuesto N° {r[1]} ({r[2]}/{r[3]})", r[0])
 
     def cargar_presentaciones(self):
-        query = """
-            SELECT p.id, p.nombre, i.nombre, p.precio_compra 
-            FROM presentaciones_compra p JOIN insumos i ON p.insumo_id = i.id
-        """
-        for r in self.db.fetch_all(query):
-            self.cmb_pres.addItem(f"{r[2]} - {r[1]}", {"id": r[0], "precio": r[3]})
+        asignar_combo(self.cmb_pres, self.db, "presentaciones")
 
     def agregar_item_lista(self):
         data = self.cmb_pres.currentData()
@@ -628,36 +625,40 @@ class NuevaCompraDialog(QDialog):
         pres_id = self.cmb_presupuesto.currentData()  # --- NUEVO ---
 
         try:
-            if self.compra_id:
-                # --- MODIFICADO: Guardar presupuesto_id ---
-                self.db.execute_query(
-                    "UPDATE compras SET proveedor_id=?, fecha_compra=?, total=?, tipo_pago=?, presupuesto_id=? WHERE id=?",
-                    (prov_id, fecha, total, tipo_pago, pres_id, self.compra_id),
-                )
-                self.db.execute_query(
-                    "DELETE FROM detalle_compras WHERE compra_id=?", (self.compra_id,)
-                )
-                compra_actual = self.compra_id
-                msg = "Compra actualizada correctamente."
-            else:
-                # --- MODIFICADO: Insertar presupuesto_id ---
-                cur = self.db.execute_query(
-                    "INSERT INTO compras (proveedor_id, fecha_compra, total, estado, tipo_pago, presupuesto_id) VALUES (?,?,?,?,?,?)",
-                    (prov_id, fecha, total, "PENDIENTE", tipo_pago, pres_id),
-                )
-                compra_actual = cur.lastrowid
-                msg = "Compra registrada correctamente."
+            # Cabecera y detalles se confirman juntos (un solo commit)
+            with self.db.transaction():
+                if self.compra_id:
+                    # --- MODIFICADO: Guardar presupuesto_id ---
+                    self.db.execute_query(
+                        "UPDATE compras SET proveedor_id=?, fecha_compra=?, total=?, tipo_pago=?, presupuesto_id=? WHERE id=?",
+                        (prov_id, fecha, total, tipo_pago, pres_id, self.compra_id),
+                    )
+                    self.db.execute_query(
+                        "DELETE FROM detalle_compras WHERE compra_id=?", (self.compra_id,)
+                    )
+                    compra_actual = self.compra_id
+                    msg = "Compra actualizada correctamente."
+                else:
+                    # --- MODIFICADO: Insertar presupuesto_id ---
+                    cur = self.db.execute_query(
+                        "INSERT INTO compras (proveedor_id, fecha_compra, total, estado, tipo_pago, presupuesto_id) VALUES (?,?,?,?,?,?)",
+                        (prov_id, fecha, total, "PENDIENTE", tipo_pago, pres_id),
+                    )
+                    compra_actual = cur.lastrowid
+                    msg = "Compra registrada correctamente."
 
-            for d in self.detalles:
-                self.db.execute_query(
+                self.db.execute_many(
                     "INSERT INTO detalle_compras (compra_id, presentacion_id, cantidad, precio_unitario, subtotal) VALUES (?,?,?,?,?)",
-                    (
-                        compra_actual,
-                        d["pres_id"],
-                        d["cant"],
-                        d["precio"],
-                        d["subtotal"],
-                    ),
+                    [
+                        (
+                            compra_actual,
+                            d["pres_id"],
+                            d["cant"],
+                            d["precio"],
+                            d["subtotal"],
+                        )
+                        for d in self.detalles
+                    ],
                 )
 
             QMessageBox.information(self, "Éxito", msg)
@@ -712,6 +713,7 @@ class TabProveedores(QWidget):
             self.db.execute_query(
                 "INSERT INTO proveedores (nombre, tipo) VALUES (?,?)", (nom, tipo)
             )
+            invalidar_catalogos(self.db, "proveedores")
             self.cargar_proveedores()
             self.txt_nombre.clear()
 
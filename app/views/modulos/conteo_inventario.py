@@ -28,8 +28,6 @@ from PyQt5.QtWidgets import (
     QWidget,
 )
 
-from app.reports.conteo_excel import generar_excel_conteo
-
 
 # ── helpers ───────────────────────────────────────────────────────────────────
 
@@ -296,6 +294,8 @@ class NuevoConteoDialog(QDialog):
             })
 
         try:
+            from app.reports.conteo_excel import generar_excel_conteo
+
             excel_path = generar_excel_conteo(conteo_id, fecha, desc, cat_nombre, filas_excel)
             _open_file(excel_path)
             QMessageBox.information(
@@ -579,39 +579,50 @@ class ConteoActivoDialog(QDialog):
         if reply != QMessageBox.Yes:
             return
 
-        ajustados = 0
-        for r in range(self.tbl_revision.rowCount()):
-            det_id     = int(self.tbl_revision.item(r, 0).text())
-            chk_widget = self.tbl_revision.cellWidget(r, 7)
-            chk        = chk_widget.findChild(QCheckBox)
-            if not chk or not chk.isChecked():
-                continue
-
-            motivo_edit = self.tbl_revision.cellWidget(r, 6)
-            motivo      = motivo_edit.text().strip() if motivo_edit else ""
-
-            row = self.db.fetch_one(
-                "SELECT insumo_id, diferencia, ajuste_aplicado FROM detalle_conteo_inventario WHERE id = ?",
-                (det_id,),
-            )
-            if not row or row[2]:
-                continue
-            insumo_id, diferencia, _ = row
-            if diferencia is None or diferencia == 0:
-                continue
-
-            _registrar_ajuste_kardex(self.db, insumo_id, diferencia, self.conteo_id, motivo)
-            self.db.execute_query(
-                "UPDATE detalle_conteo_inventario SET aprobado=1, ajuste_aplicado=1, motivo_ajuste=? WHERE id=?",
-                (motivo, det_id),
+        from datetime import datetime
+        detalles = {
+            row[0]: row[1:]
+            for row in self.db.fetch_all(
+                "SELECT id, insumo_id, diferencia, ajuste_aplicado FROM detalle_conteo_inventario WHERE conteo_id = ?",
+                (self.conteo_id,),
             )
-            ajustados += 1
+        }
 
-        from datetime import datetime
-        self.db.execute_query(
-            "UPDATE conteos_inventario SET estado='CERRADO', fecha_cierre=? WHERE id=?",
-            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), self.conteo_id),
-        )
+        ajustados = 0
+        try:
+            # Todos los ajustes y el cierre se confirman en un solo commit
+            with self.db.transaction():
+                for r in range(self.tbl_revision.rowCount()):
+                    det_id     = int(self.tbl_revision.item(r, 0).text())
+                    chk_widget = self.tbl_revision.cellWidget(r, 7)
+                    chk        = chk_widget.findChild(QCheckBox)
+                    if not chk or not chk.isChecked():
+                        continue
+
+                    motivo_edit = self.tbl_revision.cellWidget(r, 6)
+                    motivo      = motivo_edit.text().strip() if motivo_edit else ""
+
+                    row = detalles.get(det_id)
+                    if not row or row[2]:
+                        continue
+                    insumo_id, diferencia, _ = row
+                    if diferencia is None or diferencia == 0:
+                        continue
+
+                    _registrar_ajuste_kardex(self.db, insumo_id, diferencia, self.conteo_id, motivo)
+                    self.db.execute_query(
+                        "UPDATE detalle_conteo_inventario SET aprobado=1, ajuste_aplicado=1, motivo_ajuste=? WHERE id=?",
+                        (motivo, det_id),
+                    )
+                    ajustados += 1
+
+                self.db.execute_query(
+                    "UPDATE conteos_inventario SET estado='CERRADO', fecha_cierre=? WHERE id=?",
+                    (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), self.conteo_id),
+                )
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No se pudo cerrar la sesión:\n{e}")
+            return
 
         QMessageBox.information(
             self,
@@ -652,6 +663,8 @@ class ConteoActivoDialog(QDialog):
                 "presentaciones": [p[0] for p in presentaciones],
             })
         try:
+            from app.reports.conteo_excel import generar_excel_conteo
+
             path = generar_excel_conteo(self.conteo_id, fecha, desc, cat_nombre, filas_excel)
             _open_file(path)
         except Exception as e:
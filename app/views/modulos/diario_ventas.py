@@ -4,6 +4,7 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QTableWidget,
     QTableWidgetItem,
+    QTableView,
     QPushButton,
     QLabel,
     QLineEdit,
@@ -21,6 +22,9 @@ from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QColor
 import csv
 
+from app.database.busqueda import SIN_BUSQUEDA, filtro_columnas
+from app.utils.modelo_tabla import Columna, ModeloPaginado, configurar_vista, fila_actual, monto
+
 class NumericItem(QTableWidgetItem):
     """Permite ordenar columnas numéricas correctamente."""
     def __lt__(self, other):
@@ -198,15 +202,14 @@ class DiarioVentasDialog(QDialog):
                 SET fecha=?, total_ventas=?, yappy=?, pedidos_ya=?, clave=?, visa_mastercard=?, efectivo=?, vale=?, vale_descripcion=?, no_facturas=?, sobrante=?, faltante=?, depositos=?
                 WHERE id=?
             """
-            self.db.cursor.execute(query, (fecha, total_ventas, yappy, pedidos_ya, clave, visa_mastercard, efectivo, vale, vale_descripcion, no_facturas, sobrante, faltante, depositos, self.data["id"]))
+            self.db.execute_query(query, (fecha, total_ventas, yappy, pedidos_ya, clave, visa_mastercard, efectivo, vale, vale_descripcion, no_facturas, sobrante, faltante, depositos, self.data["id"]))
         else:
             query = """
                 INSERT INTO diario_ventas (fecha, total_ventas, yappy, pedidos_ya, clave, visa_mastercard, efectivo, vale, vale_descripcion, no_facturas, sobrante, faltante, depositos)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """
-            self.db.cursor.execute(query, (fecha, total_ventas, yappy, pedidos_ya, clave, visa_mastercard, efectivo, vale, vale_descripcion, no_facturas, sobrante, faltante, depositos))
+            self.db.execute_query(query, (fecha, total_ventas, yappy, pedidos_ya, clave, visa_mastercard, efectivo, vale, vale_descripcion, no_facturas, sobrante, faltante, depositos))
             
-        self.db.conn.commit()
         return True
 
     def save(self):
@@ -290,28 +293,26 @@ class ComisionesConfigDialog(QDialog):
         self.setLayout(layout)
 
     def cargar_configuracion(self):
-        self.db.cursor.execute("SELECT metodo, porcentaje, frecuencia FROM configuracion_comisiones")
-        rows = self.db.cursor.fetchall()
+        rows = self.db.fetch_all("SELECT metodo, porcentaje, frecuencia FROM configuracion_comisiones")
         data = {}
         for r in rows:
             data[r[0]] = {"porcentaje": r[1], "frecuencia": r[2]}
         return data
 
     def save(self):
-        # Insertar o actualizar
-        for metodo, (spin_pct, combo_frec) in self.inputs.items():
-            pct = spin_pct.value()
-            frec = combo_frec.currentText()
+        # Insertar o actualizar (todos los métodos en un solo commit)
+        with self.db.transaction():
+            for metodo, (spin_pct, combo_frec) in self.inputs.items():
+                pct = spin_pct.value()
+                frec = combo_frec.currentText()
             
-            self.db.cursor.execute("SELECT id FROM configuracion_comisiones WHERE metodo=?", (metodo,))
-            row = self.db.cursor.fetchone()
+                row = self.db.fetch_one("SELECT id FROM configuracion_comisiones WHERE metodo=?", (metodo,))
             
-            if row:
-                self.db.cursor.execute("UPDATE configuracion_comisiones SET porcentaje=?, frecuencia=? WHERE id=?", (pct, frec, row[0]))
-            else:
-                self.db.cursor.execute("INSERT INTO configuracion_comisiones (metodo, porcentaje, frecuencia) VALUES (?, ?, ?)", (metodo, pct, frec))
+                if row:
+                    self.db.execute_query("UPDATE configuracion_comisiones SET porcentaje=?, frecuencia=? WHERE id=?", (pct, frec, row[0]))
+                else:
+                    self.db.execute_query("INSERT INTO configuracion_comisiones (metodo, porcentaje, frecuencia) VALUES (?, ?, ?)", (metodo, pct, frec))
                 
-        self.db.conn.commit()
         self.accept()
 
 
@@ -389,17 +390,42 @@ class DiarioVentasView(QWidget):
         layout.addLayout(filter_layout)
 
         # --- TABLA ---
-        self.table = QTableWidget()
+        self.table = QTableView()
         
-        self.columnas = [
-            "ID", "FECHA", "TOTAL VENTAS", "YAPPY", "PEDIDOS YA", "CLAVE", "VISA/MC", "EFECTIVO", "VALE", "DESC VALE", "NO FACT", "SOBRANTE", "FALTANTE", "DEPOSITOS"
-        ]
         self.db_columns = [
             "id", "fecha", "total_ventas", "yappy", "pedidos_ya", "clave", "visa_mastercard", "efectivo", "vale", "vale_descripcion", "no_facturas", "sobrante", "faltante", "depositos"
         ]
-        
-        self.table.setColumnCount(len(self.columnas))
-        self.table.setHorizontalHeaderLabels(self.columnas)
+        # Una columna por cada db_column, en el mismo orden
+        self.columnas = [
+            Columna("ID", numerica=True),
+            Columna("FECHA"),
+            Columna("TOTAL VENTAS", monto, numerica=True, negrita=True),
+            Columna("YAPPY", monto, numerica=True),
+            Columna("PEDIDOS YA", monto, numerica=True),
+            Columna("CLAVE", monto, numerica=True),
+            Columna("VISA/MC", monto, numerica=True),
+            Columna("EFECTIVO", monto, numerica=True),
+            Columna("VALE", monto, numerica=True),
+            Columna("DESC VALE"),
+            Columna("NO FACT", lambda v: str(v or 0), numerica=True),
+            Columna("SOBRANTE", monto, numerica=True,
+                    color=lambda v: QColor("green") if float(v or 0.0) > 0 else None),
+            Columna("FALTANTE", monto, numerica=True,
+                    color=lambda v: QColor("red") if float(v or 0.0) > 0 else None),
+            Columna("DEPOSITOS", monto, numerica=True),
+        ]
+        for columna, campo in zip(self.columnas, self.db_columns):
+            columna.sql = campo
+        # Se lee por páginas al desplazarse: abrir el diario no recorre toda la historia
+        self.modelo = ModeloPaginado(
+            self.columnas,
+            self.db,
+            ", ".join(self.db_columns),
+            "diario_ventas",
+            ["fecha", "id"],
+            parent=self,
+        )
+        configurar_vista(self.table, self.modelo)
         
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Interactive)
@@ -422,10 +448,8 @@ class DiarioVentasView(QWidget):
 
         header.setSectionResizeMode(len(self.columnas) - 1, QHeaderView.Stretch)
             
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
         self.table.setAlternatingRowColors(True)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.table.setSortingEnabled(True)
         self.table.hideColumn(0)  # Ocultar ID
         
         layout.addWidget(self.table)
@@ -438,68 +462,19 @@ class DiarioVentasView(QWidget):
     def cargar_datos(self):
         self.cargar_resumen()
         
-        self.table.setSortingEnabled(False)
-        cols_query = ", ".join(self.db_columns)
-        self.db.cursor.execute(f"SELECT {cols_query} FROM diario_ventas ORDER BY fecha DESC, id DESC")
-        rows = self.db.cursor.fetchall()
-        self.table.setRowCount(0)
-
-        for r_idx, row in enumerate(rows):
-            self.table.insertRow(r_idx)
-            
-            # ID
-            self.table.setItem(r_idx, 0, NumericItem(str(row[0])))
-            # FECHA
-            self.table.setItem(r_idx, 1, QTableWidgetItem(str(row[1] or "")))
-            
-            # TOTAL VENTAS
-            item_total = NumericItem(f"{float(row[2] or 0.0):.2f}")
-            font = item_total.font()
-            font.setBold(True)
-            item_total.setFont(font)
-            self.table.setItem(r_idx, 2, item_total)
-            
-            # Montos por método de pago (índices 3-7: yappy, pedidos_ya, clave, visa_mastercard, efectivo)
-            self.table.setItem(r_idx, 3, NumericItem(f"{float(row[3] or 0.0):.2f}"))
-            self.table.setItem(r_idx, 4, NumericItem(f"{float(row[4] or 0.0):.2f}"))
-            self.table.setItem(r_idx, 5, NumericItem(f"{float(row[5] or 0.0):.2f}"))
-            self.table.setItem(r_idx, 6, NumericItem(f"{float(row[6] or 0.0):.2f}"))
-            self.table.setItem(r_idx, 7, NumericItem(f"{float(row[7] or 0.0):.2f}"))
-            # Vale y descripción (índices 8-9)
-            self.table.setItem(r_idx, 8, NumericItem(f"{float(row[8] or 0.0):.2f}"))
-            self.table.setItem(r_idx, 9, QTableWidgetItem(str(row[9] or "")))
-
-            # NO FACT (entero, índice 10)
-            self.table.setItem(r_idx, 10, NumericItem(str(row[10] or 0)))
-
-            # Sobrante / Faltante / Depositos (índices 11-13)
-            item_sob = NumericItem(f"{float(row[11] or 0.0):.2f}")
-            if float(row[11] or 0.0) > 0:
-                item_sob.setForeground(QColor("green"))
-            self.table.setItem(r_idx, 11, item_sob)
-
-            item_falt = NumericItem(f"{float(row[12] or 0.0):.2f}")
-            if float(row[12] or 0.0) > 0:
-                item_falt.setForeground(QColor("red"))
-            self.table.setItem(r_idx, 12, item_falt)
-
-            self.table.setItem(r_idx, 13, NumericItem(f"{float(row[13] or 0.0):.2f}"))
-
-        self.table.setSortingEnabled(True)
         self.aplicar_filtros()
 
     def cargar_resumen(self):
-        self.db.cursor.execute("""
+        # fetch_all: si no hubo cambios se reutiliza el resultado en caché
+        rows = self.db.fetch_all("""
             SELECT 
-                strftime('%Y-%m', fecha) as mes_anio,
+                mes,
                 SUM(total_ventas) as suma_ventas,
                 SUM(depositos) as suma_depositos
             FROM diario_ventas
-            GROUP BY mes_anio
-            ORDER BY mes_anio DESC
+            GROUP BY mes
+            ORDER BY mes DESC
         """)
-        
-        rows = self.db.cursor.fetchall()
         self.table_resumen.setRowCount(0)
         
         for r_idx, row in enumerate(rows):
@@ -518,19 +493,11 @@ class DiarioVentasView(QWidget):
             self.table_resumen.setItem(r_idx, 2, NumericItem(f"{depositos:.2f}"))
 
     def aplicar_filtros(self):
-        rows = self.table.rowCount()
-        for row in range(rows):
-            mostrar = True
-            for col, inp in self.filtros.items():
-                texto_filtro = inp.text().lower().strip()
-                if not texto_filtro:
-                    continue
-                item = self.table.item(row, col)
-                if item:
-                    if texto_filtro not in item.text().lower():
-                        mostrar = False
-                        break
-            self.table.setRowHidden(row, not mostrar)
+        condicion, params = filtro_columnas(
+            SIN_BUSQUEDA,
+            [(self.columnas[col].sql, inp.text()) for col, inp in self.filtros.items()],
+        )
+        self.modelo.set_filtro(condicion, params)
 
     def abrir_crear(self):
         dlg = DiarioVentasDialog(self.db, parent=self)
@@ -542,15 +509,14 @@ class DiarioVentasView(QWidget):
         dlg.exec_()
 
     def abrir_editar(self):
-        row = self.table.currentRow()
-        if row < 0:
+        fila = fila_actual(self.table)
+        if fila is None:
             return QMessageBox.warning(self, "Aviso", "Seleccione un registro para editar.")
 
-        id_registro = self.table.item(row, 0).text()
+        id_registro = fila[0]
         
         cols_query = ", ".join(self.db_columns)
-        self.db.cursor.execute(f"SELECT {cols_query} FROM diario_ventas WHERE id=?", (id_registro,))
-        row_data = self.db.cursor.fetchone()
+        row_data = self.db.fetch_one(f"SELECT {cols_query} FROM diario_ventas WHERE id=?", (id_registro,))
         
         if row_data:
             data = dict(zip(self.db_columns, row_data))
@@ -559,15 +525,14 @@ class DiarioVentasView(QWidget):
                 self.cargar_datos()
 
     def eliminar(self):
-        row = self.table.currentRow()
-        if row < 0:
+        fila = fila_actual(self.table)
+        if fila is None:
             return QMessageBox.warning(self, "Aviso", "Seleccione un registro para eliminar.")
 
-        id_registro = self.table.item(row, 0).text()
+        id_registro = fila[0]
         reply = QMessageBox.question(self, 'Confirmar', '¿Está seguro de eliminar este registro?',
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            self.db.cursor.execute("DELETE FROM diario_ventas WHERE id=?", (id_registro,))
-            self.db.conn.commit()
+            self.db.execute_query("DELETE FROM diario_ventas WHERE id=?", (id_registro,))
             self.cargar_datos()
\ No newline at end of file
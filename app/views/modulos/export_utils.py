@@ -39,12 +39,21 @@ class ExportarMesDialog(QDialog):
         self.mes_seleccionado = self.combo_meses.currentText()
         self.accept()
 
+def _texto_celda(modelo, row, col):
+    valor = modelo.index(row, col).data()
+    return "" if valor is None else str(valor)
+
+
 def exportar_tabla_por_mes(parent, table, nombre_archivo_default, date_col_idx):
+    # Se lee a través del modelo: sirve igual para QTableWidget y QTableView
+    modelo = table.model()
+    if hasattr(modelo, "cargar_todo"):
+        # Un modelo paginado solo tiene las filas ya vistas
+        modelo.cargar_todo()
     meses_set = set()
-    for row in range(table.rowCount()):
-        item = table.item(row, date_col_idx)
-        if item:
-            fecha_texto = item.text()
+    for row in range(modelo.rowCount()):
+        fecha_texto = _texto_celda(modelo, row, date_col_idx)
+        if fecha_texto:
             if len(fecha_texto) >= 7:
                 mes = fecha_texto[:7]
                 # Try to ensure it resembles YYYY-MM
@@ -63,22 +72,18 @@ def exportar_tabla_por_mes(parent, table, nombre_archivo_default, date_col_idx):
                     writer = csv.writer(file)
                     
                     # Escribir encabezados
-                    headers = [table.horizontalHeaderItem(col).text() for col in range(table.columnCount()) if not table.isColumnHidden(col)]
+                    columnas = [col for col in range(modelo.columnCount()) if not table.isColumnHidden(col)]
+                    headers = [modelo.headerData(col, Qt.Horizontal) for col in columnas]
                     writer.writerow(headers)
 
                     # Escribir datos
-                    for row in range(table.rowCount()):
-                        item_fecha = table.item(row, date_col_idx)
-                        if item_fecha:
-                            fecha_texto = item_fecha.text()
+                    for row in range(modelo.rowCount()):
+                        fecha_texto = _texto_celda(modelo, row, date_col_idx)
+                        if fecha_texto:
                             if mes_elegido != "Todos" and not fecha_texto.startswith(mes_elegido):
                                 continue # Omitir filas que no coinciden con el mes
                                 
-                        row_data = []
-                        for col in range(table.columnCount()):
-                            if not table.isColumnHidden(col):
-                                item = table.item(row, col)
-                                row_data.append(item.text() if item is not None else "")
+                        row_data = [_texto_celda(modelo, row, col) for col in columnas]
                         writer.writerow(row_data)
                 QMessageBox.information(parent, "Éxito", "Los datos se han exportado correctamente.")
             except Exception as e:
@@ -13,6 +13,8 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QDate, QSize
 from PyQt5.QtGui import QColor
 
+from app.database.async_query import AsyncQueryRunner
+
 _RED   = "#a20f22"
 _DARK  = "#2c3e50"
 _GRAY  = "#f5f5f5"
@@ -24,6 +26,61 @@ _COLORS = [
 ]
 
 
+class MiniPriceChart(FigureCanvas):
+    """Gráfico compacto de evolución de precio (diálogo de historial de insumos)."""
+
+    def __init__(self, parent=None):
+        self.fig = Figure(figsize=(6, 2.2), dpi=96, facecolor="white")
+        self.ax = self.fig.add_subplot(111)
+        super().__init__(self.fig)
+        self.setParent(parent)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.setFixedHeight(170)
+
+    def refresh(self, dates, prices):
+        self.ax.clear()
+        self.fig.set_facecolor("white")
+        self.ax.set_facecolor("#fafafa")
+
+        if not dates:
+            self.ax.text(0.5, 0.5, "Sin datos de precios",
+                         ha="center", va="center",
+                         transform=self.ax.transAxes, color="#aaaaaa", fontsize=9)
+            self.ax.axis("off")
+            self.fig.tight_layout()
+            self.draw()
+            return
+
+        color = "#a20f22"
+        if len(dates) == 1:
+            self.ax.scatter(dates, prices, color=color, zorder=5, s=60)
+            self.ax.annotate(f"${prices[0]:,.2f}", (dates[0], prices[0]),
+                             textcoords="offset points", xytext=(5, 5),
+                             fontsize=8, color=color)
+        else:
+            self.ax.plot(dates, prices, marker="o", markersize=5,
+                         linewidth=1.8, color=color)
+            for d, p in zip(dates, prices):
+                self.ax.annotate(f"${p:,.2f}", (d, p),
+                                 textcoords="offset points", xytext=(3, 5),
+                                 fontsize=7, color=color)
+
+        self.ax.xaxis.set_major_formatter(mdates.DateFormatter("%d/%m/%y"))
+        self.ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+        self.fig.autofmt_xdate(rotation=30, ha="right")
+        self.ax.yaxis.set_major_formatter(
+            matplotlib.ticker.FuncFormatter(lambda x, _: f"${x:,.2f}")
+        )
+        self.ax.tick_params(labelsize=7)
+        self.ax.grid(axis="y", linestyle="--", linewidth=0.5, alpha=0.6)
+        self.ax.spines["top"].set_visible(False)
+        self.ax.spines["right"].set_visible(False)
+        self.ax.set_title("Evolución del Precio", fontsize=9,
+                          fontweight="bold", color="#2c3e50", pad=5)
+        self.fig.tight_layout()
+        self.draw()
+
+
 class _LineChart(FigureCanvas):
     def __init__(self, parent=None):
         self.fig = Figure(figsize=(8, 3.8), dpi=96, facecolor="white")
@@ -108,10 +165,63 @@ class _LineChart(FigureCanvas):
         self.draw()
 
 
+def _consultar_historial(conn, cat_id, ins_id, fecha_desde, fecha_hasta):
+    """Devuelve (filas del historial, series por presentación) para los filtros dados."""
+    params = [fecha_desde, fecha_hasta]
+    where_extra = ""
+    if cat_id is not None:
+        where_extra += " AND ci.id = ?"
+        params.append(cat_id)
+    if ins_id is not None:
+        where_extra += " AND i.id = ?"
+        params.append(ins_id)
+
+    rows = conn.execute(
+        f"""
+        SELECT i.nombre, pc.nombre, COALESCE(pv.nombre, '—'),
+               h.fecha_registro, h.precio_compra, h.costo_unitario_calculado
+        FROM historial_precios_presentacion h
+        JOIN presentaciones_compra pc ON pc.id = h.presentacion_id
+        JOIN insumos i ON i.id = pc.insumo_id
+        LEFT JOIN proveedores pv ON pv.id = h.proveedor_id
+        LEFT JOIN categorias_insumos ci ON ci.id = i.categoria_id
+        WHERE h.fecha_registro BETWEEN ? AND ?
+        {where_extra}
+        ORDER BY i.nombre, pc.nombre, h.fecha_registro ASC
+        """,
+        tuple(params),
+    ).fetchall()
+
+    series_map = {}
+    for insumo, pres, proveedor, fecha_str, precio, costo in rows:
+        key = f"{insumo} — {pres}"
+        if key not in series_map:
+            series_map[key] = {"dates": [], "prices": []}
+        try:
+            d = datetime.date.fromisoformat(str(fecha_str))
+            series_map[key]["dates"].append(d)
+            series_map[key]["prices"].append(float(precio))
+        except (ValueError, TypeError):
+            pass
+
+    series = []
+    for idx, (label, data) in enumerate(series_map.items()):
+        if data["dates"]:
+            series.append({
+                "label": label,
+                "dates": data["dates"],
+                "prices": data["prices"],
+                "color": _COLORS[idx % len(_COLORS)],
+            })
+
+    return rows, series
+
+
 class GraficoPreciosView(QWidget):
     def __init__(self, db_manager):
         super().__init__()
         self.db = db_manager
+        self.runner = AsyncQueryRunner(db_manager, self)
         self._init_ui()
         self._cargar_categorias()
 
@@ -240,60 +350,20 @@ class GraficoPreciosView(QWidget):
         pass
 
     def _actualizar(self):
-        cat_id   = self.cmb_categoria.currentData()
-        ins_id   = self.cmb_insumo.currentData()
-        fecha_desde = self.date_desde.date().toString("yyyy-MM-dd")
-        fecha_hasta = self.date_hasta.date().toString("yyyy-MM-dd")
-
-        params = [fecha_desde, fecha_hasta]
-        where_extra = ""
-        if cat_id is not None:
-            where_extra += " AND ci.id = ?"
-            params.append(cat_id)
-        if ins_id is not None:
-            where_extra += " AND i.id = ?"
-            params.append(ins_id)
-
-        rows = self.db.fetch_all(
-            f"""
-            SELECT i.nombre, pc.nombre, COALESCE(pv.nombre, '—'),
-                   h.fecha_registro, h.precio_compra, h.costo_unitario_calculado
-            FROM historial_precios_presentacion h
-            JOIN presentaciones_compra pc ON pc.id = h.presentacion_id
-            JOIN insumos i ON i.id = pc.insumo_id
-            LEFT JOIN proveedores pv ON pv.id = h.proveedor_id
-            LEFT JOIN categorias_insumos ci ON ci.id = i.categoria_id
-            WHERE h.fecha_registro BETWEEN ? AND ?
-            {where_extra}
-            ORDER BY i.nombre, pc.nombre, h.fecha_registro ASC
-            """,
-            tuple(params),
+        # Pulsar de nuevo con otros filtros cancela la consulta anterior.
+        self.runner.submit(
+            "historial",
+            _consultar_historial,
+            self.cmb_categoria.currentData(),
+            self.cmb_insumo.currentData(),
+            self.date_desde.date().toString("yyyy-MM-dd"),
+            self.date_hasta.date().toString("yyyy-MM-dd"),
+            on_result=self._aplicar_historial,
         )
 
+    def _aplicar_historial(self, resultado):
+        rows, series = resultado
         self._poblar_tabla(rows)
-
-        series_map = {}
-        for insumo, pres, proveedor, fecha_str, precio, costo in rows:
-            key = f"{insumo} — {pres}"
-            if key not in series_map:
-                series_map[key] = {"dates": [], "prices": []}
-            try:
-                d = datetime.date.fromisoformat(str(fecha_str))
-                series_map[key]["dates"].append(d)
-                series_map[key]["prices"].append(float(precio))
-            except (ValueError, TypeError):
-                pass
-
-        series = []
-        for idx, (label, data) in enumerate(series_map.items()):
-            if data["dates"]:
-                series.append({
-                    "label": label,
-                    "dates": data["dates"],
-                    "prices": data["prices"],
-                    "color": _COLORS[idx % len(_COLORS)],
-                })
-
         self.chart.refresh(series)
 
     def _poblar_tabla(self, rows):
@@ -7,6 +7,7 @@ from PyQt5.QtWidgets import (
     QPushButton,
     QTableWidget,
     QTableWidgetItem,
+    QTableView,
     QHeaderView,
     QDialog,
     QDialogButtonBox,
@@ -24,13 +25,13 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QColor
-from PyQt5.QtWidgets import QSizePolicy
 import datetime
-import matplotlib
-matplotlib.use("Qt5Agg")
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.dates as mdates
+
+from app.controllers.recetas_cache import invalidar_recetas
+from app.controllers.catalogos import invalidar_catalogos
+from app.utils.combos import asignar_combo
+from app.database.busqueda import busqueda_texto, filtro_columnas
+from app.utils.modelo_tabla import Columna, ModeloTabla, configurar_vista, fila_actual
 
 
 # --- CLASE PERSONALIZADA PARA ORDENAR NÚMEROS ---
@@ -93,6 +94,10 @@ class InsumosCRUD(QWidget):
 
 # =============================================================================
 # PESTAÑA 1: INSUMOS (Catálogo Base)
+def _o_guion(valor):
+    return str(valor) if valor else "-"
+
+
 # =============================================================================
 class TabInsumos(QWidget):
     def __init__(self, db):
@@ -136,87 +141,70 @@ class TabInsumos(QWidget):
             inp = QLineEdit()
             inp.setPlaceholderText(placeholder)
             inp.setClearButtonEnabled(True)
-            inp.textChanged.connect(self.aplicar_filtros)
+            inp.textChanged.connect(self.cargar_datos)
             self.filtros[col_idx] = inp
             filter_layout.addWidget(inp)
 
         layout.addLayout(filter_layout)
 
         # Tabla
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels(
+        self.table = QTableView()
+        self.modelo = ModeloTabla(
             [
-                "ID",
-                "Nombre",
-                "Unidad Base",
-                "Categoría",
-                "Grupo Calc.",
-                "Factor",
-                "Presentación",
-            ]
+                Columna("ID", numerica=True),
+                Columna("Nombre", _o_guion),
+                Columna("Unidad Base", _o_guion),
+                Columna("Categoría", _o_guion),
+                Columna("Grupo Calc.", lambda v: str(v) if v else "General"),
+                Columna("Factor", lambda v: str(v if v else 1.0), numerica=True),
+                Columna("Presentación"),
+            ],
+            self,
         )
+        configurar_vista(self.table, self.modelo)
 
         # --- CORRECCIÓN DE ANCHO DE COLUMNAS Y TEXT WRAP ---
+        # Sin altura automática por fila: ResizeToContents mediría todas las filas
         self.table.setWordWrap(True)
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(
             QHeaderView.Interactive
         )  # Permite al usuario modificar el ancho
         header.setStretchLastSection(True)
-        self.table.verticalHeader().setSectionResizeMode(
-            QHeaderView.ResizeToContents
-        )  # Altura automática
 
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
         self.table.setAlternatingRowColors(True)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.table.setSortingEnabled(True)
 
         layout.addWidget(self.table)
         self.setLayout(layout)
         self.cargar_datos()
 
     def cargar_datos(self):
-        self.table.setSortingEnabled(False)
-
         # Se agrega validación para saber si tiene presentación de compra definida
-        query = """
+        estado = """CASE WHEN (SELECT COUNT(p.id) FROM presentaciones_compra p WHERE p.insumo_id = i.id) > 0 
+                        THEN 'Definida' ELSE 'Sin definir' END"""
+
+        # Los filtros se aplican en SQLite: el nombre por el índice FTS5
+        busqueda = busqueda_texto(self.db, "insumos", "i", self.filtros[1].text())
+        condicion, params = filtro_columnas(
+            busqueda,
+            [
+                ("i.id", self.filtros[0].text()),
+                ("c.nombre", self.filtros[3].text()),
+                (estado, self.filtros[6].text()),
+            ],
+        )
+        query = f"""
             SELECT i.id, i.nombre, u.nombre, c.nombre, i.grupo_calculo, i.factor_calculo,
-                   CASE WHEN (SELECT COUNT(p.id) FROM presentaciones_compra p WHERE p.insumo_id = i.id) > 0 
-                        THEN 'Definida' ELSE 'Sin definir' END as estado_presentacion
+                   {estado} as estado_presentacion
             FROM insumos i
+            {busqueda.join}
             LEFT JOIN unidades_medida u ON i.unidad_base_id = u.id
             LEFT JOIN categorias_insumos c ON i.categoria_id = c.id
-            ORDER BY i.nombre ASC
+            WHERE {condicion}
+            ORDER BY {busqueda.orden or "i.nombre COLLATE SIN_ACENTOS"}
         """
-        rows = self.db.fetch_all(query)
-        self.table.setRowCount(0)
-        for r_idx, row in enumerate(rows):
-            self.table.insertRow(r_idx)
-
-            self.table.setItem(r_idx, 0, NumericItem(str(row[0])))
-            self.table.setItem(
-                r_idx, 1, QTableWidgetItem(str(row[1]) if row[1] else "-")
-            )
-            self.table.setItem(
-                r_idx, 2, QTableWidgetItem(str(row[2]) if row[2] else "-")
-            )
-            self.table.setItem(
-                r_idx, 3, QTableWidgetItem(str(row[3]) if row[3] else "-")
-            )
-
-            # Grupo
-            self.table.setItem(
-                r_idx, 4, QTableWidgetItem(str(row[4]) if row[4] else "General")
-            )
-
-            # Factor
-            val_factor = row[5] if row[5] else 1.0
-            self.table.setItem(r_idx, 5, NumericItem(str(val_factor)))
-
-            # Estado Presentación
-            self.table.setItem(r_idx, 6, QTableWidgetItem(str(row[6])))
+        self.modelo.set_filas(self.db.fetch_all(query, params))
 
         # Ajuste inicial de columnas
         self.table.resizeColumnsToContents()
@@ -224,46 +212,28 @@ class TabInsumos(QWidget):
             1, 200
         )  # Dar buen espacio al nombre inicial
 
-        self.table.setSortingEnabled(True)
-        self.aplicar_filtros()
-
-    def aplicar_filtros(self):
-        rows = self.table.rowCount()
-        for row in range(rows):
-            mostrar = True
-            for col, inp in self.filtros.items():
-                texto_filtro = inp.text().lower().strip()
-                if not texto_filtro:
-                    continue
-                item = self.table.item(row, col)
-                if item:
-                    if texto_filtro not in item.text().lower():
-                        mostrar = False
-                        break
-            self.table.setRowHidden(row, not mostrar)
-
     def abrir_crear(self):
         dlg = InsumoDialog(self.db, parent=self)
         if dlg.exec_():
             self.cargar_datos()
 
     def abrir_editar(self):
-        row = self.table.currentRow()
-        if row < 0:
+        fila = fila_actual(self.table)
+        if fila is None:
             return QMessageBox.warning(
                 self, "Aviso", "Seleccione un insumo para editar."
             )
 
-        id_insumo = int(self.table.item(row, 0).text())
+        id_insumo = fila[0]
         dlg = InsumoDialog(self.db, insumo_id=id_insumo, parent=self)
         if dlg.exec_():
             self.cargar_datos()
 
     def eliminar(self):
-        row = self.table.currentRow()
-        if row < 0:
+        fila = fila_actual(self.table)
+        if fila is None:
             return
-        id_insumo = self.table.item(row, 0).text()
+        id_insumo = fila[0]
 
         if (
             QMessageBox.question(self, "Confirmar", "¿Eliminar este insumo?")
@@ -271,6 +241,8 @@ class TabInsumos(QWidget):
         ):
             try:
                 self.db.execute_query("DELETE FROM insumos WHERE id=?", (id_insumo,))
+                invalidar_recetas(self.db)
+                invalidar_catalogos(self.db, "presentaciones")
                 self.cargar_datos()
             except Exception as e:
                 QMessageBox.critical(
@@ -307,17 +279,9 @@ class InsumoDialog(QDialog):
             "Factor multiplicador para el cálculo (Ej: 1.0 = exacto, 1.1 = +10% seguridad)"
         )
 
-        # Cargar Combos BD
-        unidades = self.db.fetch_all(
-            "SELECT id, nombre, abreviatura FROM unidades_medida"
-        )
-        for u in unidades:
-            self.cmb_unidad.addItem(f"{u[1]} ({u[2]})", u[0])
-
-        categorias = self.db.fetch_all("SELECT id, nombre FROM categorias_insumos")
-        self.cmb_categoria.addItem("Sin Categoría", None)
-        for c in categorias:
-            self.cmb_categoria.addItem(c[1], c[0])
+        # Cargar Combos (catálogos en memoria)
+        asignar_combo(self.cmb_unidad, self.db, "unidades")
+        asignar_combo(self.cmb_categoria, self.db, "categorias", "Sin Categoría")
 
         layout.addRow("Nombre Insumo:", self.txt_nombre)
         layout.addRow("Unidad de Inventario:", self.cmb_unidad)
@@ -388,6 +352,8 @@ class InsumoDialog(QDialog):
                     VALUES (?,?,?,?,?)
                 """
                 self.db.execute_query(query, (nom, uid, cid, grupo, factor))
+            invalidar_recetas(self.db)
+            invalidar_catalogos(self.db, "presentaciones")
             self.accept()
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
@@ -440,7 +406,7 @@ class TabPresentaciones(QWidget):
             inp = QLineEdit()
             inp.setPlaceholderText(placeholder)
             inp.setClearButtonEnabled(True)
-            inp.textChanged.connect(self.aplicar_filtros)
+            inp.textChanged.connect(self.cargar_datos)
             self.filtros[col_idx] = inp
             filter_layout.addWidget(inp)
 
@@ -479,14 +445,23 @@ class TabPresentaciones(QWidget):
 
     def cargar_datos(self):
         self.table.setSortingEnabled(False)
-        query = """
+        busqueda = busqueda_texto(
+            self.db,
+            "presentaciones",
+            "p",
+            {"insumo": self.filtros[1].text(), "nombre": self.filtros[2].text()},
+        )
+        condicion, params = filtro_columnas(busqueda, [("p.id", self.filtros[0].text())])
+        query = f"""
             SELECT p.id, i.nombre, p.nombre, p.precio_compra, p.cantidad_contenido, u.abreviatura, p.costo_unitario_calculado
             FROM presentaciones_compra p
+            {busqueda.join}
             JOIN insumos i ON p.insumo_id = i.id
             JOIN unidades_medida u ON i.unidad_base_id = u.id
-            ORDER BY i.nombre
+            WHERE {condicion}
+            ORDER BY {busqueda.orden or "i.nombre COLLATE SIN_ACENTOS"}
         """
-        rows = self.db.fetch_all(query)
+        rows = self.db.fetch_all(query, params)
         self.table.setRowCount(0)
         for r, row in enumerate(rows):
             self.table.insertRow(r)
@@ -503,22 +478,6 @@ class TabPresentaciones(QWidget):
         self.table.horizontalHeader().resizeSection(2, 150)
 
         self.table.setSortingEnabled(True)
-        self.aplicar_filtros()
-
-    def aplicar_filtros(self):
-        rows = self.table.rowCount()
-        for row in range(rows):
-            mostrar = True
-            for col, inp in self.filtros.items():
-                texto_filtro = inp.text().lower().strip()
-                if not texto_filtro:
-                    continue
-                item = self.table.item(row, col)
-                if item:
-                    if texto_filtro not in item.text().lower():
-                        mostrar = False
-                        break
-            self.table.setRowHidden(row, not mostrar)
 
     def add(self):
         if PresentacionDialog(self.db, parent=self).exec_():
@@ -547,6 +506,7 @@ class TabPresentaciones(QWidget):
             self.db.execute_query(
                 "DELETE FROM presentaciones_compra WHERE id=?", (pid,)
             )
+            invalidar_catalogos(self.db, "presentaciones")
             self.cargar_datos()
 
     def ver_historial(self):
@@ -778,6 +738,7 @@ class PresentacionDialog(QDialog):
                         self.spin_peso_uni.value(),
                     ),
                 )
+            invalidar_catalogos(self.db, "presentaciones")
             self.accept()
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
@@ -812,10 +773,7 @@ class NuevoPrecioDialog(QDialog):
         form.addRow("Fecha:", self.date_edit)
 
         self.cmb_proveedor = QComboBox()
-        self.cmb_proveedor.addItem("— Sin proveedor —", None)
-        proveedores = self.db.fetch_all("SELECT id, nombre FROM proveedores ORDER BY nombre")
-        for p in proveedores:
-            self.cmb_proveedor.addItem(p[1], p[0])
+        asignar_combo(self.cmb_proveedor, self.db, "proveedores", "— Sin proveedor —")
         form.addRow("Proveedor:", self.cmb_proveedor)
 
         self.spin_precio = QDoubleSpinBox()
@@ -885,64 +843,12 @@ class NuevoPrecioDialog(QDialog):
                 "UPDATE presentaciones_compra SET precio_compra=?, costo_unitario_calculado=? WHERE id=?",
                 (precio, costo_u, self.presentacion_id),
             )
+            invalidar_catalogos(self.db, "presentaciones")
             self.accept()
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
 
-class _MiniPriceChart(FigureCanvas):
-    def __init__(self, parent=None):
-        self.fig = Figure(figsize=(6, 2.2), dpi=96, facecolor="white")
-        self.ax = self.fig.add_subplot(111)
-        super().__init__(self.fig)
-        self.setParent(parent)
-        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-        self.setFixedHeight(170)
-
-    def refresh(self, dates, prices):
-        self.ax.clear()
-        self.fig.set_facecolor("white")
-        self.ax.set_facecolor("#fafafa")
-
-        if not dates:
-            self.ax.text(0.5, 0.5, "Sin datos de precios",
-                         ha="center", va="center",
-                         transform=self.ax.transAxes, color="#aaaaaa", fontsize=9)
-            self.ax.axis("off")
-            self.fig.tight_layout()
-            self.draw()
-            return
-
-        color = "#a20f22"
-        if len(dates) == 1:
-            self.ax.scatter(dates, prices, color=color, zorder=5, s=60)
-            self.ax.annotate(f"${prices[0]:,.2f}", (dates[0], prices[0]),
-                             textcoords="offset points", xytext=(5, 5),
-                             fontsize=8, color=color)
-        else:
-            self.ax.plot(dates, prices, marker="o", markersize=5,
-                         linewidth=1.8, color=color)
-            for d, p in zip(dates, prices):
-                self.ax.annotate(f"${p:,.2f}", (d, p),
-                                 textcoords="offset points", xytext=(3, 5),
-                                 fontsize=7, color=color)
-
-        self.ax.xaxis.set_major_formatter(mdates.DateFormatter("%d/%m/%y"))
-        self.ax.xaxis.set_major_locator(mdates.AutoDateLocator())
-        self.fig.autofmt_xdate(rotation=30, ha="right")
-        self.ax.yaxis.set_major_formatter(
-            matplotlib.ticker.FuncFormatter(lambda x, _: f"${x:,.2f}")
-        )
-        self.ax.tick_params(labelsize=7)
-        self.ax.grid(axis="y", linestyle="--", linewidth=0.5, alpha=0.6)
-        self.ax.spines["top"].set_visible(False)
-        self.ax.spines["right"].set_visible(False)
-        self.ax.set_title("Evolución del Precio", fontsize=9,
-                          fontweight="bold", color="#2c3e50", pad=5)
-        self.fig.tight_layout()
-        self.draw()
-
-
 class HistorialPreciosDialog(QDialog):
     """Dialog principal para consultar y gestionar el historial de precios de una presentación."""
 
@@ -974,7 +880,10 @@ class HistorialPreciosDialog(QDialog):
         layout.addLayout(toolbar)
 
         # Mini chart
-        self.chart = _MiniPriceChart(self)
+        # matplotlib se carga solo al abrir el historial
+        from app.views.modulos.grafico_precios import MiniPriceChart
+
+        self.chart = MiniPriceChart(self)
         layout.addWidget(self.chart)
 
         # Tabla de historial
@@ -1141,6 +1050,7 @@ class TabCategorias(QWidget):
                         "INSERT INTO categorias_insumos (codigo, nombre) VALUES (?,?)",
                         (codigo, nombre),
                     )
+                    invalidar_catalogos(self.db, "categorias")
                     self.cargar_datos()
                 except Exception as e:
                     QMessageBox.warning(
@@ -1172,6 +1082,7 @@ class TabCategorias(QWidget):
                 self.db.execute_query(
                     "DELETE FROM categorias_insumos WHERE id=?", (id_cat,)
                 )
+                invalidar_catalogos(self.db, "categorias")
                 self.cargar_datos()
             except Exception as e:
                 QMessageBox.warning(self, "Error", str(e))
@@ -5,6 +5,7 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QTableWidget,
     QTableWidgetItem,
+    QTableView,
     QHeaderView,
     QLabel,
     QLineEdit,
@@ -13,6 +14,10 @@ from PyQt5.QtWidgets import (
     QMessageBox,
 )
 from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor
+
+from app.database.busqueda import busqueda_texto
+from app.utils.modelo_tabla import Columna, ModeloPaginado, configurar_vista
 
 
 class InventarioView(QWidget):
@@ -86,25 +91,23 @@ class InventarioView(QWidget):
         self.cargar_inventario()
 
     def cargar_inventario(self):
-        filtro = self.txt_buscar.text().lower()
-
-        query = """
+        # La búsqueda corre en SQLite (índice FTS5, sin distinguir acentos)
+        busqueda = busqueda_texto(self.db, "insumos", "i", self.txt_buscar.text())
+        query = f"""
             SELECT i.id, i.nombre, c.nombre, u.abreviatura, i.stock_actual, i.costo_unitario
             FROM insumos i
+            {busqueda.join}
             LEFT JOIN categorias_insumos c ON i.categoria_id = c.id
             LEFT JOIN unidades_medida u ON i.unidad_base_id = u.id
-            ORDER BY i.nombre ASC
+            WHERE {busqueda.condicion}
+            ORDER BY {busqueda.orden or "i.nombre COLLATE SIN_ACENTOS"}
         """
-        rows = self.db.fetch_all(query)
+        rows = self.db.fetch_all(query, busqueda.params)
 
         self.table.setRowCount(0)
         total_inventario = 0
 
         for r, row in enumerate(rows):
-            # Filtrado simple en memoria
-            if filtro and (filtro not in row[1].lower()):
-                continue
-
             self.table.insertRow(r)
 
             # Datos
@@ -160,18 +163,30 @@ class KardexDialog(QDialog):
     def init_ui(self):
         layout = QVBoxLayout()
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(
+        self.table = QTableView()
+        # Movimientos por páginas (índice insumo_id, id) a medida que se desplaza
+        self.modelo = ModeloPaginado(
             [
-                "Fecha",
-                "Movimiento",
-                "Cant.",
-                "Stock Previo",
-                "Stock Nuevo",
-                "Detalle / Referencia",
-            ]
+                Columna("Fecha", sql="fecha"),
+                Columna("Movimiento", sql="tipo_movimiento"),
+                Columna(
+                    "Cant.",
+                    lambda v: f"{v:+.2f}",
+                    numerica=True,
+                    color=lambda v: QColor(Qt.darkGreen if v > 0 else Qt.red),
+                    sql="cantidad",
+                ),
+                Columna("Stock Previo", lambda v: f"{v:.2f}", numerica=True, sql="stock_anterior"),
+                Columna("Stock Nuevo", lambda v: f"{v:.2f}", numerica=True, sql="stock_nuevo"),
+                Columna("Detalle / Referencia", sql="observacion"),
+            ],
+            self.db,
+            "fecha, tipo_movimiento, cantidad, stock_anterior, stock_nuevo, observacion",
+            "movimientos_inventario",
+            ["id"],
+            parent=self,
         )
+        configurar_vista(self.table, self.modelo)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         layout.addWidget(self.table)
 
@@ -179,29 +194,4 @@ class KardexDialog(QDialog):
         self.setLayout(layout)
 
     def cargar_datos(self):
-        query = """
-            SELECT fecha, tipo_movimiento, cantidad, stock_anterior, stock_nuevo, observacion 
-            FROM movimientos_inventario 
-            WHERE insumo_id = ? 
-            ORDER BY id DESC
-        """
-        rows = self.db.fetch_all(query, (self.insumo_id,))
-        self.table.setRowCount(0)
-
-        for r, row in enumerate(rows):
-            self.table.insertRow(r)
-            self.table.setItem(r, 0, QTableWidgetItem(str(row[0])))
-            self.table.setItem(r, 1, QTableWidgetItem(row[1]))
-
-            # Cantidad con color
-            cant = row[2]
-            item_cant = QTableWidgetItem(f"{cant:+.2f}")
-            if cant > 0:
-                item_cant.setForeground(Qt.darkGreen)
-            else:
-                item_cant.setForeground(Qt.red)
-            self.table.setItem(r, 2, item_cant)
-
-            self.table.setItem(r, 3, QTableWidgetItem(f"{row[3]:.2f}"))
-            self.table.setItem(r, 4, QTableWidgetItem(f"{row[4]:.2f}"))
-            self.table.setItem(r, 5, QTableWidgetItem(row[5]))
+        self.modelo.set_filtro("insumo_id = ?", (self.insumo_id,))
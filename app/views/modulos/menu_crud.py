@@ -18,7 +18,11 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt
 import sqlite3
-import csv
+
+from app.controllers.recetas_cache import invalidar_recetas
+from app.controllers.catalogos import invalidar_catalogos
+from app.controllers.importacion_menu import importar_menu_csv
+from app.database.busqueda import busqueda_texto, filtro_columnas
 
 
 # --- CLASE PERSONALIZADA PARA ORDENAR NÚMEROS ---
@@ -101,7 +105,7 @@ class MenuCRUD(QWidget):
             inp = QLineEdit()
             inp.setPlaceholderText(placeholder)
             inp.setClearButtonEnabled(True)
-            inp.textChanged.connect(self.aplicar_filtros)
+            inp.textChanged.connect(self.cargar_datos)
 
             self.filtros[col_idx] = inp
             filter_layout.addWidget(inp)
@@ -133,8 +137,28 @@ class MenuCRUD(QWidget):
         """Consulta la BD y rellena la tabla"""
         self.table.setSortingEnabled(False)
 
-        query = "SELECT id, codigo, nombre, precio_venta, es_preparado FROM menu_items"
-        rows = self.db.fetch_all(query)
+        # Los filtros se aplican en SQLite: el nombre por el índice FTS5 y el
+        # código como subcadena (FTS5 solo encuentra prefijos de palabra)
+        busqueda = busqueda_texto(
+            self.db, "menu_items", "m", {"nombre": self.filtros[2].text()}
+        )
+        condicion, params = filtro_columnas(
+            busqueda,
+            [
+                ("m.id", self.filtros[0].text()),
+                ("m.codigo", self.filtros[1].text()),
+                ("printf('%.2f', m.precio_venta)", self.filtros[3].text()),
+                ("m.es_preparado", self.filtros[4].text()),
+            ],
+        )
+        query = f"""
+            SELECT m.id, m.codigo, m.nombre, m.precio_venta, m.es_preparado
+            FROM menu_items m
+            {busqueda.join}
+            WHERE {condicion}
+            ORDER BY {busqueda.orden or "m.id"}
+        """
+        rows = self.db.fetch_all(query, params)
 
         self.table.setRowCount(0)
         for row_idx, row_data in enumerate(rows):
@@ -165,24 +189,6 @@ class MenuCRUD(QWidget):
             self.table.setItem(row_idx, 4, item_es_preparado)
 
         self.table.setSortingEnabled(True)
-        self.aplicar_filtros()
-
-    def aplicar_filtros(self):
-        rows = self.table.rowCount()
-        for row in range(rows):
-            mostrar = True
-            for col, inp in self.filtros.items():
-                texto_filtro = inp.text().lower().strip()
-                if not texto_filtro:
-                    continue
-
-                item = self.table.item(row, col)
-                if item:
-                    texto_celda = item.text().lower()
-                    if texto_filtro not in texto_celda:
-                        mostrar = False
-                        break
-            self.table.setRowHidden(row, not mostrar)
 
     # --- Lógica CRUD ---
 
@@ -233,6 +239,9 @@ class MenuCRUD(QWidget):
                 "DELETE FROM recetas WHERE menu_item_id=?", (id_item,)
             )
             self.db.execute_query("DELETE FROM menu_items WHERE id=?", (id_item,))
+            self.db.resolver_codigos_menu(completo=True)
+            invalidar_recetas(self.db)
+            invalidar_catalogos(self.db, "menu_items")
             self.cargar_datos()
 
     def mostrar_formulario(self, data=None):
@@ -306,6 +315,11 @@ class MenuCRUD(QWidget):
                     params = (codigo_val, nombre_val, precio_val, es_preparado_val)
 
                 self.db.execute_query(query, params)
+                # Un plato nuevo puede resolver códigos de reportes ya cargados;
+                # al editar, el código pudo cambiar y se revisa todo.
+                self.db.resolver_codigos_menu(completo=bool(data))
+                invalidar_recetas(self.db)
+                invalidar_catalogos(self.db, "menu_items")
                 self.cargar_datos()
 
             except sqlite3.IntegrityError:
@@ -323,74 +337,33 @@ class MenuCRUD(QWidget):
         if not file_path:
             return
 
-        agregados = 0
-        omitidos = []
-
         try:
-            with open(file_path, mode="r", encoding="utf-8-sig", newline="") as f:
-                reader = csv.reader(f)
-                rows = list(reader)
-
-                if not rows:
-                    return
-
-                start = 0
-                try:
-                    float(rows[0][2].replace("$", "").replace(",", ""))
-                except:
-                    start = 1
-
-                for i in range(start, len(rows)):
-                    row = rows[i]
-                    if len(row) < 3:
-                        continue
-
-                    codigo = row[0].strip()
-                    nombre = row[1].strip()
-                    precio_str = row[2].strip().replace("$", "").replace(",", "")
-
-                    try:
-                        precio = float(precio_str)
-                    except ValueError:
-                        omitidos.append((codigo, nombre, "Precio inválido"))
-                        continue
-
-                    existe = self.db.fetch_all(
-                        "SELECT 1 FROM menu_items WHERE codigo=?", (codigo,)
-                    )
-                    if existe:
-                        omitidos.append((codigo, nombre, "Código duplicado"))
-                        continue
-
-                    es_prep = 1
-                    if len(row) > 3 and row[3].strip().lower() in [
-                        "0",
-                        "no",
-                        "false",
-                        "f",
-                    ]:
-                        es_prep = 0
-
-                    try:
-                        self.db.execute_query(
-                            "INSERT INTO menu_items (codigo, nombre, precio_venta, es_preparado) VALUES (?,?,?,?)",
-                            (codigo, nombre, precio, es_prep),
-                        )
-                        agregados += 1
-                    except Exception as e:
-                        omitidos.append((codigo, nombre, str(e)))
+            resultado = importar_menu_csv(self.db, file_path)
+            if resultado.agregados:
+                self.db.resolver_codigos_menu()
 
+            invalidar_recetas(self.db)
+            invalidar_catalogos(self.db, "menu_items")
             self.cargar_datos()
 
-            msg = f"Importación finalizada.\nAgregados: {agregados}\nOmitidos: {len(omitidos)}"
-            if omitidos:
+            msg = (
+                f"Importación finalizada.\nAgregados: {resultado.agregados}"
+                f"\nActualizados: {resultado.actualizados}"
+                f"\nOmitidos: {len(resultado.errores)}"
+            )
+            if resultado.errores:
                 dialog = QDialog(self)
                 dialog.setWindowTitle("Reporte de Errores")
                 dialog.resize(400, 300)
                 vbox = QVBoxLayout(dialog)
                 vbox.addWidget(QLabel(msg))
                 txt = QTextEdit()
-                txt.setPlainText("\n".join([f"{c} - {n}: {r}" for c, n, r in omitidos]))
+                txt.setPlainText(
+                    "\n".join(
+                        f"Fila {e.fila}: {e.codigo} - {e.nombre}: {e.motivo}"
+                        for e in resultado.errores
+                    )
+                )
                 vbox.addWidget(txt)
                 dialog.exec_()
             else:
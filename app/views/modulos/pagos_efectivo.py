@@ -272,7 +272,7 @@ class PagoEfectivoDialog(QDialog):
                 v["atencion_empleados"], v["combustible"], v["medicamentos"],
                 self.data["id"]
             )
-            self.db.cursor.execute(query, params)
+            self.db.execute_query(query, params)
         else:
             query = """
                 INSERT INTO pagos_efectivo (
@@ -288,9 +288,8 @@ class PagoEfectivoDialog(QDialog):
                 v["gastos_propietarios"], v["honorarios"], v["reparaciones_mantenimiento"],
                 v["atencion_empleados"], v["combustible"], v["medicamentos"]
             )
-            self.db.cursor.execute(query, params)
+            self.db.execute_query(query, params)
             
-        self.db.conn.commit()
         return True
 
     def save(self):
@@ -424,8 +423,7 @@ class PagosEfectivoView(QWidget):
         
         self.table.setSortingEnabled(False)
         cols_query = ", ".join(self.db_columns)
-        self.db.cursor.execute(f"SELECT {cols_query} FROM pagos_efectivo ORDER BY fecha DESC, id DESC")
-        rows = self.db.cursor.fetchall()
+        rows = self.db.fetch_all(f"SELECT {cols_query} FROM pagos_efectivo ORDER BY fecha DESC, id DESC")
         self.table.setRowCount(0)
         
         # Mapeo de índices a nombres de columnas para el desglose (índices 5 al 15)
@@ -470,16 +468,14 @@ class PagosEfectivoView(QWidget):
         self.aplicar_filtros()
 
     def cargar_resumen(self):
-        self.db.cursor.execute("""
+        rows = self.db.fetch_all("""
             SELECT 
-                strftime('%Y-%m', fecha) as mes_anio,
+                mes,
                 SUM(total) as total_pagos
             FROM pagos_efectivo
-            GROUP BY mes_anio
-            ORDER BY mes_anio DESC
+            GROUP BY mes
+            ORDER BY mes DESC
         """)
-        
-        rows = self.db.cursor.fetchall()
         self.table_resumen.setRowCount(0)
         
         for r_idx, row in enumerate(rows):
@@ -523,8 +519,7 @@ class PagosEfectivoView(QWidget):
         id_registro = self.table.item(row, 0).text()
         
         cols_query = ", ".join(self.db_columns)
-        self.db.cursor.execute(f"SELECT {cols_query} FROM pagos_efectivo WHERE id=?", (id_registro,))
-        row_data = self.db.cursor.fetchone()
+        row_data = self.db.fetch_one(f"SELECT {cols_query} FROM pagos_efectivo WHERE id=?", (id_registro,))
         
         if row_data:
             data = dict(zip(self.db_columns, row_data))
@@ -542,6 +537,5 @@ class PagosEfectivoView(QWidget):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            self.db.cursor.execute("DELETE FROM pagos_efectivo WHERE id=?", (id_registro,))
-            self.db.conn.commit()
+            self.db.execute_query("DELETE FROM pagos_efectivo WHERE id=?", (id_registro,))
             self.cargar_datos()
@@ -81,12 +81,11 @@ class YappyDialog(QDialog):
 
         if self.data:
             query = "UPDATE yappy_cuentas SET nombre=?, numero=? WHERE id=?"
-            self.db.cursor.execute(query, (nombre, numero, self.data["id"]))
+            self.db.execute_query(query, (nombre, numero, self.data["id"]))
         else:
             query = "INSERT INTO yappy_cuentas (nombre, numero) VALUES (?, ?)"
-            self.db.cursor.execute(query, (nombre, numero))
+            self.db.execute_query(query, (nombre, numero))
             
-        self.db.conn.commit()
         self.accept()
 
 
@@ -140,8 +139,7 @@ class GestionYappyDialog(QDialog):
         self.cargar_yappys()
 
     def cargar_yappys(self):
-        self.db.cursor.execute("SELECT id, nombre, numero FROM yappy_cuentas ORDER BY id DESC")
-        rows = self.db.cursor.fetchall()
+        rows = self.db.fetch_all("SELECT id, nombre, numero FROM yappy_cuentas ORDER BY id DESC")
         self.table_yappy.setRowCount(0)
         
         for r_idx, row in enumerate(rows):
@@ -162,8 +160,7 @@ class GestionYappyDialog(QDialog):
 
         yappy_id = self.table_yappy.item(row, 0).text()
         
-        self.db.cursor.execute("SELECT id, nombre, numero FROM yappy_cuentas WHERE id=?", (yappy_id,))
-        row_data = self.db.cursor.fetchone()
+        row_data = self.db.fetch_one("SELECT id, nombre, numero FROM yappy_cuentas WHERE id=?", (yappy_id,))
         
         if row_data:
             data = {"id": row_data[0], "nombre": row_data[1], "numero": row_data[2]}
@@ -181,8 +178,7 @@ class GestionYappyDialog(QDialog):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            self.db.cursor.execute("DELETE FROM yappy_cuentas WHERE id=?", (yappy_id,))
-            self.db.conn.commit()
+            self.db.execute_query("DELETE FROM yappy_cuentas WHERE id=?", (yappy_id,))
             self.cargar_yappys()
 
 
@@ -262,15 +258,14 @@ class TransaccionYappyDialog(QDialog):
                 SET fecha=?, proveedor=?, descripcion=?, monto=?
                 WHERE id=?
             """
-            self.db.cursor.execute(query, (fecha, proveedor, descripcion, monto, self.data["id"]))
+            self.db.execute_query(query, (fecha, proveedor, descripcion, monto, self.data["id"]))
         else:
             query = """
                 INSERT INTO transacciones_yappy (yappy_id, fecha, proveedor, descripcion, monto)
                 VALUES (?, ?, ?, ?, ?)
             """
-            self.db.cursor.execute(query, (self.yappy_id, fecha, proveedor, descripcion, monto))
+            self.db.execute_query(query, (self.yappy_id, fecha, proveedor, descripcion, monto))
             
-        self.db.conn.commit()
         return True
 
     def save(self):
@@ -408,8 +403,7 @@ class PagosYappyView(QWidget):
     def actualizar_combo_yappy(self):
         current_id = self.combo_yappy.currentData()
         
-        self.db.cursor.execute("SELECT id, nombre, numero FROM yappy_cuentas ORDER BY id DESC")
-        rows = self.db.cursor.fetchall()
+        rows = self.db.fetch_all("SELECT id, nombre, numero FROM yappy_cuentas ORDER BY id DESC")
         
         self.combo_yappy.blockSignals(True)
         self.combo_yappy.clear()
@@ -462,13 +456,12 @@ class PagosYappyView(QWidget):
             return
             
         self.table_transacciones.setSortingEnabled(False)
-        self.db.cursor.execute("""
+        rows = self.db.fetch_all("""
             SELECT id, fecha, proveedor, descripcion, monto 
             FROM transacciones_yappy 
             WHERE yappy_id = ? 
             ORDER BY fecha DESC, id DESC
         """, (self.yappy_seleccionado_id,))
-        rows = self.db.cursor.fetchall()
         self.table_transacciones.setRowCount(0)
 
         for r_idx, row in enumerate(rows):
@@ -504,17 +497,15 @@ class PagosYappyView(QWidget):
         if not self.yappy_seleccionado_id:
             return
             
-        self.db.cursor.execute("""
+        rows = self.db.fetch_all("""
             SELECT 
-                strftime('%Y-%m', fecha) as mes_anio,
+                mes,
                 SUM(monto) as total_pagos
             FROM transacciones_yappy
             WHERE yappy_id = ?
-            GROUP BY mes_anio
-            ORDER BY mes_anio DESC
+            GROUP BY mes
+            ORDER BY mes DESC
         """, (self.yappy_seleccionado_id,))
-        
-        rows = self.db.cursor.fetchall()
         self.table_resumen.setRowCount(0)
         
         for r_idx, row in enumerate(rows):
@@ -569,7 +560,6 @@ class PagosYappyView(QWidget):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            self.db.cursor.execute("DELETE FROM transacciones_yappy WHERE id=?", (trans_id,))
-            self.db.conn.commit()
+            self.db.execute_query("DELETE FROM transacciones_yappy WHERE id=?", (trans_id,))
             self.cargar_transacciones()
             self.cargar_resumen()
\ No newline at end of file
@@ -10,6 +10,8 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QColor, QFont
 
+from app.utils.combos import asignar_combo
+
 _RED   = "#a20f22"
 _DARK  = "#2c3e50"
 _GREEN = "#2e7d32"
@@ -62,11 +64,7 @@ class EmpleadoDialog(QDialog):
         self.puesto_input   = QLineEdit()
 
         self.sucursal_combo = QComboBox()
-        self.sucursal_combo.addItem("— Sin sucursal —", None)
-        for sid, sname in self.db.fetch_all(
-            "SELECT id, nombre FROM sucursales ORDER BY nombre", ()
-        ):
-            self.sucursal_combo.addItem(sname, sid)
+        asignar_combo(self.sucursal_combo, self.db, "sucursales", "— Sin sucursal —")
 
         self.salario_spin = QDoubleSpinBox()
         self.salario_spin.setRange(0, 999_999)
@@ -195,16 +193,8 @@ class TabEmpleados(QWidget):
         layout.addWidget(self.table)
 
     def _cargar_sucursales(self):
-        current = self.cmb_sucursal.currentData()
         self.cmb_sucursal.blockSignals(True)
-        self.cmb_sucursal.clear()
-        self.cmb_sucursal.addItem("— Todas las sucursales —", None)
-        for sid, sname in self.db.fetch_all("SELECT id, nombre FROM sucursales ORDER BY nombre", ()):
-            self.cmb_sucursal.addItem(sname, sid)
-        if current is not None:
-            for i in range(self.cmb_sucursal.count()):
-                if self.cmb_sucursal.itemData(i) == current:
-                    self.cmb_sucursal.setCurrentIndex(i); break
+        asignar_combo(self.cmb_sucursal, self.db, "sucursales", "— Todas las sucursales —")
         self.cmb_sucursal.blockSignals(False)
 
     def _cargar_tabla(self):
@@ -300,9 +290,7 @@ class PeriodoPagoDialog(QDialog):
         self.fecha_fin.setDate(QDate.currentDate())
         self.fecha_fin.setDisplayFormat("dd/MM/yyyy")
         self.sucursal_combo = QComboBox()
-        self.sucursal_combo.addItem("— Todas las sucursales —", None)
-        for sid, sname in self.db.fetch_all("SELECT id, nombre FROM sucursales ORDER BY nombre", ()):
-            self.sucursal_combo.addItem(sname, sid)
+        asignar_combo(self.sucursal_combo, self.db, "sucursales", "— Todas las sucursales —")
 
         form.addRow("Nombre *:",     self.nombre_input)
         form.addRow("Fecha Inicio:", self.fecha_inicio)
@@ -674,10 +662,7 @@ class RegistroHorasDialog(QDialog):
         layout.addLayout(br)
 
     def _poblar_combo_sucursales(self):
-        self.cmb_filtro_suc.clear()
-        self.cmb_filtro_suc.addItem("— Todas las sucursales —", None)
-        for sid, sname in self.db.fetch_all("SELECT id, nombre FROM sucursales ORDER BY nombre", ()):
-            self.cmb_filtro_suc.addItem(sname, sid)
+        asignar_combo(self.cmb_filtro_suc, self.db, "sucursales", "— Todas las sucursales —")
         if self.periodo_sucursal is not None:
             for i in range(self.cmb_filtro_suc.count()):
                 if self.cmb_filtro_suc.itemData(i) == self.periodo_sucursal:
@@ -710,6 +695,7 @@ class RegistroHorasDialog(QDialog):
             self.table.setItem(r, 9, QTableWidgetItem(obs or ""))
 
     def _guardar(self):
+        filas = []
         for r in range(self.table.rowCount()):
             eid = int(self.table.item(r, 0).text())
             vals = {}
@@ -721,18 +707,23 @@ class RegistroHorasDialog(QDialog):
                     return QMessageBox.warning(self, "Error",
                         f"Fila {r+1} ({header}): valor numérico requerido.")
             obs = self.table.item(r, 9).text() if self.table.item(r, 9) else ""
-            exist = self.db.fetch_one(
-                "SELECT id FROM horas_empleado WHERE empleado_id=? AND periodo_id=?", (eid, self.periodo_id))
-            if exist:
-                self.db.execute_query(
+            filas.append((vals["horas_regulares"], vals["horas_festivos"], vals["horas_domingos"],
+                          vals["horas_extra_diurnas"], vals["horas_extra_nocturnas"], obs, eid))
+
+        existentes = {row[0] for row in self.db.fetch_all(
+            "SELECT empleado_id FROM horas_empleado WHERE periodo_id=?", (self.periodo_id,))}
+        updates = [f + (self.periodo_id,) for f in filas if f[-1] in existentes]
+        inserts = [(f[-1], self.periodo_id) + f[:-1] for f in filas if f[-1] not in existentes]
+        try:
+            with self.db.transaction():
+                self.db.execute_many(
                     "UPDATE horas_empleado SET horas_regulares=?, horas_festivos=?, horas_domingos=?, horas_extra_diurnas=?, horas_extra_nocturnas=?, observacion=? WHERE empleado_id=? AND periodo_id=?",
-                    (vals["horas_regulares"], vals["horas_festivos"], vals["horas_domingos"],
-                     vals["horas_extra_diurnas"], vals["horas_extra_nocturnas"], obs, eid, self.periodo_id))
-            else:
-                self.db.execute_query(
+                    updates)
+                self.db.execute_many(
                     "INSERT INTO horas_empleado (empleado_id, periodo_id, horas_regulares, horas_festivos, horas_domingos, horas_extra_diurnas, horas_extra_nocturnas, observacion) VALUES (?,?,?,?,?,?,?,?)",
-                    (eid, self.periodo_id, vals["horas_regulares"], vals["horas_festivos"],
-                     vals["horas_domingos"], vals["horas_extra_diurnas"], vals["horas_extra_nocturnas"], obs))
+                    inserts)
+        except Exception as e:
+            return QMessageBox.critical(self, "Error", f"No se pudieron guardar las horas:\n{e}")
         QMessageBox.information(self, "Éxito", "Horas guardadas correctamente.")
         self.accept()
 
@@ -789,16 +780,8 @@ class TabPeriodos(QWidget):
         layout.addWidget(self.table)
 
     def _cargar_sucursales(self):
-        current = self.cmb_sucursal.currentData()
         self.cmb_sucursal.blockSignals(True)
-        self.cmb_sucursal.clear()
-        self.cmb_sucursal.addItem("— Todas las sucursales —", None)
-        for sid, sname in self.db.fetch_all("SELECT id, nombre FROM sucursales ORDER BY nombre", ()):
-            self.cmb_sucursal.addItem(sname, sid)
-        if current is not None:
-            for i in range(self.cmb_sucursal.count()):
-                if self.cmb_sucursal.itemData(i) == current:
-                    self.cmb_sucursal.setCurrentIndex(i); break
+        asignar_combo(self.cmb_sucursal, self.db, "sucursales", "— Todas las sucursales —")
         self.cmb_sucursal.blockSignals(False)
 
     def _cargar_tabla(self):
@@ -1312,22 +1295,23 @@ class TabResumen(QWidget):
         layout.addWidget(self.table)
 
     def _cargar_combos(self):
-        for cmb, sql, label in [
-            (self.cmb_periodo,  "SELECT id, nombre FROM periodos_pago ORDER BY fecha_inicio DESC",
-             "— Seleccione un período —"),
-            (self.cmb_sucursal, "SELECT id, nombre FROM sucursales ORDER BY nombre",
-             "— Todas las sucursales —"),
-        ]:
-            current = cmb.currentData()
-            cmb.blockSignals(True); cmb.clear()
-            cmb.addItem(label, None)
-            for rid, rname in self.db.fetch_all(sql, ()):
-                cmb.addItem(rname, rid)
-            if current is not None:
-                for i in range(cmb.count()):
-                    if cmb.itemData(i) == current:
-                        cmb.setCurrentIndex(i); break
-            cmb.blockSignals(False)
+        cmb = self.cmb_periodo
+        current = cmb.currentData()
+        cmb.blockSignals(True); cmb.clear()
+        cmb.addItem("— Seleccione un período —", None)
+        for rid, rname in self.db.fetch_all(
+            "SELECT id, nombre FROM periodos_pago ORDER BY fecha_inicio DESC", ()
+        ):
+            cmb.addItem(rname, rid)
+        if current is not None:
+            for i in range(cmb.count()):
+                if cmb.itemData(i) == current:
+                    cmb.setCurrentIndex(i); break
+        cmb.blockSignals(False)
+
+        self.cmb_sucursal.blockSignals(True)
+        asignar_combo(self.cmb_sucursal, self.db, "sucursales", "— Todas las sucursales —")
+        self.cmb_sucursal.blockSignals(False)
 
     def cargar_datos(self):
         self._cargar_combos()
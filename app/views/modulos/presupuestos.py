@@ -1,5 +1,4 @@
 # [FILE: app/views/modulos/presupuestos.py]
-import math
 from PyQt5.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -25,6 +24,9 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QColor, QFont
 
+from app.controllers.presupuesto_controller import PresupuestoController
+from app.database.async_query import AsyncQueryRunner
+
 DIALOG_STYLES = """
     QDialog {
         background-color: #f0f2f5;
@@ -261,6 +263,59 @@ class PresupuestosView(QWidget):
             self.cargar_datos()
 
 
+def _consultar_control_presupuesto(conn, presupuesto_id):
+    """Agrupa lo presupuestado vs. lo ejecutado (compras) por categoría e insumo."""
+    query_pres = """
+        SELECT categoria_nombre, insumo_nombre, monto_estimado 
+        FROM detalle_presupuestos 
+        WHERE presupuesto_id = ?
+    """
+    datos_presupuesto = conn.execute(query_pres, (presupuesto_id,)).fetchall()
+
+    query_compras = """
+        SELECT 
+            COALESCE(cat.nombre, 'Sin Categoría') as categoria,
+            i.nombre as insumo,
+            SUM(dc.subtotal) as ejecutado
+        FROM detalle_compras dc
+        JOIN compras c ON dc.compra_id = c.id
+        JOIN presentaciones_compra pc ON dc.presentacion_id = pc.id
+        JOIN insumos i ON pc.insumo_id = i.id
+        LEFT JOIN categorias_insumos cat ON i.categoria_id = cat.id
+        WHERE c.presupuesto_id = ?
+        GROUP BY cat.nombre, i.nombre
+    """
+    datos_compras = conn.execute(query_compras, (presupuesto_id,)).fetchall()
+
+    diccionario = {}
+
+    for d in datos_presupuesto:
+        cat_nom = d[0] if d[0] else "Sin Categoría"
+        ins_nom = d[1]
+        monto_pres = d[2]
+
+        if cat_nom not in diccionario:
+            diccionario[cat_nom] = {}
+        if ins_nom not in diccionario[cat_nom]:
+            diccionario[cat_nom][ins_nom] = {"presupuestado": 0.0, "ejecutado": 0.0}
+
+        diccionario[cat_nom][ins_nom]["presupuestado"] += monto_pres
+
+    for c in datos_compras:
+        cat_nom = c[0]
+        ins_nom = c[1]
+        monto_ejec = c[2]
+
+        if cat_nom not in diccionario:
+            diccionario[cat_nom] = {}
+        if ins_nom not in diccionario[cat_nom]:
+            diccionario[cat_nom][ins_nom] = {"presupuestado": 0.0, "ejecutado": 0.0}
+
+        diccionario[cat_nom][ins_nom]["ejecutado"] += monto_ejec
+
+    return diccionario
+
+
 class ControlPresupuestoDialog(QDialog):
     def __init__(self, db_manager, presupuesto_id, numero, mes, anio, parent=None):
         super().__init__(parent)
@@ -274,6 +329,7 @@ class ControlPresupuestoDialog(QDialog):
         self.resize(900, 600)
         self.setStyleSheet(DIALOG_STYLES)
 
+        self.runner = AsyncQueryRunner(db_manager, self)
         self.init_ui()
         self.cargar_datos_control()
 
@@ -314,55 +370,16 @@ class ControlPresupuestoDialog(QDialog):
         layout.addWidget(btn_cerrar, alignment=Qt.AlignRight)
 
     def cargar_datos_control(self):
-        self.tree.clear()
-
-        query_pres = """
-            SELECT categoria_nombre, insumo_nombre, monto_estimado 
-            FROM detalle_presupuestos 
-            WHERE presupuesto_id = ?
-        """
-        datos_presupuesto = self.db.fetch_all(query_pres, (self.presupuesto_id,))
-
-        query_compras = """
-            SELECT 
-                COALESCE(cat.nombre, 'Sin Categoría') as categoria,
-                i.nombre as insumo,
-                SUM(dc.subtotal) as ejecutado
-            FROM detalle_compras dc
-            JOIN compras c ON dc.compra_id = c.id
-            JOIN presentaciones_compra pc ON dc.presentacion_id = pc.id
-            JOIN insumos i ON pc.insumo_id = i.id
-            LEFT JOIN categorias_insumos cat ON i.categoria_id = cat.id
-            WHERE c.presupuesto_id = ?
-            GROUP BY cat.nombre, i.nombre
-        """
-        datos_compras = self.db.fetch_all(query_compras, (self.presupuesto_id,))
-
-        diccionario = {}
-
-        for d in datos_presupuesto:
-            cat_nom = d[0] if d[0] else "Sin Categoría"
-            ins_nom = d[1]
-            monto_pres = d[2]
-
-            if cat_nom not in diccionario:
-                diccionario[cat_nom] = {}
-            if ins_nom not in diccionario[cat_nom]:
-                diccionario[cat_nom][ins_nom] = {"presupuestado": 0.0, "ejecutado": 0.0}
-
-            diccionario[cat_nom][ins_nom]["presupuestado"] += monto_pres
-
-        for c in datos_compras:
-            cat_nom = c[0]
-            ins_nom = c[1]
-            monto_ejec = c[2]
-
-            if cat_nom not in diccionario:
-                diccionario[cat_nom] = {}
-            if ins_nom not in diccionario[cat_nom]:
-                diccionario[cat_nom][ins_nom] = {"presupuestado": 0.0, "ejecutado": 0.0}
+        self.runner.submit(
+            "control",
+            _consultar_control_presupuesto,
+            self.presupuesto_id,
+            on_result=self._mostrar_control,
+            on_error=lambda msg: self.lbl_resumen.setText(f"Error al cargar datos: {msg}"),
+        )
 
-            diccionario[cat_nom][ins_nom]["ejecutado"] += monto_ejec
+    def _mostrar_control(self, diccionario):
+        self.tree.clear()
 
         gran_total_presupuestado = 0.0
         gran_total_ejecutado = 0.0
@@ -755,263 +772,9 @@ class CrearPresupuestoDialog(QDialog):
             return
 
         try:
-            placeholders = ",".join(["?"] * len(reportes_ids))
-
-            # --- MODIFICADO: Calculamos el promedio del porcentaje_sugerido de los reportes ---
-            query_pct = f"SELECT AVG(porcentaje_sugerido) FROM reportes_ventas WHERE id IN ({placeholders})"
-            avg_pct_row = self.db.fetch_one(query_pct, tuple(reportes_ids))
-            avg_pct = float(avg_pct_row[0]) if avg_pct_row and avg_pct_row[0] else 0.0
-
-            query_ventas = f"""
-                SELECT reporte_id, codigo_producto, LOWER(dia_semana), SUM(promedio_medida) as cant
-                FROM detalle_reportes_ventas 
-                WHERE reporte_id IN ({placeholders})
-                GROUP BY reporte_id, codigo_producto, LOWER(dia_semana)
-            """
-            ventas_data = self.db.fetch_all(query_ventas, tuple(reportes_ids))
-
-            dias_validos = {
-                "lunes",
-                "martes",
-                "miercoles",
-                "miércoles",
-                "jueves",
-                "viernes",
-                "sabado",
-                "sábado",
-                "domingo",
-                "lun",
-                "mar",
-                "mie",
-                "jue",
-                "vie",
-                "sab",
-                "dom",
-            }
-
-            ventas_por_producto = {}
-            for row in ventas_data:
-                rep_id, cod, dia, cant = row
-                dia_str = str(dia).strip().lower()
-
-                if dia_str not in dias_validos:
-                    continue
-
-                if cod not in ventas_por_producto:
-                    ventas_por_producto[cod] = {}
-                if dia_str not in ventas_por_producto[cod]:
-                    ventas_por_producto[cod][dia_str] = []
-
-                ventas_por_producto[cod][dia_str].append(cant)
-
-            ventas_detalle_mensual = {}
-            SEMANAS_POR_MES = 4.0
-            total_reportes = len(reportes_ids)
-
-            for cod, dias in ventas_por_producto.items():
-                detalle_dias = {}
-                total_venta_semanal_promedio = 0
-                for dia, cants in dias.items():
-                    prom_dia = sum(cants) / total_reportes
-                    detalle_dias[dia] = prom_dia
-                    total_venta_semanal_promedio += prom_dia
-
-                ventas_detalle_mensual[cod] = {
-                    "dias": detalle_dias,
-                    "total_mensual": total_venta_semanal_promedio * SEMANAS_POR_MES,
-                }
-
-            insumos_calc = {}
-
-            for cod, info_ventas in ventas_detalle_mensual.items():
-                ventas_totales = info_ventas["total_mensual"]
-                if ventas_totales <= 0:
-                    continue
-
-                # --- MODIFICADO: Ya no buscamos factor_calculo de insumos, sino aplicamos pct global del reporte ---
-                query_recetas = """
-                    SELECT r.insumo_id, i.nombre, c.nombre as categoria, 
-                           r.cantidad_necesaria, m.nombre as menu_nombre, u.abreviatura
-                    FROM recetas r
-                    JOIN menu_items m ON r.menu_item_id = m.id
-                    JOIN insumos i ON r.insumo_id = i.id
-                    LEFT JOIN categorias_insumos c ON i.categoria_id = c.id
-                    LEFT JOIN unidades_medida u ON i.unidad_base_id = u.id
-                    WHERE m.codigo = ?
-                """
-                recetas = self.db.fetch_all(query_recetas, (cod,))
-
-                for rec in recetas:
-                    ins_id, ins_nom, cat_nom, cant_nec, menu_nom, abrev_uni = rec
-                    cat_nom = cat_nom if cat_nom else "Sin Categoría"
-                    abrev_uni = abrev_uni if abrev_uni else "Und."
-
-                    pct_usado = avg_pct
-                    factor_val = 1.0 + (pct_usado / 100.0)
-
-                    cant_amplificada = (ventas_totales * cant_nec) * factor_val
-
-                    if ins_id not in insumos_calc:
-                        insumos_calc[ins_id] = {
-                            "nombre": ins_nom,
-                            "categoria": cat_nom,
-                            "unidad_base": abrev_uni,
-                            "pct_usado": pct_usado,
-                            "factor": factor_val,
-                            "qty_base_total": 0.0,
-                            "items_menu": {},
-                        }
-
-                    insumos_calc[ins_id]["qty_base_total"] += cant_amplificada
-
-                    if menu_nom not in insumos_calc[ins_id]["items_menu"]:
-                        insumos_calc[ins_id]["items_menu"][menu_nom] = {
-                            "ventas_dias": info_ventas["dias"],
-                            "ventas_mensual": ventas_totales,
-                            "receta_cant": cant_nec,
-                            "total_plato": 0.0,
-                        }
-
-                    insumos_calc[ins_id]["items_menu"][menu_nom]["total_plato"] += (
-                        cant_amplificada
-                    )
-
-            monto_total_presupuesto = 0.0
-            detalles_db = []
-
-            for ins_id, data in insumos_calc.items():
-                abrev_base = data["unidad_base"]
-                factor_val = data["factor"]
-                pct_val = data["pct_usado"]
-
-                query_pres = "SELECT cantidad_contenido, precio_compra, nombre FROM presentaciones_compra WHERE insumo_id = ? ORDER BY id ASC LIMIT 1"
-                pres = self.db.fetch_one(query_pres, (ins_id,))
-
-                cant_compra_exacta = 0.0
-                cant_compra_final = 0.0
-                costo_insumo_final = 0.0
-                unidad_nombre_final = ""
-
-                det_html = f"<div style='font-family: Arial, sans-serif;'>"
-                det_html += f"<h3 style='color:#2c3e50; border-bottom: 2px solid #bdc3c7; padding-bottom: 5px;'>Detalle de Cálculo: {data['nombre']}</h3>"
-
-                det_html += f"<table width='100%' style='margin-bottom: 15px;'><tr>"
-                det_html += (
-                    f"<td width='50%'><b>Unidad Base Recetas:</b> {abrev_base}</td>"
-                )
-                det_html += f"<td width='50%'><b>Porcentaje Sugerido Aplicado:</b> {pct_val:.2f}% (Factor: {factor_val:.2f})</td>"
-                det_html += f"</tr></table>"
-
-                if pres and pres[0] > 0:
-                    cant_contenido, precio_pres, nombre_pres = pres
-
-                    cant_compra_exacta = data["qty_base_total"] / cant_contenido
-                    cant_compra_final = math.ceil(cant_compra_exacta)
-                    costo_insumo_final = cant_compra_final * precio_pres
-                    unidad_nombre_final = nombre_pres
-
-                    det_html += f"<div style='background-color: #e8f8f5; padding: 10px; border-radius: 4px; border: 1px solid #1abc9c; margin-bottom: 15px;'>"
-                    det_html += f"<b>Presentación de Compra:</b> {nombre_pres}<br>"
-                    det_html += f"<b>Contenido:</b> {cant_contenido} {abrev_base}<br>"
-                    det_html += f"<b>Precio:</b> ${precio_pres:,.2f}"
-                    det_html += f"</div>"
-                else:
-                    query_fallback = "SELECT costo_unitario FROM insumos WHERE id = ?"
-                    ins_data = self.db.fetch_one(query_fallback, (ins_id,))
-                    precio_uni = ins_data[0] if ins_data and ins_data[0] else 0.0
-
-                    cant_compra_exacta = data["qty_base_total"]
-                    cant_compra_final = math.ceil(cant_compra_exacta)
-                    costo_insumo_final = cant_compra_final * precio_uni
-                    unidad_nombre_final = abrev_base
-
-                    det_html += f"<div style='background-color: #fcf3cf; padding: 10px; border-radius: 4px; border: 1px solid #f1c40f; margin-bottom: 15px;'>"
-                    det_html += f"<i>No tiene presentación de compra asignada. Se calcula sobre unidad base.</i><br>"
-                    det_html += f"<b>Precio Unitario (Base):</b> ${precio_uni:,.2f}"
-                    det_html += f"</div>"
-
-                monto_total_presupuesto += costo_insumo_final
-
-                det_html += "<h4 style='color:#2980b9;'>1. Requerimiento por Platos de Menú</h4>"
-                factor_str = (
-                    f" x {factor_val:.2f} (Factor)" if factor_val != 1.0 else ""
-                )
-
-                for m_nom, m_info in data["items_menu"].items():
-                    dias_format = " | ".join(
-                        [
-                            f"{d[:3].capitalize()}: {v:.1f}"
-                            for d, v in m_info["ventas_dias"].items()
-                        ]
-                    )
-
-                    det_html += f"<div style='margin-bottom: 10px; padding: 10px; border-left: 4px solid #3498db; background-color: #f8f9fa; border-radius: 0 4px 4px 0;'>"
-                    det_html += (
-                        f"<b style='color:#2c3e50; font-size: 14px;'>{m_nom}</b><br>"
-                    )
-                    det_html += f"<table width='100%' style='font-size: 12px; margin-top: 5px; color: #555;'>"
-                    det_html += f"<tr><td width='35%'><b>Ventas Diario (Promedio):</b></td><td>[{dias_format}]</td></tr>"
-                    det_html += f"<tr><td><b>Ventas Mensual Proyectado:</b></td><td>{m_info['ventas_mensual']:.2f} platos vendidos</td></tr>"
-                    det_html += f"<tr><td><b>Requerido en Receta:</b></td><td>{m_info['receta_cant']:.4f} {abrev_base} por plato</td></tr>"
-                    det_html += f"</table>"
-                    det_html += f"<div style='margin-top: 6px; padding-top: 6px; border-top: 1px dashed #ccc; font-family: monospace; font-size: 13px;'>"
-                    det_html += f"Fórmula: {m_info['ventas_mensual']:.2f} platos x {m_info['receta_cant']:.4f} {abrev_base}{factor_str} = <b style='color: #c0392b;'>{m_info['total_plato']:.2f} {abrev_base}</b>"
-                    det_html += f"</div></div>"
-
-                det_html += f"<h4 style='color:#27ae60; margin-top: 20px;'>2. Conversión a Compras y Costo Final</h4>"
-                det_html += f"<ul style='font-size: 14px; background-color: #ecf0f1; padding: 15px 15px 15px 35px; border-radius: 5px;'>"
-                det_html += f"<li style='margin-bottom: 5px;'><b>Total Base Requerido (Suma Platos):</b> {data['qty_base_total']:.2f} {abrev_base}</li>"
-                det_html += f"<li style='margin-bottom: 5px;'><b>Cantidad Exacta de Compra:</b> {cant_compra_exacta:.2f} {unidad_nombre_final}</li>"
-                det_html += f"<li style='margin-bottom: 5px; color: #c0392b;'><b>Cantidad a Comprar (Redondeada):</b> <span style='background-color:#f1c40f; padding: 2px 5px; border-radius: 3px; font-weight: bold; color: #2c3e50;'>{int(cant_compra_final)} {unidad_nombre_final}</span></li>"
-                det_html += (
-                    f"<li><b>Costo Estimado:</b> ${costo_insumo_final:,.2f}</li>"
-                )
-                det_html += f"</ul></div>"
-
-                items_str = "\n".join(
-                    [
-                        f"• {k} ({v['total_plato']:.2f})"
-                        for k, v in data["items_menu"].items()
-                    ]
-                )
-
-                detalles_db.append(
-                    (
-                        data["categoria"],
-                        data["nombre"],
-                        unidad_nombre_final,
-                        cant_compra_final,
-                        costo_insumo_final,
-                        items_str,
-                        det_html,
-                        data["pct_usado"],
-                    )
-                )
-
-            num_query = "SELECT COUNT(*) FROM presupuestos"
-            count_res = self.db.fetch_one(num_query)
-            count = count_res[0] if count_res else 0
-            nuevo_num = count + 1
-
-            query_pres_insert = "INSERT INTO presupuestos (numero, mes, anio, descripcion, monto_total) VALUES (?,?,?,?,?)"
-            self.db.execute_query(
-                query_pres_insert, (nuevo_num, mes, anio, desc, monto_total_presupuesto)
+            nuevo_num, monto_total_presupuesto = PresupuestoController(self.db).generar(
+                mes, anio, desc, reportes_ids
             )
-            presupuesto_id = self.db.cursor.lastrowid
-
-            for rid in reportes_ids:
-                self.db.execute_query(
-                    "INSERT INTO presupuesto_reportes (presupuesto_id, reporte_id) VALUES (?,?)",
-                    (presupuesto_id, int(rid)),
-                )
-
-            query_det_insert = """
-                INSERT INTO detalle_presupuestos 
-                (presupuesto_id, categoria_nombre, insumo_nombre, unidad_nombre, cantidad_requerida, monto_estimado, items_menu, detalle_calculo, porcentaje_usado) 
-                VALUES (?,?,?,?,?,?,?,?,?)
-            """
-            for det in detalles_db:
-                self.db.execute_query(query_det_insert, (presupuesto_id, *det))
 
             QMessageBox.information(
                 self,
@@ -1148,7 +911,7 @@ class VerPresupuestoDialog(QDialog):
         self.actualizar_encabezado()
 
         query = """
-            SELECT id, categoria_nombre, insumo_nombre, unidad_nombre, cantidad_requerida, monto_estimado, items_menu, detalle_calculo, porcentaje_usado
+            SELECT id, categoria_nombre, insumo_nombre, unidad_nombre, cantidad_requerida, monto_estimado, items_menu, porcentaje_usado
             FROM detalle_presupuestos 
             WHERE presupuesto_id = ? 
             ORDER BY categoria_nombre, insumo_nombre
@@ -1165,7 +928,6 @@ class VerPresupuestoDialog(QDialog):
                 cant,
                 monto,
                 items,
-                det_calc,
                 pct_usado,
             ) = d
             if cat_nom not in agrupado:
@@ -1194,7 +956,6 @@ class VerPresupuestoDialog(QDialog):
                     cant,
                     monto,
                     items,
-                    det_calc,
                     pct_usado,
                 ) = d
 
@@ -1225,7 +986,7 @@ class VerPresupuestoDialog(QDialog):
                 btn_detalle.setCursor(Qt.PointingHandCursor)
                 btn_detalle.setMinimumWidth(68)
                 btn_detalle.clicked.connect(
-                    lambda checked, html=det_calc: self.mostrar_calculo(html)
+                    lambda checked, d_id=det_id: self.mostrar_calculo(d_id)
                 )
 
                 btn_porcentaje = QPushButton("Ajustar %")
@@ -1291,13 +1052,7 @@ class VerPresupuestoDialog(QDialog):
                 return
 
         try:
-            query_reps = (
-                "SELECT reporte_id FROM presupuesto_reportes WHERE presupuesto_id = ?"
-            )
-            reps = self.db.fetch_all(query_reps, (self.presupuesto_id,))
-            reportes_ids = [str(r[0]) for r in reps]
-
-            if not reportes_ids:
+            if not PresupuestoController(self.db).recalcular(self.presupuesto_id):
                 if confirmar:
                     QMessageBox.warning(
                         self,
@@ -1306,230 +1061,6 @@ class VerPresupuestoDialog(QDialog):
                     )
                 return
 
-            query_pct_existentes = "SELECT insumo_nombre, porcentaje_usado FROM detalle_presupuestos WHERE presupuesto_id = ?"
-            pcts_existentes = {}
-            for row in self.db.fetch_all(query_pct_existentes, (self.presupuesto_id,)):
-                if row[1] is not None:
-                    pcts_existentes[row[0]] = float(row[1])
-
-            placeholders = ",".join(["?"] * len(reportes_ids))
-
-            query_avg_pct = f"SELECT AVG(porcentaje_sugerido) FROM reportes_ventas WHERE id IN ({placeholders})"
-            avg_pct_row = self.db.fetch_one(query_avg_pct, tuple(reportes_ids))
-            avg_pct = float(avg_pct_row[0]) if avg_pct_row and avg_pct_row[0] else 0.0
-
-            query_extras = """
-                SELECT categoria_nombre, insumo_nombre, unidad_nombre, cantidad_requerida, monto_estimado, items_menu, detalle_calculo, porcentaje_usado
-                FROM detalle_presupuestos 
-                WHERE presupuesto_id = ? AND items_menu = 'Agregado Extra'
-            """
-            extras = self.db.fetch_all(query_extras, (self.presupuesto_id,))
-
-            query_ventas = f"""
-                SELECT reporte_id, codigo_producto, LOWER(dia_semana), SUM(promedio_medida) as cant
-                FROM detalle_reportes_ventas 
-                WHERE reporte_id IN ({placeholders})
-                GROUP BY reporte_id, codigo_producto, LOWER(dia_semana)
-            """
-            ventas_data = self.db.fetch_all(query_ventas, tuple(reportes_ids))
-
-            dias_validos = {
-                "lunes",
-                "martes",
-                "miercoles",
-                "miércoles",
-                "jueves",
-                "viernes",
-                "sabado",
-                "sábado",
-                "domingo",
-                "lun",
-                "mar",
-                "mie",
-                "jue",
-                "vie",
-                "sab",
-                "dom",
-            }
-
-            ventas_por_producto = {}
-            for row in ventas_data:
-                rep_id, cod, dia, cant = row
-                dia_str = str(dia).strip().lower()
-                if dia_str not in dias_validos:
-                    continue
-                if cod not in ventas_por_producto:
-                    ventas_por_producto[cod] = {}
-                if dia_str not in ventas_por_producto[cod]:
-                    ventas_por_producto[cod][dia_str] = []
-                ventas_por_producto[cod][dia_str].append(cant)
-
-            ventas_detalle_mensual = {}
-            SEMANAS_POR_MES = 4.0
-            total_reportes = len(reportes_ids)
-
-            for cod, dias in ventas_por_producto.items():
-                detalle_dias = {}
-                total_venta_semanal_promedio = 0
-                for dia, cants in dias.items():
-                    prom_dia = sum(cants) / total_reportes
-                    detalle_dias[dia] = prom_dia
-                    total_venta_semanal_promedio += prom_dia
-
-                ventas_detalle_mensual[cod] = {
-                    "dias": detalle_dias,
-                    "total_mensual": total_venta_semanal_promedio * SEMANAS_POR_MES,
-                }
-
-            insumos_calc = {}
-            for cod, info_ventas in ventas_detalle_mensual.items():
-                ventas_totales = info_ventas["total_mensual"]
-                if ventas_totales <= 0:
-                    continue
-
-                query_recetas = """
-                    SELECT r.insumo_id, i.nombre, c.nombre as categoria, 
-                           r.cantidad_necesaria, m.nombre as menu_nombre, u.abreviatura
-                    FROM recetas r
-                    JOIN menu_items m ON r.menu_item_id = m.id
-                    JOIN insumos i ON r.insumo_id = i.id
-                    LEFT JOIN categorias_insumos c ON i.categoria_id = c.id
-                    LEFT JOIN unidades_medida u ON i.unidad_base_id = u.id
-                    WHERE m.codigo = ?
-                """
-                recetas = self.db.fetch_all(query_recetas, (cod,))
-
-                for rec in recetas:
-                    ins_id, ins_nom, cat_nom, cant_nec, menu_nom, abrev_uni = rec
-                    cat_nom = cat_nom if cat_nom else "Sin Categoría"
-                    abrev_uni = abrev_uni if abrev_uni else "Und."
-
-                    pct_usado = pcts_existentes.get(ins_nom, avg_pct)
-                    factor_val = 1.0 + (pct_usado / 100.0)
-
-                    cant_amplificada = (ventas_totales * cant_nec) * factor_val
-
-                    if ins_id not in insumos_calc:
-                        insumos_calc[ins_id] = {
-                            "nombre": ins_nom,
-                            "categoria": cat_nom,
-                            "unidad_base": abrev_uni,
-                            "pct_usado": pct_usado,
-                            "factor": factor_val,
-                            "qty_base_total": 0.0,
-                            "items_menu": {},
-                        }
-
-                    insumos_calc[ins_id]["qty_base_total"] += cant_amplificada
-
-                    if menu_nom not in insumos_calc[ins_id]["items_menu"]:
-                        insumos_calc[ins_id]["items_menu"][menu_nom] = {
-                            "ventas_dias": info_ventas["dias"],
-                            "ventas_mensual": ventas_totales,
-                            "receta_cant": cant_nec,
-                            "total_plato": 0.0,
-                        }
-
-                    insumos_calc[ins_id]["items_menu"][menu_nom]["total_plato"] += (
-                        cant_amplificada
-                    )
-
-            import math
-
-            detalles_db = []
-            for ins_id, data in insumos_calc.items():
-                abrev_base = data["unidad_base"]
-                factor_val = data["factor"]
-                pct_val = data["pct_usado"]
-
-                query_pres = "SELECT cantidad_contenido, precio_compra, nombre FROM presentaciones_compra WHERE insumo_id = ? ORDER BY id ASC LIMIT 1"
-                pres = self.db.fetch_one(query_pres, (ins_id,))
-
-                cant_compra_exacta = 0.0
-                cant_compra_final = 0.0
-                costo_insumo_final = 0.0
-                unidad_nombre_final = ""
-
-                det_html = f"<div style='font-family: Arial, sans-serif;'>"
-                det_html += f"<h3 style='color:#2c3e50; border-bottom: 2px solid #bdc3c7; padding-bottom: 5px;'>Detalle de Cálculo: {data['nombre']}</h3>"
-                det_html += f"<table width='100%' style='margin-bottom: 15px;'><tr><td width='50%'><b>Unidad Base Recetas:</b> {abrev_base}</td><td width='50%'><b>Porcentaje Sugerido Aplicado:</b> {pct_val:.2f}% (Factor: {factor_val:.2f})</td></tr></table>"
-
-                if pres and pres[0] > 0:
-                    cant_contenido, precio_pres, nombre_pres = pres
-                    cant_compra_exacta = data["qty_base_total"] / cant_contenido
-                    cant_compra_final = math.ceil(cant_compra_exacta)
-                    costo_insumo_final = cant_compra_final * precio_pres
-                    unidad_nombre_final = nombre_pres
-
-                    det_html += f"<div style='background-color: #e8f8f5; padding: 10px; border-radius: 4px; border: 1px solid #1abc9c; margin-bottom: 15px;'>"
-                    det_html += f"<b>Presentación de Compra:</b> {nombre_pres}<br><b>Contenido:</b> {cant_contenido} {abrev_base}<br><b>Precio:</b> ${precio_pres:,.2f}</div>"
-                else:
-                    query_fallback = "SELECT costo_unitario FROM insumos WHERE id = ?"
-                    ins_data = self.db.fetch_one(query_fallback, (ins_id,))
-                    precio_uni = ins_data[0] if ins_data and ins_data[0] else 0.0
-                    cant_compra_exacta = data["qty_base_total"]
-                    cant_compra_final = math.ceil(cant_compra_exacta)
-                    costo_insumo_final = cant_compra_final * precio_uni
-                    unidad_nombre_final = abrev_base
-
-                    det_html += f"<div style='background-color: #fcf3cf; padding: 10px; border-radius: 4px; border: 1px solid #f1c40f; margin-bottom: 15px;'>"
-                    det_html += f"<i>No tiene presentación de compra asignada. Se calcula sobre unidad base.</i><br><b>Precio Unitario (Base):</b> ${precio_uni:,.2f}</div>"
-
-                det_html += "<h4 style='color:#2980b9;'>1. Requerimiento por Platos de Menú</h4>"
-                factor_str = (
-                    f" x {factor_val:.2f} (Factor)" if factor_val != 1.0 else ""
-                )
-
-                for m_nom, m_info in data["items_menu"].items():
-                    dias_format = " | ".join(
-                        [
-                            f"{d[:3].capitalize()}: {v:.1f}"
-                            for d, v in m_info["ventas_dias"].items()
-                        ]
-                    )
-                    det_html += f"<div style='margin-bottom: 10px; padding: 10px; border-left: 4px solid #3498db; background-color: #f8f9fa; border-radius: 0 4px 4px 0;'><b style='color:#2c3e50; font-size: 14px;'>{m_nom}</b><br><table width='100%' style='font-size: 12px; margin-top: 5px; color: #555;'><tr><td width='35%'><b>Ventas Diario (Promedio):</b></td><td>[{dias_format}]</td></tr><tr><td><b>Ventas Mensual Proyectado:</b></td><td>{m_info['ventas_mensual']:.2f} platos vendidos</td></tr><tr><td><b>Requerido en Receta:</b></td><td>{m_info['receta_cant']:.4f} {abrev_base} por plato</td></tr></table><div style='margin-top: 6px; padding-top: 6px; border-top: 1px dashed #ccc; font-family: monospace; font-size: 13px;'>Fórmula: {m_info['ventas_mensual']:.2f} platos x {m_info['receta_cant']:.4f} {abrev_base}{factor_str} = <b style='color: #c0392b;'>{m_info['total_plato']:.2f} {abrev_base}</b></div></div>"
-
-                det_html += f"<h4 style='color:#27ae60; margin-top: 20px;'>2. Conversión a Compras y Costo Final</h4><ul style='font-size: 14px; background-color: #ecf0f1; padding: 15px 15px 15px 35px; border-radius: 5px;'><li style='margin-bottom: 5px;'><b>Total Base Requerido (Suma Platos):</b> {data['qty_base_total']:.2f} {abrev_base}</li><li style='margin-bottom: 5px;'><b>Cantidad Exacta de Compra:</b> {cant_compra_exacta:.2f} {unidad_nombre_final}</li><li style='margin-bottom: 5px; color: #c0392b;'><b>Cantidad a Comprar (Redondeada):</b> <span style='background-color:#f1c40f; padding: 2px 5px; border-radius: 3px; font-weight: bold; color: #2c3e50;'>{int(cant_compra_final)} {unidad_nombre_final}</span></li><li><b>Costo Estimado:</b> ${costo_insumo_final:,.2f}</li></ul></div>"
-
-                items_str = "\n".join(
-                    [
-                        f"• {k} ({v['total_plato']:.2f})"
-                        for k, v in data["items_menu"].items()
-                    ]
-                )
-
-                detalles_db.append(
-                    (
-                        data["categoria"],
-                        data["nombre"],
-                        unidad_nombre_final,
-                        cant_compra_final,
-                        costo_insumo_final,
-                        items_str,
-                        det_html,
-                        data["pct_usado"],
-                    )
-                )
-
-            self.db.execute_query(
-                "DELETE FROM detalle_presupuestos WHERE presupuesto_id = ?",
-                (self.presupuesto_id,),
-            )
-
-            query_det_insert = """
-                INSERT INTO detalle_presupuestos 
-                (presupuesto_id, categoria_nombre, insumo_nombre, unidad_nombre, cantidad_requerida, monto_estimado, items_menu, detalle_calculo, porcentaje_usado) 
-                VALUES (?,?,?,?,?,?,?,?,?)
-            """
-
-            for det in detalles_db:
-                self.db.execute_query(query_det_insert, (self.presupuesto_id, *det))
-
-            for ext in extras:
-                self.db.execute_query(query_det_insert, (self.presupuesto_id, *ext))
-
-            recalcular_total_presupuesto(self.db, self.presupuesto_id)
-
             if confirmar:
                 QMessageBox.information(
                     self,
@@ -1547,7 +1078,12 @@ class VerPresupuestoDialog(QDialog):
                     self, "Error", f"Ha ocurrido un error al recalcular:\n{str(e)}"
                 )
 
-    def mostrar_calculo(self, html_content):
+    def mostrar_calculo(self, det_id):
+        # El detalle se lee y se convierte a HTML solo al abrirlo
+        row = self.db.fetch_one(
+            "SELECT detalle_calculo FROM detalle_presupuestos WHERE id = ?", (det_id,)
+        )
+        html_content = PresupuestoController.renderizar_detalle(row[0] if row else None)
         if not html_content:
             QMessageBox.information(
                 self,
@@ -15,6 +15,9 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt
 
+from app.controllers.recetas_cache import invalidar_recetas
+from app.database.busqueda import busqueda_texto, filtro_columnas
+
 
 # Clase auxiliar para ordenar números correctamente (1, 2, 10 en lugar de 1, 10, 2)
 class NumericItem(QTableWidgetItem):
@@ -56,11 +59,11 @@ class RecetasCRUD(QWidget):
         filter_layout = QHBoxLayout()
         self.input_filtro_codigo = QLineEdit()
         self.input_filtro_codigo.setPlaceholderText("Filtrar por Código...")
-        self.input_filtro_codigo.textChanged.connect(self.aplicar_filtros)
+        self.input_filtro_codigo.textChanged.connect(self.cargar_datos)
 
         self.input_filtro_nombre = QLineEdit()
         self.input_filtro_nombre.setPlaceholderText("Filtrar por Nombre del Plato...")
-        self.input_filtro_nombre.textChanged.connect(self.aplicar_filtros)
+        self.input_filtro_nombre.textChanged.connect(self.cargar_datos)
 
         filter_layout.addWidget(self.input_filtro_codigo)
         filter_layout.addWidget(self.input_filtro_nombre)
@@ -96,15 +99,24 @@ class RecetasCRUD(QWidget):
 
         self.table.setRowCount(0)
 
-        query = """
+        # El nombre se busca con el índice FTS5 y el código como subcadena
+        # (FTS5 solo encuentra prefijos de palabra)
+        busqueda = busqueda_texto(
+            self.db, "menu_items", "m", {"nombre": self.input_filtro_nombre.text()}
+        )
+        condicion, params = filtro_columnas(
+            busqueda, [("m.codigo", self.input_filtro_codigo.text())]
+        )
+        query = f"""
             SELECT m.id, m.codigo, m.nombre, COUNT(r.id) as num_ingredientes
             FROM menu_items m
+            {busqueda.join}
             LEFT JOIN recetas r ON m.id = r.menu_item_id
-            WHERE m.es_preparado = 1
+            WHERE m.es_preparado = 1 AND {condicion}
             GROUP BY m.id
-            ORDER BY m.nombre ASC
+            ORDER BY {busqueda.orden or "m.nombre COLLATE SIN_ACENTOS ASC"}
         """
-        rows = self.db.fetch_all(query)
+        rows = self.db.fetch_all(query, params)
 
         for row_idx, row_data in enumerate(rows):
             self.table.insertRow(row_idx)
@@ -133,25 +145,6 @@ class RecetasCRUD(QWidget):
         # --- CORRECCIÓN: REACTIVAR ORDENAMIENTO AL TERMINAR ---
         self.table.setSortingEnabled(True)
 
-        # Re-aplicar filtros si había texto escrito
-        self.aplicar_filtros()
-
-    def aplicar_filtros(self):
-        txt_code = self.input_filtro_codigo.text().lower()
-        txt_name = self.input_filtro_nombre.text().lower()
-
-        for row in range(self.table.rowCount()):
-            code_item = self.table.item(row, 1).text().lower()
-            name_item = self.table.item(row, 2).text().lower()
-
-            mostrar = True
-            if txt_code and txt_code not in code_item:
-                mostrar = False
-            if txt_name and txt_name not in name_item:
-                mostrar = False
-
-            self.table.setRowHidden(row, not mostrar)
-
     def abrir_editor_receta(self):
         row = self.table.currentRow()
         if row < 0:
@@ -296,6 +289,7 @@ class RecetaEditorDialog(QDialog):
                     "INSERT INTO recetas (menu_item_id, insumo_id, cantidad_necesaria) VALUES (?,?,?)",
                     (self.menu_item_id, insumo_id, cantidad),
                 )
+            invalidar_recetas(self.db)
             self.cargar_receta_actual()
             self.spin_cantidad.setValue(0)
 
@@ -311,4 +305,5 @@ class RecetaEditorDialog(QDialog):
         )
         if confirm == QMessageBox.Yes:
             self.db.execute_query("DELETE FROM recetas WHERE id=?", (receta_id,))
+            invalidar_recetas(self.db)
             self.cargar_receta_actual()
@@ -23,6 +23,8 @@ matplotlib.use("Qt5Agg")
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
+from app.database.async_query import AsyncQueryRunner
+
 # ---------------------------------------------------------------------------
 # Donut chart colors
 # ---------------------------------------------------------------------------
@@ -113,10 +115,46 @@ class NumericItem(QTableWidgetItem):
         except ValueError:
             return super().__lt__(other)
 
+def _consultar_resumen(conn):
+    """
+    Ventas y gastos por mes: { 'YYYY-MM': {...} }. Lee la tabla
+    resumen_mensual, que los triggers mantienen agregada.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT mes, ventas, gasto_efectivo, gasto_cheques, gasto_yappy, gasto_tarjetas
+        FROM resumen_mensual
+    """)
+    datos_mensuales = {}
+    for mes, ventas, efectivo, cheques, yappy, tarjetas in cur.fetchall():
+        datos_mensuales[mes] = {
+            'ventas': float(ventas),
+            'efectivo': float(efectivo),
+            'cheques': float(cheques),
+            'yappy': float(yappy),
+            'tarjetas': float(tarjetas)
+        }
+    return datos_mensuales
+
+
+def _consultar_donuts(conn, mes_key):
+    """Devuelve ([ventas por método de cobro], [gastos por método de pago]) del mes."""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT ventas_efectivo, ventas_yappy, ventas_pedidos_ya, ventas_clave, ventas_visa,
+               gasto_efectivo, gasto_cheques, gasto_yappy, gasto_tarjetas
+        FROM resumen_mensual
+        WHERE mes = ?
+    """, (mes_key,))
+    fila = [float(x) for x in (cur.fetchone() or (0,) * 9)]
+    return fila[:5], fila[5:]
+
+
 class ResumenConsolidadosView(QWidget):
     def __init__(self, db_manager):
         super().__init__()
         self.db = db_manager
+        self.runner = AsyncQueryRunner(db_manager, self)
         self.init_ui()
 
     def init_ui(self):
@@ -244,77 +282,13 @@ class ResumenConsolidadosView(QWidget):
         exportar_tabla_por_mes(self, self.table, "resumen_consolidados.csv", 0)
 
     def cargar_datos(self):
+        self.runner.submit("tabla", _consultar_resumen, on_result=self._llenar_tabla)
+
+        # Refresh donuts using current filter selection
+        self._actualizar_donuts(self.spn_anio.value(), self.cmb_mes.currentIndex() + 1)
+
+    def _llenar_tabla(self, datos_mensuales):
         self.table.setSortingEnabled(False)
-        
-        # Diccionario para agrupar por mes: { 'YYYY-MM': { 'ventas': 0, 'efectivo': 0, ... } }
-        datos_mensuales = {}
-        
-        def inicializar_mes(mes):
-            if mes not in datos_mensuales:
-                datos_mensuales[mes] = {
-                    'ventas': 0.0,
-                    'efectivo': 0.0,
-                    'cheques': 0.0,
-                    'yappy': 0.0,
-                    'tarjetas': 0.0
-                }
-
-        # 1. Obtener Ventas (Diario de Ventas)
-        self.db.cursor.execute("""
-            SELECT strftime('%Y-%m', fecha) as mes, SUM(total_ventas) 
-            FROM diario_ventas GROUP BY mes
-        """)
-        for row in self.db.cursor.fetchall():
-            mes = row[0]
-            if not mes: continue
-            inicializar_mes(mes)
-            datos_mensuales[mes]['ventas'] += float(row[1] or 0.0)
-
-        # 2. Obtener Gastos en Efectivo
-        self.db.cursor.execute("""
-            SELECT strftime('%Y-%m', fecha) as mes, SUM(total) 
-            FROM pagos_efectivo GROUP BY mes
-        """)
-        for row in self.db.cursor.fetchall():
-            mes = row[0]
-            if not mes: continue
-            inicializar_mes(mes)
-            datos_mensuales[mes]['efectivo'] += float(row[1] or 0.0)
-
-        # 3. Obtener Gastos por Cheque (monto)
-        self.db.cursor.execute("""
-            SELECT strftime('%Y-%m', fecha) as mes, SUM(monto) 
-            FROM chequera GROUP BY mes
-        """)
-        for row in self.db.cursor.fetchall():
-            mes = row[0]
-            if not mes: continue
-            inicializar_mes(mes)
-            datos_mensuales[mes]['cheques'] += float(row[1] or 0.0)
-
-        # 4. Obtener Gastos por Yappy (monto)
-        self.db.cursor.execute("""
-            SELECT strftime('%Y-%m', fecha) as mes, SUM(monto) 
-            FROM transacciones_yappy GROUP BY mes
-        """)
-        for row in self.db.cursor.fetchall():
-            mes = row[0]
-            if not mes: continue
-            inicializar_mes(mes)
-            datos_mensuales[mes]['yappy'] += float(row[1] or 0.0)
-
-        # 5. Obtener Gastos por Tarjeta (Solo tipo COMPRA, es decir, pagos realizados a terceros)
-        self.db.cursor.execute("""
-            SELECT strftime('%Y-%m', fecha) as mes, SUM(monto) 
-            FROM transacciones_tarjeta 
-            WHERE tipo_transaccion = 'COMPRA'
-            GROUP BY mes
-        """)
-        for row in self.db.cursor.fetchall():
-            mes = row[0]
-            if not mes: continue
-            inicializar_mes(mes)
-            datos_mensuales[mes]['tarjetas'] += float(row[1] or 0.0)
 
         # Llenar la tabla
         self.table.setRowCount(0)
@@ -377,9 +351,6 @@ class ResumenConsolidadosView(QWidget):
 
         self.table.setSortingEnabled(True)
 
-        # Refresh donuts using current filter selection
-        self._actualizar_donuts(self.spn_anio.value(), self.cmb_mes.currentIndex() + 1)
-
     def _reset_filtro(self):
         hoy = datetime.date.today()
         self.cmb_mes.blockSignals(True)
@@ -399,43 +370,12 @@ class ResumenConsolidadosView(QWidget):
         self.donut_ventas._title = f"Ventas por método de cobro — {mes_nombre} {year}"
         self.donut_gastos._title = f"Gastos por método de pago — {mes_nombre} {year}"
 
-        cur = self.db.cursor
-
-        cur.execute("""
-            SELECT COALESCE(SUM(yappy), 0),
-                   COALESCE(SUM(pedidos_ya), 0),
-                   COALESCE(SUM(clave), 0),
-                   COALESCE(SUM(visa_mastercard), 0),
-                   COALESCE(SUM(total_ventas), 0),
-                   COALESCE(SUM(efectivo), 0)
-            FROM diario_ventas
-            WHERE strftime('%Y-%m', fecha) = ?
-        """, (mes_key,))
-        rv = cur.fetchone() or (0, 0, 0, 0, 0, 0)
-        yappy_v, pedidos_v, clave_v, visa_v, total_v, efectivo_v = (float(x) for x in rv)
-        self.donut_ventas.refresh(
-            _V_LABELS,
-            [efectivo_v, yappy_v, pedidos_v, clave_v, visa_v],
-            _V_COLORS,
+        # Cambiar mes/año mientras la consulta anterior corre la cancela.
+        self.runner.submit(
+            "donuts", _consultar_donuts, mes_key, on_result=self._aplicar_donuts
         )
 
-        cur.execute("SELECT COALESCE(SUM(total), 0) FROM pagos_efectivo WHERE strftime('%Y-%m', fecha) = ?", (mes_key,))
-        ef_g = float((cur.fetchone() or (0,))[0])
-
-        cur.execute("SELECT COALESCE(SUM(monto), 0) FROM chequera WHERE strftime('%Y-%m', fecha) = ?", (mes_key,))
-        ch_g = float((cur.fetchone() or (0,))[0])
-
-        cur.execute("SELECT COALESCE(SUM(monto), 0) FROM transacciones_yappy WHERE strftime('%Y-%m', fecha) = ?", (mes_key,))
-        ya_g = float((cur.fetchone() or (0,))[0])
-
-        cur.execute("""
-            SELECT COALESCE(SUM(monto), 0) FROM transacciones_tarjeta
-            WHERE tipo_transaccion = 'COMPRA' AND strftime('%Y-%m', fecha) = ?
-        """, (mes_key,))
-        tc_g = float((cur.fetchone() or (0,))[0])
-
-        self.donut_gastos.refresh(
-            _G_LABELS,
-            [ef_g, ch_g, ya_g, tc_g],
-            _G_COLORS,
-        )
+    def _aplicar_donuts(self, valores):
+        ventas, gastos = valores
+        self.donut_ventas.refresh(_V_LABELS, ventas, _V_COLORS)
+        self.donut_gastos.refresh(_G_LABELS, gastos, _G_COLORS)
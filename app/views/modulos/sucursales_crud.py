@@ -16,6 +16,8 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt
 
+from app.controllers.catalogos import invalidar_catalogos
+
 class SucursalDialog(QDialog):
     def __init__(self, db_manager, sucursal_id=None, parent=None):
         super().__init__(parent)
@@ -59,11 +61,10 @@ class SucursalDialog(QDialog):
         self.setLayout(layout)
 
     def cargar_datos(self):
-        self.db.cursor.execute(
+        row = self.db.fetch_one(
             "SELECT nombre, direccion, telefono, es_principal FROM sucursales WHERE id=?",
             (self.sucursal_id,),
         )
-        row = self.db.cursor.fetchone()
         if row:
             self.nombre_input.setText(row[0])
             self.direccion_input.setText(row[1] or "")
@@ -81,21 +82,22 @@ class SucursalDialog(QDialog):
             return
 
         try:
-            if es_principal:
-                # Si se marca como principal, desmarcamos a las demás
-                self.db.cursor.execute("UPDATE sucursales SET es_principal = 0")
+            with self.db.transaction():
+                if es_principal:
+                    # Si se marca como principal, desmarcamos a las demás
+                    self.db.execute_query("UPDATE sucursales SET es_principal = 0")
                 
-            if self.sucursal_id:
-                self.db.cursor.execute(
-                    "UPDATE sucursales SET nombre=?, direccion=?, telefono=?, es_principal=? WHERE id=?",
-                    (nombre, direccion, telefono, es_principal, self.sucursal_id),
-                )
-            else:
-                self.db.cursor.execute(
-                    "INSERT INTO sucursales (nombre, direccion, telefono, es_principal) VALUES (?, ?, ?, ?)",
-                    (nombre, direccion, telefono, es_principal),
-                )
-            self.db.conn.commit()
+                if self.sucursal_id:
+                    self.db.execute_query(
+                        "UPDATE sucursales SET nombre=?, direccion=?, telefono=?, es_principal=? WHERE id=?",
+                        (nombre, direccion, telefono, es_principal, self.sucursal_id),
+                    )
+                else:
+                    self.db.execute_query(
+                        "INSERT INTO sucursales (nombre, direccion, telefono, es_principal) VALUES (?, ?, ?, ?)",
+                        (nombre, direccion, telefono, es_principal),
+                    )
+            invalidar_catalogos(self.db, "sucursales")
             self.accept()
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Error BD", str(e))
@@ -148,8 +150,7 @@ class SucursalesCRUD(QWidget):
         self.setLayout(layout)
 
     def cargar_datos(self):
-        self.db.cursor.execute("SELECT id, nombre, direccion, telefono, es_principal FROM sucursales ORDER BY nombre")
-        rows = self.db.cursor.fetchall()
+        rows = self.db.fetch_all("SELECT id, nombre, direccion, telefono, es_principal FROM sucursales ORDER BY nombre")
         self.table.setRowCount(0)
 
         for r_idx, row in enumerate(rows):
@@ -188,8 +189,7 @@ class SucursalesCRUD(QWidget):
         sucursal_id = self.table.item(row, 0).text()
         
         # Verificar si tiene abastecimientos asociados
-        self.db.cursor.execute("SELECT COUNT(*) FROM abastecimiento_interno WHERE sucursal_origen_id = ? OR sucursal_destino_id = ?", (sucursal_id, sucursal_id))
-        if self.db.cursor.fetchone()[0] > 0:
+        if self.db.fetch_one("SELECT COUNT(*) FROM abastecimiento_interno WHERE sucursal_origen_id = ? OR sucursal_destino_id = ?", (sucursal_id, sucursal_id))[0] > 0:
             return QMessageBox.warning(self, "Aviso", "No se puede eliminar la sucursal porque tiene movimientos de abastecimiento asociados.")
 
         reply = QMessageBox.question(
@@ -199,6 +199,6 @@ class SucursalesCRUD(QWidget):
             QMessageBox.Yes | QMessageBox.No,
         )
         if reply == QMessageBox.Yes:
-            self.db.cursor.execute("DELETE FROM sucursales WHERE id=?", (sucursal_id,))
-            self.db.conn.commit()
+            self.db.execute_query("DELETE FROM sucursales WHERE id=?", (sucursal_id,))
+            invalidar_catalogos(self.db, "sucursales")
             self.cargar_datos()
@@ -4,6 +4,7 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QTableWidget,
     QTableWidgetItem,
+    QTableView,
     QPushButton,
     QLabel,
     QLineEdit,
@@ -22,6 +23,11 @@ from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QColor
 import csv
 
+from app.utils.modelo_tabla import Columna, ModeloPaginado, configurar_vista, fila_actual, monto, texto
+
+COLOR_COMPRA = QColor("#fdeaea")
+COLOR_PAGO = QColor("#eafdef")
+
 
 class NumericItem(QTableWidgetItem):
     """Permite ordenar columnas numéricas correctamente."""
@@ -119,7 +125,7 @@ class TarjetaDialog(QDialog):
 
         if self.data:
             query = "UPDATE tarjetas_credito SET numero=?, tipo=?, banco=?, fecha_corte=?, fecha_pago=?, tasa_interes=? WHERE id=?"
-            self.db.cursor.execute(
+            self.db.execute_query(
                 query,
                 (
                     numero,
@@ -133,11 +139,10 @@ class TarjetaDialog(QDialog):
             )
         else:
             query = "INSERT INTO tarjetas_credito (numero, tipo, banco, fecha_corte, fecha_pago, tasa_interes) VALUES (?, ?, ?, ?, ?, ?)"
-            self.db.cursor.execute(
+            self.db.execute_query(
                 query, (numero, tipo, banco, fecha_corte, fecha_pago, tasa_interes)
             )
 
-        self.db.conn.commit()
         self.accept()
 
 
@@ -193,10 +198,9 @@ class GestionTarjetasDialog(QDialog):
         self.cargar_tarjetas()
 
     def cargar_tarjetas(self):
-        self.db.cursor.execute(
+        rows = self.db.fetch_all(
             "SELECT id, banco, tipo, numero, fecha_corte, fecha_pago, tasa_interes FROM tarjetas_credito ORDER BY id DESC"
         )
-        rows = self.db.cursor.fetchall()
         self.table_tarjetas.setRowCount(0)
 
         for r_idx, row in enumerate(rows):
@@ -231,11 +235,10 @@ class GestionTarjetasDialog(QDialog):
 
         tarjeta_id = self.table_tarjetas.item(row, 0).text()
 
-        self.db.cursor.execute(
+        row_data = self.db.fetch_one(
             "SELECT id, numero, tipo, banco, fecha_corte, fecha_pago, tasa_interes FROM tarjetas_credito WHERE id=?",
             (tarjeta_id,),
         )
-        row_data = self.db.cursor.fetchone()
 
         if row_data:
             data = {
@@ -268,10 +271,9 @@ class GestionTarjetasDialog(QDialog):
         )
 
         if reply == QMessageBox.Yes:
-            self.db.cursor.execute(
+            self.db.execute_query(
                 "DELETE FROM tarjetas_credito WHERE id=?", (tarjeta_id,)
             )
-            self.db.conn.commit()
             self.cargar_tarjetas()
 
 
@@ -368,7 +370,7 @@ class TransaccionDialog(QDialog):
                 SET fecha=?, comercio=?, descripcion=?, tipo_transaccion=?, monto=?
                 WHERE id=?
             """
-            self.db.cursor.execute(
+            self.db.execute_query(
                 query, (fecha, comercio, descripcion, tipo, monto, self.data["id"])
             )
         else:
@@ -376,11 +378,10 @@ class TransaccionDialog(QDialog):
                 INSERT INTO transacciones_tarjeta (tarjeta_id, fecha, comercio, descripcion, tipo_transaccion, monto)
                 VALUES (?, ?, ?, ?, ?, ?)
             """
-            self.db.cursor.execute(
+            self.db.execute_query(
                 query, (self.tarjeta_id, fecha, comercio, descripcion, tipo, monto)
             )
 
-        self.db.conn.commit()
         return True
 
     def save(self):
@@ -486,19 +487,30 @@ class TarjetasCreditoView(QWidget):
 
         container_layout.addLayout(trans_header)
 
-        self.table_transacciones = QTableWidget()
-        self.table_transacciones.setColumnCount(7)
-        self.table_transacciones.setHorizontalHeaderLabels(
-            ["ID", "Fecha", "Tipo", "Comercio", "Descripción", "Monto", ""]
+        # Transacciones por páginas al desplazarse (índice tarjeta_id, fecha)
+        self.table_transacciones = QTableView()
+        self.modelo_transacciones = ModeloPaginado(
+            [
+                Columna("ID", numerica=True, sql="id"),
+                Columna("Fecha", sql="fecha"),
+                Columna("Tipo", sql="tipo_transaccion"),
+                Columna("Comercio", sql="comercio"),
+                Columna("Descripción", sql="descripcion"),
+                Columna("Monto", monto, numerica=True, sql="monto"),
+            ],
+            self.db,
+            "id, fecha, tipo_transaccion, comercio, descripcion, monto",
+            "transacciones_tarjeta",
+            ["fecha", "id"],
+            parent=self,
+            fondo_fila=lambda fila: COLOR_COMPRA if fila[2] == "COMPRA" else COLOR_PAGO,
         )
+        configurar_vista(self.table_transacciones, self.modelo_transacciones)
         self.table_transacciones.horizontalHeader().setSectionResizeMode(
             QHeaderView.Stretch
         )
-        self.table_transacciones.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table_transacciones.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table_transacciones.setSelectionBehavior(QTableView.SelectRows)
         self.table_transacciones.hideColumn(0)
-        self.table_transacciones.hideColumn(6)  # Para colorear sin ensuciar datos
-        self.table_transacciones.setSortingEnabled(True)
         container_layout.addWidget(self.table_transacciones)
 
         main_layout.addWidget(self.container_widget)
@@ -517,8 +529,7 @@ class TarjetasCreditoView(QWidget):
         # Guardar ID seleccionado actualmente si existe
         current_id = self.combo_tarjetas.currentData()
 
-        self.db.cursor.execute("SELECT id, banco, tipo, numero, fecha_corte, fecha_pago, tasa_interes FROM tarjetas_credito ORDER BY id DESC")
-        rows = self.db.cursor.fetchall()
+        rows = self.db.fetch_all("SELECT id, banco, tipo, numero, fecha_corte, fecha_pago, tasa_interes FROM tarjetas_credito ORDER BY id DESC")
 
         self.combo_tarjetas.blockSignals(True)
         self.combo_tarjetas.clear()
@@ -584,7 +595,7 @@ class TarjetasCreditoView(QWidget):
             self.tarjeta_seleccionada_id = None
             self.lbl_info_tarjeta.setText("")
             self.container_widget.setEnabled(False)
-            self.table_transacciones.setRowCount(0)
+            self.modelo_transacciones.set_filtro(None)
             self.table_resumen.setRowCount(0)
 
     def abrir_gestion_tarjetas(self):
@@ -597,64 +608,27 @@ class TarjetasCreditoView(QWidget):
         if not self.tarjeta_seleccionada_id:
             return
 
-        self.table_transacciones.setSortingEnabled(False)
-        self.db.cursor.execute(
-            """
-            SELECT id, fecha, tipo_transaccion, comercio, descripcion, monto 
-            FROM transacciones_tarjeta 
-            WHERE tarjeta_id = ? 
-            ORDER BY fecha DESC, id DESC
-        """,
-            (self.tarjeta_seleccionada_id,),
+        self.modelo_transacciones.set_filtro(
+            "tarjeta_id = ?", (self.tarjeta_seleccionada_id,)
         )
-        rows = self.db.cursor.fetchall()
-        self.table_transacciones.setRowCount(0)
-
-        for r_idx, row in enumerate(rows):
-            self.table_transacciones.insertRow(r_idx)
-
-            tipo = row[2]
-            color = QColor("#fdeaea") if tipo == "COMPRA" else QColor("#eafdef")
-
-            self.table_transacciones.setItem(r_idx, 0, QTableWidgetItem(str(row[0])))
-            self.table_transacciones.setItem(r_idx, 1, QTableWidgetItem(str(row[1])))
-            self.table_transacciones.setItem(r_idx, 2, QTableWidgetItem(tipo))
-            self.table_transacciones.setItem(
-                r_idx, 3, QTableWidgetItem(str(row[3] or ""))
-            )
-            self.table_transacciones.setItem(
-                r_idx, 4, QTableWidgetItem(str(row[4] or ""))
-            )
-            self.table_transacciones.setItem(
-                r_idx, 5, NumericItem(f"{float(row[5]):.2f}")
-            )
-
-            for col in range(6):
-                item = self.table_transacciones.item(r_idx, col)
-                if item:
-                    item.setBackground(color)
-
-        self.table_transacciones.setSortingEnabled(True)
 
     def cargar_resumen(self):
         if not self.tarjeta_seleccionada_id:
             return
 
-        self.db.cursor.execute(
+        rows = self.db.fetch_all(
             """
             SELECT 
-                strftime('%Y-%m', fecha) as mes_anio,
+                mes,
                 SUM(CASE WHEN tipo_transaccion = 'COMPRA' THEN monto ELSE 0 END) as total_compras,
                 SUM(CASE WHEN tipo_transaccion = 'PAGO' THEN monto ELSE 0 END) as total_pagos
             FROM transacciones_tarjeta
             WHERE tarjeta_id = ?
-            GROUP BY mes_anio
-            ORDER BY mes_anio DESC
+            GROUP BY mes
+            ORDER BY mes DESC
         """,
             (self.tarjeta_seleccionada_id,),
         )
-
-        rows = self.db.cursor.fetchall()
         self.table_resumen.setRowCount(0)
 
         for r_idx, row in enumerate(rows):
@@ -690,19 +664,19 @@ class TarjetasCreditoView(QWidget):
         if not self.tarjeta_seleccionada_id:
             return
 
-        row = self.table_transacciones.currentRow()
-        if row < 0:
+        fila = fila_actual(self.table_transacciones)
+        if fila is None:
             return QMessageBox.warning(
                 self, "Aviso", "Seleccione una transacción para editar."
             )
 
         data = {
-            "id": self.table_transacciones.item(row, 0).text(),
-            "fecha": self.table_transacciones.item(row, 1).text(),
-            "tipo_transaccion": self.table_transacciones.item(row, 2).text(),
-            "comercio": self.table_transacciones.item(row, 3).text(),
-            "descripcion": self.table_transacciones.item(row, 4).text(),
-            "monto": self.table_transacciones.item(row, 5).text(),
+            "id": fila[0],
+            "fecha": texto(fila[1]),
+            "tipo_transaccion": texto(fila[2]),
+            "comercio": texto(fila[3]),
+            "descripcion": texto(fila[4]),
+            "monto": fila[5] or 0.0,
         }
 
         dlg = TransaccionDialog(
@@ -713,13 +687,13 @@ class TarjetasCreditoView(QWidget):
             self.cargar_resumen()
 
     def eliminar_transaccion(self):
-        row = self.table_transacciones.currentRow()
-        if row < 0:
+        fila = fila_actual(self.table_transacciones)
+        if fila is None:
             return QMessageBox.warning(
                 self, "Aviso", "Seleccione una transacción para eliminar."
             )
 
-        trans_id = self.table_transacciones.item(row, 0).text()
+        trans_id = fila[0]
         reply = QMessageBox.question(
             self,
             "Confirmar",
@@ -729,9 +703,8 @@ class TarjetasCreditoView(QWidget):
         )
 
         if reply == QMessageBox.Yes:
-            self.db.cursor.execute(
+            self.db.execute_query(
                 "DELETE FROM transacciones_tarjeta WHERE id=?", (trans_id,)
             )
-            self.db.conn.commit()
             self.cargar_transacciones()
             self.cargar_resumen()
@@ -14,6 +14,8 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt
 
+from app.controllers.catalogos import invalidar_catalogos
+
 
 class NumericItem(QTableWidgetItem):
     """Permite ordenar columnas numéricas correctamente."""
@@ -173,6 +175,7 @@ class UnidadesCRUD(QWidget):
                 self.db.execute_query(
                     "DELETE FROM unidades_medida WHERE id=?", (id_unidad,)
                 )
+                invalidar_catalogos(self.db, "unidades")
                 self.cargar_datos()
             except Exception as e:
                 QMessageBox.critical(
@@ -232,6 +235,7 @@ class UnidadDialog(QDialog):
                     "INSERT INTO unidades_medida (nombre, abreviatura) VALUES (?,?)",
                     (nom, abr),
                 )
+            invalidar_catalogos(self.db, "unidades")
             self.accept()
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
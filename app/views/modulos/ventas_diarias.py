@@ -15,6 +15,8 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QColor, QFont
 
+from app.controllers.kardex_controller import KardexController
+
 
 class VentasDiariasView(QWidget):
     def __init__(self, db_manager):
@@ -96,7 +98,7 @@ class VentasDiariasView(QWidget):
         """)
         self.btn_save.clicked.connect(self.guardar_cambios)
 
-        # Botón para descontar inventario (Futura implementación lógica)
+        # Botón para descontar inventario vía KardexController
         self.btn_process = QPushButton("Actualizar Inventario (Kardex)")
         self.btn_process.setCursor(Qt.PointingHandCursor)
         self.btn_process.setStyleSheet("""
@@ -200,25 +202,28 @@ class VentasDiariasView(QWidget):
                 return
 
         try:
-            # 1. Crear o Actualizar Cabecera
-            if not self.registro_actual_id:
-                cur = self.db.execute_query(
-                    "INSERT INTO registro_ventas_diarias (fecha) VALUES (?)", (fecha,)
+            registro_id = self.registro_actual_id
+            with self.db.transaction():
+                # 1. Crear o Actualizar Cabecera
+                if not registro_id:
+                    cur = self.db.execute_query(
+                        "INSERT INTO registro_ventas_diarias (fecha) VALUES (?)", (fecha,)
+                    )
+                    registro_id = cur.lastrowid
+
+                # 2. Limpiar detalles anteriores (método simple de actualización)
+                self.db.execute_query(
+                    "DELETE FROM detalle_ventas_diarias WHERE registro_diario_id=?",
+                    (registro_id,),
                 )
-                self.registro_actual_id = cur.lastrowid
-
-            # 2. Limpiar detalles anteriores (método simple de actualización)
-            self.db.execute_query(
-                "DELETE FROM detalle_ventas_diarias WHERE registro_diario_id=?",
-                (self.registro_actual_id,),
-            )
 
-            # 3. Insertar nuevos detalles
-            if detalles:
-                query_ins = "INSERT INTO detalle_ventas_diarias (registro_diario_id, menu_item_id, cantidad) VALUES (?,?,?)"
-                datos_batch = [(self.registro_actual_id, d[0], d[1]) for d in detalles]
-                self.db.cursor.executemany(query_ins, datos_batch)
-                self.db.conn.commit()
+                # 3. Insertar nuevos detalles
+                if detalles:
+                    query_ins = "INSERT INTO detalle_ventas_diarias (registro_diario_id, menu_item_id, cantidad) VALUES (?,?,?)"
+                    datos_batch = [(registro_id, d[0], d[1]) for d in detalles]
+                    self.db.execute_many(query_ins, datos_batch)
+            # Solo después del commit: si falló, la cabecera nueva no existe
+            self.registro_actual_id = registro_id
 
             QMessageBox.information(
                 self, "Éxito", "Cantidades guardadas correctamente."
@@ -229,31 +234,45 @@ class VentasDiariasView(QWidget):
             QMessageBox.critical(self, "Error", str(e))
 
     def procesar_inventario(self):
-        # Aquí conectarás luego con tu controlador de Kardex
-        # Lógica sugerida:
-        # 1. Obtener items vendidos > 0
-        # 2. Para cada item, buscar su receta (tabla recetas)
-        # 3. Para cada insumo en la receta: CantidadVendida * CantidadReceta
-        # 4. Insertar en tabla 'movimientos_inventario' (tipo='VENTA')
-        # 5. Actualizar stock en tabla 'insumos'
-        # 6. UPDATE registro_ventas_diarias SET inventario_descontado = 1
+        if not self.registro_actual_id:
+            return
+
+        kardex = KardexController(self.db)
+        try:
+            plan, errores = kardex.procesar_baja_por_ventas(
+                [self.registro_actual_id], dry_run=True
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
+
+        msg = (
+            "Esto descontará los insumos del inventario basado en las recetas.\n"
+            f"Se registrarán {len(plan)} movimientos de salida en el Kardex.\n"
+        )
+        if errores:
+            msg += f"\nAdvertencias ({len(errores)}):\n" + "\n".join(errores[:10])
+            if len(errores) > 10:
+                msg += "\n..."
+            msg += "\n"
+        msg += "\n¿Estás seguro? Esta acción no se debe repetir."
 
         reply = QMessageBox.question(
             self,
             "Confirmar Actualización",
-            "Esto descontará los insumos del inventario basado en las recetas.\n¿Estás seguro? Esta acción no se debe repetir.",
+            msg,
             QMessageBox.Yes | QMessageBox.No,
         )
 
         if reply == QMessageBox.Yes:
-            # TODO: Llamar a self.kardex_controller.procesar_venta_diaria(self.registro_actual_id)
-
-            # Simulamos el proceso por ahora
-            self.db.execute_query(
-                "UPDATE registro_ventas_diarias SET inventario_descontado=1 WHERE id=?",
-                (self.registro_actual_id,),
-            )
+            try:
+                total, _ = kardex.procesar_baja_por_ventas([self.registro_actual_id])
+            except Exception as e:
+                QMessageBox.critical(self, "Error", str(e))
+                return
             QMessageBox.information(
-                self, "Procesado", "Inventario actualizado (Simulación)."
+                self,
+                "Procesado",
+                f"Inventario actualizado. {total} movimientos registrados en el Kardex.",
             )
             self.cargar_datos_fecha()
@@ -2,6 +2,8 @@
 import sys
 import os
 import ctypes
+import logging
+import multiprocessing
 from PyQt5.QtWidgets import QApplication, QDialog
 from PyQt5.QtGui import QIcon
 from app.database.connection import DatabaseManager
@@ -22,6 +24,10 @@ def ruta_recurso(ruta_relativa):
 
 
 def main():
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+
     # Necesario para que Windows muestre el ícono de la app en la barra de tareas
     # en lugar del ícono del intérprete de Python
     ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID("italos.restaurante_manager")
@@ -55,6 +61,7 @@ def main():
             # Al cerrarse la ventana, verificamos si fue por logout
             if getattr(window, "logout_requested", False):
                 # Si fue logout, el bucle continúa y vuelve a mostrar el Login
+                db.mantenimiento()
                 continue
             else:
                 # Si se cerró normalmente (X), rompemos el bucle para salir
@@ -63,8 +70,13 @@ def main():
             # Si cancela el login, salimos
             break
 
+    # Checkpoint del WAL y PRAGMA optimize antes de salir
+    db.close()
     sys.exit()
 
 
 if __name__ == "__main__":
+    # Requerido por el pool de procesos de la importación de reportes
+    # cuando la app corre empaquetada con PyInstaller
+    multiprocessing.freeze_support()
     main()